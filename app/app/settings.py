@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import importlib.util
 import os
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,17 +80,74 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# DB_POOL=1 shares a bounded pool of connections between the threads of a
+# process, otherwise every thread keeps its connection for DB_CONN_MAX_AGE
+# seconds.
+DB_POOL = os.environ.get('DB_POOL', '') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.db.backends.pooled_postgresql' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Cached lists and pantry indexes are invalidated through the default
+# cache, so deployments running several workers need a shared backend.
+# The core.W001 check warns about a process local one outside DEBUG.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Records per endpoint timings, reported at /api/profiling/
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', '') == '1'
+REQUEST_PROFILING_SAMPLES = int(os.environ.get('REQUEST_PROFILING_SAMPLES', 1000))
+
+# The JSON renderer and parser use orjson, pinned in requirements.txt to a
+# release with musl wheels for the image. Without it they fall back to DRF's.
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+RECIPE_LIST_CACHE_TIMEOUT = int(os.environ.get('RECIPE_LIST_CACHE_TIMEOUT', 300))
+
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+    'SHARED_CACHE': os.environ.get('TOKEN_AUTH_SHARED_CACHE'),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -108,6 +167,36 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/2.2/topics/auth/passwords/
+# New passwords use PASSWORD_HASHER when its library is installed, the
+# other hashers verify existing passwords, which Django upgrades to the
+# first hasher on the next successful login.
+
+PASSWORD_HASHER_CHOICES = {
+    'argon2': ('argon2', 'django.contrib.auth.hashers.Argon2PasswordHasher'),
+    'bcrypt': ('bcrypt', 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher'),
+    'pbkdf2': (None, 'django.contrib.auth.hashers.PBKDF2PasswordHasher'),
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+
+PASSWORD_HASHERS = [
+    hasher
+    for name, (library, hasher) in sorted(
+        PASSWORD_HASHER_CHOICES.items(),
+        key=lambda choice: choice[0] != PASSWORD_HASHER
+    )
+    if library is None or importlib.util.find_spec(library) is not None
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Passwords hashed at once per process, and how long a login waits for
+# its turn before being told to retry.
+PASSWORD_HASHING_CONCURRENCY = int(
+    os.environ.get('PASSWORD_HASHING_CONCURRENCY', os.cpu_count() or 1)
+)
+PASSWORD_HASHING_TIMEOUT = float(os.environ.get('PASSWORD_HASHING_TIMEOUT', 5))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
 
@@ -131,4 +220,43 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# core.storage.S3Storage keeps the media files in the S3_STORAGE bucket.
+# It needs boto3, an optional extra left out of requirements.txt: install
+# it in the image of deployments that use the bucket.
+DEFAULT_FILE_STORAGE = os.environ.get(
+    'DEFAULT_FILE_STORAGE',
+    'django.core.files.storage.FileSystemStorage'
+)
+S3_STORAGE = {
+    'BUCKET': os.environ.get('S3_BUCKET', ''),
+    'ENDPOINT_URL': os.environ.get('S3_ENDPOINT_URL', ''),
+    'REGION': os.environ.get('S3_REGION', ''),
+    'ACCESS_KEY_ID': os.environ.get('S3_ACCESS_KEY_ID', ''),
+    'SECRET_ACCESS_KEY': os.environ.get('S3_SECRET_ACCESS_KEY', ''),
+    'LOCATION': os.environ.get('S3_LOCATION', ''),
+    # Public or CDN base url of the bucket, presigned urls are used without
+    'PUBLIC_URL': os.environ.get('S3_PUBLIC_URL', ''),
+    'URL_EXPIRE': int(os.environ.get('S3_URL_EXPIRE', 3600)),
+}
+
+# How local media files are served: django, x-accel-redirect or x-sendfile.
+# Django only streams them itself by default when DEBUG is on, otherwise
+# media urls answer 404 until a mode is picked.
+MEDIA_SERVE = os.environ.get('MEDIA_SERVE', 'django' if DEBUG else '')
+MEDIA_ACCEL_REDIRECT_LOCATION = os.environ.get(
+    'MEDIA_ACCEL_REDIRECT_LOCATION',
+    '/protected-media/'
+)
+
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40000000))
+
+# Number of users whose pantry index is kept in memory per process
+RECIPE_PANTRY_MAX_USERS = int(os.environ.get('RECIPE_PANTRY_MAX_USERS', 1000))
+# Seconds before a pantry index is rebuilt even if no change was signalled
+RECIPE_PANTRY_MAX_AGE = int(os.environ.get('RECIPE_PANTRY_MAX_AGE', 60))
+
 AUTH_USER_MODEL = 'core.CustomUserModel'
@@ -0,0 +1,14 @@
+"""
+Settings for running the test suite.
+
+MD5 makes the many users created by the tests cheap to hash, it must
+never be used outside of tests.
+"""
+
+from app.settings import *  # noqa
+
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# The suite runs in a single process, the local memory cache is shared.
+SILENCED_SYSTEM_CHECKS = ['core.W001']
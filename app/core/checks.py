@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+# Backends whose entries live in the memory of a single process.
+PROCESS_LOCAL_CACHES = (
+	'django.core.cache.backends.locmem.LocMemCache',
+	'django.core.cache.backends.dummy.DummyCache',
+	)
+
+
+@register()
+def check_media_serve(app_configs, **kwargs):
+	"""Rejects a MEDIA_SERVE mode the media view doesn't know"""
+	from core.views import MEDIA_SERVE_MODES
+
+	if not settings.MEDIA_SERVE or settings.MEDIA_SERVE in MEDIA_SERVE_MODES:
+		return []
+
+	return [Error(
+		f'Unknown MEDIA_SERVE mode "{settings.MEDIA_SERVE}".',
+		hint=f'Use one of: {", ".join(MEDIA_SERVE_MODES)}, or leave it empty.',
+		id='core.E001',
+		)]
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+	"""Warns when the default cache isn't shared between processes
+
+	The cached lists and the pantry indexes are invalidated by bumping a
+	generation in the default cache, which other workers only see when
+	they share it.
+	"""
+	if settings.DEBUG or settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+		return []
+
+	return [Warning(
+		'The default cache is local to each process, so workers keep serving '
+		'cached lists after another worker changes them.',
+		hint='Set CACHE_BACKEND and CACHE_LOCATION to a memcached or database '
+		'cache, or silence core.W001 when running a single process.',
+		id='core.W001',
+		)]
@@ -0,0 +1,33 @@
+"""
+PostgreSQL backend handing out connections from a per-process pool.
+
+Select it with ENGINE 'core.db.backends.pooled_postgresql' and tune the
+pool with the POOL entry of the database settings (MAX_SIZE, MAX_LIFETIME
+and TIMEOUT). Closing a connection returns it to the pool, so
+CONN_MAX_AGE should stay 0 and every request gives its connection back.
+"""
+from django.db.backends.postgresql import base
+
+from core.db.backends.pooled_postgresql.creation import DatabaseCreation
+from core.db.backends.pooled_postgresql.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+	"""Checks connections out of the pool instead of opening them"""
+	creation_class = DatabaseCreation
+
+	def get_new_connection(self, conn_params):
+		self._pool = get_pool(self.settings_dict, conn_params)
+		connection = self._pool.checkout(
+			lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+			)
+		self.isolation_level = self.settings_dict['OPTIONS'].get(
+			'isolation_level',
+			connection.isolation_level
+			)
+
+		return connection
+
+	def _close(self):
+		if self.connection is not None:
+			self._pool.checkin(self.connection)
@@ -0,0 +1,11 @@
+from django.db.backends.postgresql import creation
+
+from core.db.backends.pooled_postgresql.pool import close_idle
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+	"""Closes the pooled connections to a test database before dropping it"""
+
+	def _destroy_test_db(self, test_database_name, verbosity):
+		close_idle(test_database_name)
+		super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,164 @@
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+POOL_DEFAULTS = {
+	'MAX_SIZE': 10,
+	'MAX_LIFETIME': 1800,
+	'TIMEOUT': 10,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+	"""Raised when no connection could be checked out in time"""
+
+
+
+class ConnectionPool:
+	"""Bounded pool of psycopg2 connections shared by the threads of a process
+
+	Idle connections are reused most recently returned first. A connection
+	is checked with a trivial query before being handed out, and replaced
+	once it's older than max_lifetime.
+	"""
+
+	def __init__(self, max_size, max_lifetime, timeout):
+		self.max_size = max_size
+		self.max_lifetime = max_lifetime
+		self.timeout = timeout
+		self._idle = []
+		self._created = {}
+		self._size = 0
+		self._condition = threading.Condition()
+
+
+	def checkout(self, connect):
+		"""Returns a healthy connection, opening one with connect if needed"""
+		deadline = time.monotonic() + self.timeout
+		while True:
+			connection = self._reserve(deadline)
+			if connection is None:
+				try:
+					connection = connect()
+				except Exception:
+					self._release()
+					raise
+				self._created[connection] = time.monotonic()
+				return connection
+
+			if self._usable(connection):
+				return connection
+			self.discard(connection)
+
+
+	def checkin(self, connection):
+		"""Returns a connection to the pool, rolling back what it left open"""
+		try:
+			if not connection.closed and not self._expired(connection):
+				if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+					connection.rollback()
+				with self._condition:
+					self._idle.append(connection)
+					self._condition.notify()
+				return
+		except Exception:
+			pass
+		self.discard(connection)
+
+
+	def discard(self, connection):
+		"""Closes a connection and frees its slot"""
+		try:
+			connection.close()
+		except Exception:
+			pass
+		self._created.pop(connection, None)
+		self._release()
+
+
+	def close_idle(self):
+		"""Closes every idle connection"""
+		with self._condition:
+			idle, self._idle = self._idle, []
+		for connection in idle:
+			self.discard(connection)
+
+
+	def _reserve(self, deadline):
+		"""Takes an idle connection, or a slot for a new one when None"""
+		with self._condition:
+			while True:
+				if self._idle:
+					return self._idle.pop()
+				if self._size < self.max_size:
+					self._size += 1
+					return None
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					raise PoolTimeout(
+						f'No database connection available after {self.timeout}s '
+						f'({self.max_size} in use)'
+						)
+				self._condition.wait(remaining)
+
+
+	def _release(self):
+		"""Frees a slot"""
+		with self._condition:
+			self._size -= 1
+			self._condition.notify()
+
+
+	def _expired(self, connection):
+		"""Returns whether the connection has outlived max_lifetime"""
+		created = self._created.get(connection, 0)
+		return time.monotonic() - created > self.max_lifetime
+
+
+	def _usable(self, connection):
+		"""Returns whether the connection is young enough and answers queries"""
+		if connection.closed or self._expired(connection):
+			return False
+		try:
+			with connection.cursor() as cursor:
+				cursor.execute('SELECT 1')
+			if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+				connection.rollback()
+		except Exception:
+			return False
+
+		return True
+
+
+def get_pool(settings_dict, conn_params):
+	"""Returns the pool of the connection parameters, creating it once"""
+	key = (conn_params.get('database'), repr(sorted(conn_params.items())))
+	with _pools_lock:
+		pool = _pools.get(key)
+		if pool is None:
+			options = dict(POOL_DEFAULTS, **settings_dict.get('POOL', {}))
+			pool = _pools[key] = ConnectionPool(
+				options['MAX_SIZE'],
+				options['MAX_LIFETIME'],
+				options['TIMEOUT']
+				)
+
+	return pool
+
+
+def close_idle(database_name):
+	"""Closes the idle pooled connections to a database"""
+	with _pools_lock:
+		pools = [
+			pool for (database, params), pool in _pools.items()
+			if database == database_name
+			]
+	for pool in pools:
+		pool.close_idle()
@@ -0,0 +1,589 @@
+import io
+import itertools
+import json
+import platform
+import random
+import tempfile
+import time
+import uuid
+from collections import namedtuple
+from contextlib import ExitStack
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from PIL import Image
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import renderers
+from core.models import Tag, Ingredients, recipe
+from core.parsers import FastJSONParser
+from core.profiling import percentiles
+from core.renderers import FastJSONRenderer
+from recipe import bulk, search, usage
+from recipe.filters import filter_by_related, MATCH_ALL, MATCH_ANY
+from recipe.serializers import RecipeSerializer
+from recipe.views import TagViewSet, IngredientViewSet, RecipeViewSet
+from user.views import ManagingUser
+
+
+PASSWORD = 'benchmark-password'
+WORDS = (
+	'tomato', 'basil', 'curry', 'lentil', 'garlic', 'lemon',
+	'chicken', 'rice', 'noodle', 'mushroom', 'pepper', 'ginger',
+	)
+CHUNK_SIZE = 10000
+
+# Views whose class attributes are swapped by the comparisons.
+VIEWS = (TagViewSet, IngredientViewSet, RecipeViewSet, ManagingUser)
+
+# Every comparison runs the read endpoints once per variant.
+COMPARISONS = {
+	'authentication': (
+		('cached', {}),
+		('database', {'authentication_classes': (TokenAuthentication,)}),
+		),
+	'renderer': (
+		('fast', {}),
+		('stdlib', {'renderer_classes': (JSONRenderer,)}),
+		),
+	}
+
+# The JSON renderer and parser pairs timed by --encode.
+ENCODERS = (
+	('fast', FastJSONRenderer(), FastJSONParser()),
+	('stdlib', JSONRenderer(), JSONParser()),
+	)
+
+Endpoint = namedtuple('Endpoint', 'name method path data format')
+
+_unique = itertools.count()
+
+
+def _png():
+	"""Returns a small PNG image"""
+	out = io.BytesIO()
+	Image.new('RGB', (64, 64), (200, 80, 40)).save(out, 'PNG')
+
+	return out.getvalue()
+
+
+
+def _summary(timings):
+	"""Returns the mean, percentiles and throughput of request timings"""
+	if not timings:
+		return {'requests': 0}
+
+	total = sum(timings)
+	result = {
+		'requests': len(timings),
+		'mean_ms': round(total / len(timings) * 1000, 3),
+		}
+	result.update({
+		f'{name}_ms': value
+		for name, value in percentiles(timings, 1000).items()
+		})
+	result['throughput_rps'] = round(len(timings) / total, 1)
+
+	return result
+
+
+
+def _failed_endpoints(results):
+	"""Yields the names of the measured endpoints that answered errors"""
+	for name, result in results['endpoints'].items():
+		if result['errors']:
+			yield name
+	for comparison, variants in results['comparisons'].items():
+		for label, endpoints in variants.items():
+			for name, result in endpoints.items():
+				if result['errors']:
+					yield f'{name} ({comparison}={label})'
+
+
+
+class Seed:
+	"""The objects of the user the endpoints are measured with"""
+
+	def __init__(self, user, token, tag_ids, ingredient_ids, recipe_ids):
+		self.user = user
+		self.token = token
+		self.tag_ids = tag_ids
+		self.ingredient_ids = ingredient_ids
+		self.recipe_ids = recipe_ids
+
+
+
+class Command(BaseCommand):
+	"""Seeds data and measures the latency of every API endpoint"""
+
+	help = 'Measures the throughput and latency percentiles of the API endpoints'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--users', type=int, default=1, help='Users to seed')
+		parser.add_argument('--recipes', type=int, default=1000, help='Recipes per user')
+		parser.add_argument('--tags', type=int, default=50, help='Tags per user')
+		parser.add_argument('--ingredients', type=int, default=200, help='Ingredients per user')
+		parser.add_argument(
+			'--links', type=int, default=5,
+			help='Tags and ingredients linked to every recipe',
+			)
+		parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+		parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint')
+		parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data')
+		parser.add_argument(
+			'--endpoint', action='append', dest='endpoints',
+			help='Endpoint to measure, may be repeated (default: all)',
+			)
+		parser.add_argument(
+			'--compare', action='append', choices=sorted(COMPARISONS), default=[],
+			help='Also measure the read endpoints with each variant of a setting',
+			)
+		parser.add_argument(
+			'--explain', action='store_true',
+			help='Include the query plans of the tags filter',
+			)
+		parser.add_argument(
+			'--encode', type=int, default=0, metavar='RECIPES',
+			help='Also time encoding and decoding a list of that many serialized recipes',
+			)
+		parser.add_argument(
+			'--connections', action='store_true',
+			help='Include the time a request spends opening its database connection',
+			)
+		parser.add_argument('--output', help='File to write the JSON results to (default: stdout)')
+		parser.add_argument(
+			'--current-database', action='store_true',
+			help='Seed the current database instead of a throwaway test database',
+			)
+
+
+	def handle(self, *args, **options):
+		"""Runs the benchmark in a throwaway database"""
+		# Tells the objects of this run apart from earlier runs' and real ones.
+		self.run_id = uuid.uuid4().hex[:12]
+		with ExitStack() as stack:
+			if not options['current_database']:
+				setup_test_environment()
+				stack.callback(teardown_test_environment)
+				old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+				stack.callback(connection.creation.destroy_test_db, old_name, 0)
+			stack.enter_context(override_settings(
+				ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+				MEDIA_ROOT=stack.enter_context(tempfile.TemporaryDirectory()),
+				CACHES={'default': {
+					'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+					'LOCATION': 'benchmark',
+					}},
+				TOKEN_AUTH_CACHE=dict(settings.TOKEN_AUTH_CACHE, SHARED_CACHE=None),
+				))
+			if options['current_database']:
+				stack.callback(self.delete_seeded)
+			results = self.run(options)
+
+		output = json.dumps(results, indent=2)
+		if options['output']:
+			with open(options['output'], 'w') as f:
+				f.write(output)
+			self.stderr.write(f'Results written to {options["output"]}')
+		else:
+			self.stdout.write(output)
+
+		failed = sorted(_failed_endpoints(results))
+		if failed:
+			raise CommandError(
+				f'Requests failed, the timings include error responses: {", ".join(failed)}'
+				)
+
+
+	def _email(self, prefix):
+		"""Returns a unique email of this run"""
+		return f'{prefix}{next(_unique)}-{self.run_id}@example.com'
+
+
+	def delete_seeded(self):
+		"""Deletes the users of this run along with everything they own"""
+		users = get_user_model().objects.filter(email__endswith=f'-{self.run_id}@example.com')
+		for field_name in ('tags', 'ingredients'):
+			# Dropping the links first spares the per recipe recounts.
+			recipe._meta.get_field(field_name).remote_field.through.objects.filter(
+				recipe__user__in=users
+				).delete()
+		users.delete()
+
+
+	def run(self, options):
+		"""Seeds the database and measures the endpoints"""
+		started = time.time()
+		seed = self.seed(options, random.Random(options['seed']))
+		endpoints = self.endpoints(seed)
+		names = options['endpoints']
+		if names:
+			unknown = set(names) - {endpoint.name for endpoint in endpoints}
+			if unknown:
+				raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+			endpoints = [endpoint for endpoint in endpoints if endpoint.name in names]
+
+		client = APIClient()
+		client.credentials(HTTP_AUTHORIZATION=f'Token {seed.token.key}')
+		results = {
+			'started_at': started,
+			'python': platform.python_version(),
+			'django': django.get_version(),
+			'database': connection.vendor,
+			'volumes': {
+				name: options[name]
+				for name in ('users', 'recipes', 'tags', 'ingredients', 'links')
+				},
+			# Objects the assigned_only and usage lists return.
+			'assigned': {
+				model._meta.model_name: model.objects.filter(
+					user=seed.user,
+					recipe_count__gt=0
+					).count()
+				for model in usage.FIELDS
+				},
+			'endpoints': {},
+			'comparisons': {},
+			}
+		for endpoint in endpoints:
+			self.stderr.write(f'Measuring {endpoint.name}')
+			results['endpoints'][endpoint.name] = self.measure(client, endpoint, options)
+
+		reads = [endpoint for endpoint in endpoints if endpoint.method == 'get']
+		for name in options['compare']:
+			results['comparisons'][name] = {}
+			for label, attrs in COMPARISONS[name]:
+				self.stderr.write(f'Measuring {name}={label}')
+				with ExitStack() as stack:
+					for view in VIEWS:
+						for attr, value in attrs.items():
+							stack.enter_context(mock.patch.object(view, attr, value))
+					results['comparisons'][name][label] = {
+						endpoint.name: self.measure(client, endpoint, options)
+						for endpoint in reads
+						}
+
+		if options['explain']:
+			results['plans'] = self.explain(seed)
+		if options['connections']:
+			results['connections'] = self.measure_connections(options)
+		if options['encode']:
+			results['encoding'] = self.measure_encoding(seed, options)
+
+		return results
+
+
+	def seed(self, options, rng):
+		"""Creates the users and their objects with bulk inserts"""
+		users = [
+			get_user_model().objects.create_user(
+				email=self._email(f'benchmark{n}-'),
+				password=PASSWORD,
+				name=f'Benchmark {n}'
+				)
+			for n in range(max(options['users'], 1))
+			]
+
+		seeds = []
+		for user in users:
+			self.stderr.write(f'Seeding {user.email}')
+			tag_ids = self._create_named(Tag, user, 'Tag', options['tags'])
+			ingredient_ids = self._create_named(Ingredients, user, 'Ingredient', options['ingredients'])
+			recipe_ids = []
+			for offset in range(0, options['recipes'], CHUNK_SIZE):
+				count = min(CHUNK_SIZE, options['recipes'] - offset)
+				recipe_ids.extend(self._create_recipes(
+					user, rng, count, tag_ids, ingredient_ids, options['links']
+					))
+			# The links are bulk inserted without signals, so count them here.
+			for model in usage.FIELDS:
+				usage.recount(model, model.objects.filter(user=user))
+			seeds.append(Seed(user, None, tag_ids, ingredient_ids, recipe_ids))
+
+		seed = seeds[0]
+		seed.token = Token.objects.create(user=seed.user)
+
+		return seed
+
+
+	def _create_named(self, model, user, prefix, count):
+		"""Bulk creates tags or ingredients and returns their primary keys"""
+		model.objects.bulk_create(
+			[model(user=user, name=f'{prefix} {WORDS[n % len(WORDS)]} {n}') for n in range(count)],
+			batch_size=bulk.BATCH_SIZE
+			)
+
+		return list(model.objects.filter(user=user).order_by('pk').values_list('pk', flat=True))
+
+
+	def _create_recipes(self, user, rng, count, tag_ids, ingredient_ids, links):
+		"""Bulk creates recipes with their links and returns their primary keys"""
+		last_pk = recipe.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+		recipe.objects.bulk_create(
+			[
+				recipe(
+					user=user,
+					title=f'{rng.choice(WORDS)} {rng.choice(WORDS)} {n}',
+					time_minutes=rng.randint(5, 120),
+					price=Decimal(rng.randint(100, 99999)) / 100
+					)
+				for n in range(count)
+				],
+			batch_size=bulk.BATCH_SIZE
+			)
+		recipe_ids = list(recipe.objects.filter(
+			user=user,
+			pk__gt=last_pk
+			).order_by('pk').values_list('pk', flat=True))
+
+		for field_name, related_ids in (('tags', tag_ids), ('ingredients', ingredient_ids)):
+			field = recipe._meta.get_field(field_name)
+			through = field.remote_field.through
+			target = f'{field.m2m_reverse_field_name()}_id'
+			through.objects.bulk_create(
+				[
+					through(recipe_id=recipe_id, **{target: related_id})
+					for recipe_id in recipe_ids
+					for related_id in rng.sample(related_ids, min(links, len(related_ids)))
+					],
+				batch_size=bulk.BATCH_SIZE
+				)
+		search.update_search_vectors(recipe_ids)
+
+		return recipe_ids
+
+
+	def endpoints(self, seed):
+		"""Returns the endpoints of the recipe and user URLs to measure"""
+		image = _png()
+		recipe_ids = seed.recipe_ids or [None]
+		tags = ','.join(str(pk) for pk in seed.tag_ids[:2])
+		pantry = ','.join(str(pk) for pk in seed.ingredient_ids[:10])
+
+		def detail(i):
+			return reverse('recipe:recipe-detail', args=[recipe_ids[i % len(recipe_ids)]])
+
+		def fresh_recipe(i):
+			obj = recipe.objects.create(user=seed.user, title='Disposable', time_minutes=5, price=1)
+			return reverse('recipe:recipe-detail', args=[obj.pk])
+
+		def upload(i):
+			return reverse('recipe:recipe-upload-image', args=[recipe_ids[i % len(recipe_ids)]])
+
+		def new_recipe(i):
+			return {
+				'title': f'Benchmark recipe {i}',
+				'time_minutes': 10,
+				'price': '5.00',
+				'tags': seed.tag_ids[:2],
+				'ingredients': seed.ingredient_ids[:3],
+				}
+
+		def image_file(i):
+			f = io.BytesIO(image)
+			f.name = 'benchmark.png'
+			return {'image': f}
+
+		def import_file(i):
+			f = io.BytesIO(''.join(
+				json.dumps(dict(new_recipe(n), tags=['Imported'], ingredients=['Imported'])) + '\n'
+				for n in range(10)
+				).encode('utf-8'))
+			f.name = 'benchmark.ndjson'
+			return {'file': f}
+
+		def path(name, **params):
+			url = reverse(name)
+			if params:
+				url = f'{url}?{urlencode(params)}'
+			return lambda i: url
+
+		return [
+			Endpoint('user-create', 'post', path('user:create'), lambda i: {
+				'email': self._email('created'),
+				'password': PASSWORD,
+				'name': 'Created',
+				}, 'json'),
+			Endpoint('user-token', 'post', path('user:token'), lambda i: {
+				'email': seed.user.email,
+				'password': PASSWORD,
+				}, 'json'),
+			Endpoint('user-me', 'get', path('user:me'), None, None),
+			Endpoint('user-me-update', 'patch', path('user:me'), lambda i: {
+				'name': f'Benchmark {i}',
+				}, 'json'),
+			Endpoint('tag-list', 'get', path('recipe:tag-list'), None, None),
+			Endpoint('tag-list-assigned', 'get', path('recipe:tag-list', assigned_only=1), None, None),
+			Endpoint('tag-list-usage', 'get', path('recipe:tag-list', ordering='-usage'), None, None),
+			Endpoint('tag-create', 'post', path('recipe:tag-list'), lambda i: {
+				'name': f'Created tag {next(_unique)}',
+				}, 'json'),
+			Endpoint('tag-bulk', 'post', path('recipe:tag-bulk'), lambda i: [
+				{'name': f'Bulk tag {next(_unique)}'} for n in range(10)
+				], 'json'),
+			Endpoint('ingredients-list', 'get', path('recipe:ingredients-list'), None, None),
+			Endpoint(
+				'ingredients-list-assigned', 'get',
+				path('recipe:ingredients-list', assigned_only=1), None, None
+				),
+			Endpoint('ingredients-create', 'post', path('recipe:ingredients-list'), lambda i: {
+				'name': f'Created ingredient {next(_unique)}',
+				}, 'json'),
+			Endpoint('ingredients-bulk', 'post', path('recipe:ingredients-bulk'), lambda i: [
+				{'name': f'Bulk ingredient {next(_unique)}'} for n in range(10)
+				], 'json'),
+			Endpoint('recipe-list', 'get', path('recipe:recipe-list'), None, None),
+			Endpoint(
+				'recipe-list-sparse', 'get',
+				path('recipe:recipe-list', fields='id,title'), None, None
+				),
+			Endpoint(
+				'recipe-list-expanded', 'get',
+				path('recipe:recipe-list', expand='tags,ingredients'), None, None
+				),
+			Endpoint('recipe-list-tags', 'get', path('recipe:recipe-list', tags=tags), None, None),
+			Endpoint(
+				'recipe-list-tags-all', 'get',
+				path('recipe:recipe-list', tags=tags, match=MATCH_ALL), None, None
+				),
+			Endpoint('recipe-detail', 'get', detail, None, None),
+			Endpoint('recipe-create', 'post', path('recipe:recipe-list'), new_recipe, 'json'),
+			Endpoint('recipe-update', 'patch', detail, lambda i: {
+				'title': f'Updated recipe {i}',
+				}, 'json'),
+			Endpoint('recipe-delete', 'delete', fresh_recipe, None, None),
+			Endpoint('recipe-search', 'get', path('recipe:recipe-search', q=WORDS[0]), None, None),
+			Endpoint('recipe-cookable', 'get', path('recipe:recipe-cookable', pantry=pantry), None, None),
+			Endpoint('recipe-export', 'get', path('recipe:recipe-export'), None, None),
+			Endpoint('recipe-export-csv', 'get', path('recipe:recipe-export', **{'as': 'csv'}), None, None),
+			Endpoint('recipe-bulk', 'post', path('recipe:recipe-bulk'), lambda i: [
+				new_recipe(n) for n in range(10)
+				], 'json'),
+			Endpoint('recipe-import', 'post', path('recipe:recipe-import'), import_file, 'multipart'),
+			Endpoint('recipe-upload-image', 'post', upload, image_file, 'multipart'),
+			]
+
+
+	def measure(self, client, endpoint, options):
+		"""Returns the latency percentiles and throughput of an endpoint"""
+		timings = []
+		errors = 0
+		for i in range(options['warmup'] + options['requests']):
+			path = endpoint.path(i)
+			request = getattr(client, endpoint.method)
+			if endpoint.data is None:
+				started = time.perf_counter()
+				response = request(path)
+			else:
+				data = endpoint.data(i)
+				started = time.perf_counter()
+				response = request(path, data, format=endpoint.format)
+			if response.streaming:
+				b''.join(response.streaming_content)
+			elapsed = time.perf_counter() - started
+
+			if i < options['warmup']:
+				continue
+			timings.append(elapsed)
+			if not 200 <= response.status_code < 300:
+				errors += 1
+
+		result = _summary(timings)
+		result['errors'] = errors
+
+		return result
+
+
+	def measure_connections(self, options):
+		"""Returns the cost of a query on a new connection and on a reused one
+
+		With the pooled backend a new connection is a checkout from the
+		pool, so running this with and without DB_POOL compares the two.
+		"""
+		if connection.in_atomic_block:
+			raise CommandError('Connections can only be measured outside of a transaction')
+
+		result = {'engine': connection.settings_dict['ENGINE']}
+		for label, reconnect in (('reconnect', True), ('reuse', False)):
+			timings = []
+			for i in range(options['requests']):
+				if reconnect:
+					connection.close()
+				started = time.perf_counter()
+				with connection.cursor() as cursor:
+					cursor.execute('SELECT 1')
+				timings.append(time.perf_counter() - started)
+			result[label] = _summary(timings)
+		if options['requests']:
+			result['saved_per_request_ms'] = round(
+				result['reconnect']['mean_ms'] - result['reuse']['mean_ms'],
+				3
+				)
+
+		return result
+
+
+	def measure_encoding(self, seed, options):
+		"""Returns the time the JSON renderers and parsers take on a recipe list
+
+		The seeded recipes are repeated up to the requested count, so the
+		payload size doesn't depend on the seeded volume.
+		"""
+		queryset = recipe.objects.filter(user=seed.user).prefetch_related(
+			'tags',
+			'ingredients'
+			).order_by('-id')[:options['encode']]
+		items = RecipeSerializer(queryset, many=True).data
+		if not items:
+			raise CommandError('No recipes to encode')
+		data = list(itertools.islice(itertools.cycle(items), options['encode']))
+
+		result = {'recipes': len(data), 'orjson': renderers.orjson is not None}
+		for label, renderer, parser in ENCODERS:
+			self.stderr.write(f'Measuring encoding={label}')
+			render_timings, parse_timings = [], []
+			for i in range(options['warmup'] + options['requests']):
+				started = time.perf_counter()
+				content = renderer.render(data)
+				rendered = time.perf_counter()
+				parser.parse(io.BytesIO(content))
+				parsed = time.perf_counter()
+				if i >= options['warmup']:
+					render_timings.append(rendered - started)
+					parse_timings.append(parsed - rendered)
+			result[label] = {
+				'bytes': len(renderer.render(data)),
+				'render': _summary(render_timings),
+				'parse': _summary(parse_timings),
+				}
+
+		return result
+
+
+	def explain(self, seed):
+		"""Returns the query plans of the recipe list filtered by tags"""
+		options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+		plans = {}
+		for match in (MATCH_ANY, MATCH_ALL):
+			queryset = filter_by_related(
+				recipe.objects.filter(user=seed.user),
+				'tags',
+				seed.tag_ids[:2],
+				match
+				).order_by('-id')[:100]
+			plans[f'tags-{match}'] = queryset.explain(**options)
+
+		return plans
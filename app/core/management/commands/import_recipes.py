@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import bulk, export, importer
+
+
+class Command(BaseCommand):
+	"""Imports recipes from an export file"""
+
+	help = 'Imports the recipes of an NDJSON or CSV export file for a user'
+
+	def add_arguments(self, parser):
+		parser.add_argument('path', help='File to import')
+		parser.add_argument('--user', required=True, help='Email of the user owning the recipes')
+		parser.add_argument(
+			'--as', dest='import_format', choices=export.FORMATS,
+			help='Format of the file (default: from its extension)',
+			)
+		parser.add_argument(
+			'--batch-size', type=int, default=bulk.BATCH_SIZE,
+			help='Recipes saved per transaction',
+			)
+
+
+	def handle(self, *args, **options):
+		"""Imports the file batch by batch"""
+		try:
+			user = get_user_model().objects.get(email=options['user'])
+		except get_user_model().DoesNotExist:
+			raise CommandError(f'No user with the email "{options["user"]}"')
+
+		import_format = options['import_format']
+		if import_format is None:
+			import_format = 'csv' if options['path'].lower().endswith('.csv') else 'ndjson'
+
+		def progress(report):
+			self.stdout.write(
+				f'Processed {report["processed"]} recipes, {report["created"]} created'
+				)
+
+		try:
+			with open(options['path'], 'rb') as f:
+				report = importer.import_recipes(
+					user,
+					f,
+					import_format,
+					batch_size=options['batch_size'],
+					progress=progress
+					)
+		except OSError as exc:
+			raise CommandError(f'The file could not be read: {exc}')
+		except importer.ImportFileError as exc:
+			raise CommandError(
+				f'The file could not be read after importing {exc.report["created"]} '
+				f'of {exc.report["processed"]} recipes: {exc}'
+				)
+		except importer.ImportConflict as exc:
+			raise CommandError(
+				f'The import stopped after importing {exc.report["created"]} '
+				f'of {exc.report["processed"]} recipes: {exc}'
+				)
+
+		for error in report['errors']:
+			self.stderr.write(f'Line {error["line"]}: {error["errors"]}')
+		self.stdout.write(self.style.SUCCESS(
+			f'Imported {report["created"]} of {report["processed"]} recipes, '
+			f'created {report["tags_created"]} tags and '
+			f'{report["ingredients_created"]} ingredients'
+			))
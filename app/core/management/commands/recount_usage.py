@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import cache, usage
+
+
+class Command(BaseCommand):
+	"""Recomputes the recipe counts of tags and ingredients"""
+
+	help = 'Recounts the recipes of every tag and ingredient, optionally for a single user'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--user', help='Email of the user to recount (default: everyone)')
+
+
+	def handle(self, *args, **options):
+		"""Recounts each model with a single update"""
+		users = get_user_model().objects.all()
+		if options['user']:
+			users = users.filter(email=options['user'])
+			if not users.exists():
+				raise CommandError(f'No user with the email "{options["user"]}"')
+
+		for model, name in usage.FIELDS.items():
+			queryset = model.objects.all()
+			if options['user']:
+				queryset = queryset.filter(user__in=users)
+			count = usage.recount(model, queryset)
+			for user_id in queryset.values_list('user_id', flat=True).distinct():
+				cache.bump_generation(model, user_id)
+			self.stdout.write(self.style.SUCCESS(
+				f'Recounted {name}, {count} changed'
+				))
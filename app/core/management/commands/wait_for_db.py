@@ -1,7 +1,8 @@
+import random
 import time
 
 from django.db import connections
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db.utils import OperationalError
 
 
@@ -9,18 +10,77 @@ from django.db.utils import OperationalError
 class Command(BaseCommand):
 	"""Stops the execution till the database is available"""
 
-	def handle(self, *args, **options):
-		"""It handles our command"""
-		self.stdout.write('Database is starting.....')
-		db_conn = None
+	help = 'Waits until the databases accept queries'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--database', action='append', dest='databases',
+			help='Database alias to wait for, may be repeated (default: default)',
+			)
+		parser.add_argument(
+			'--timeout', type=float, default=60,
+			help='Seconds to wait in total before giving up, 0 waits forever',
+			)
+		parser.add_argument(
+			'--initial-delay', type=float, default=0.1,
+			help='Seconds to wait after the first failed attempt',
+			)
+		parser.add_argument(
+			'--max-delay', type=float, default=5,
+			help='Upper bound of the wait between two attempts',
+			)
+
+
+	def probe(self, alias):
+		"""Opens a connection and runs a trivial query"""
+		connection = connections[alias]
+		try:
+			connection.ensure_connection()
+			with connection.cursor() as cursor:
+				cursor.execute('SELECT 1')
+		except OperationalError:
+			connection.close()
+			raise
 
-		while not db_conn:
+
+	def wait_for(self, alias, deadline, initial_delay, max_delay):
+		"""Probes the database with exponential backoff and jitter"""
+		started = time.monotonic()
+		attempt = 0
+		while True:
+			attempt += 1
 			try:
-				db_conn = connections['default']
+				self.probe(alias)
 			except OperationalError:
-				self.stdout.write('Database will be starting in one second....')
-				time.sleep(1)
+				delay = min(max_delay, initial_delay * 2 ** (attempt - 1))
+				delay = random.uniform(delay / 2, delay)
+				if deadline is not None and time.monotonic() + delay > deadline:
+					raise CommandError(
+						f'Database "{alias}" is unavailable after {attempt} attempts '
+						f'({time.monotonic() - started:.2f}s)'
+						)
+				self.stdout.write(f'Database will be starting in {delay:.2f} seconds....')
+				time.sleep(delay)
+			else:
+				return attempt, time.monotonic() - started
+
+
+	def handle(self, *args, **options):
+		"""It handles our command"""
+		self.stdout.write('Database is starting.....')
+		deadline = None
+		if options['timeout']:
+			deadline = time.monotonic() + options['timeout']
 
+		for alias in options['databases'] or ['default']:
+			attempts, elapsed = self.wait_for(
+				alias,
+				deadline,
+				options['initial_delay'],
+				options['max_delay']
+				)
+			self.stdout.write(
+				f'Database "{alias}" is available after {attempts} attempts ({elapsed:.2f}s)'
+				)
 
 		self.stdout.write(self.style.SUCCESS('Database has started successfully!'))
-			
\ No newline at end of file
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.2 on 2026-10-18 19:37
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+BACKFILL_SQL = """
+UPDATE core_recipe r SET search_vector =
+    setweight(to_tsvector('english', r.title), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(i.name, ' ')
+        FROM core_ingredients i
+        JOIN core_recipe_ingredients ri ON ri.ingredients_id = i.id
+        WHERE ri.recipe_id = r.id
+    ), '')), 'B')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """Builds the vectors and their GIN index on PostgreSQL only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(BACKFILL_SQL)
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_vector_idx '
+        'ON core_recipe USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX core_recipe_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
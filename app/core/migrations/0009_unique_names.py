@@ -0,0 +1,79 @@
+from django.db import migrations
+from django.db.models.functions import Lower
+
+
+BATCH_SIZE = 500
+
+
+def _chunks(values):
+    values = list(values)
+    for offset in range(0, len(values), BATCH_SIZE):
+        yield values[offset:offset + BATCH_SIZE]
+
+
+def _merge(apps, model_name, field_name):
+    """Merges the objects of a user whose names only differ by case
+
+    The oldest object of every group is kept, the links of the others are
+    moved to it unless the recipe is already linked to it.
+    """
+    model = apps.get_model('core', model_name)
+    through = apps.get_model('core', 'recipe')._meta.get_field(field_name).remote_field.through
+    target = f'{model_name.lower()}_id'
+
+    keep = {}
+    replacements = {}
+    rows = model.objects.annotate(name_key=Lower('name')).order_by('pk')
+    for pk, user_id, name_key in rows.values_list('pk', 'user_id', 'name_key').iterator():
+        kept = keep.setdefault((user_id, name_key), pk)
+        if kept != pk:
+            replacements[pk] = kept
+    if not replacements:
+        return
+
+    links = set()
+    for pks in _chunks(set(replacements.values())):
+        links.update(through.objects.filter(
+            **{f'{target}__in': pks}
+        ).values_list('recipe_id', target))
+
+    new_links = []
+    for pks in _chunks(replacements):
+        for recipe_id, pk in through.objects.filter(
+            **{f'{target}__in': pks}
+        ).values_list('recipe_id', target):
+            link = (recipe_id, replacements[pk])
+            if link not in links:
+                links.add(link)
+                new_links.append(through(recipe_id=recipe_id, **{target: link[1]}))
+    through.objects.bulk_create(new_links, batch_size=BATCH_SIZE)
+
+    for pks in _chunks(replacements):
+        through.objects.filter(**{f'{target}__in': pks}).delete()
+        model.objects.filter(pk__in=pks).delete()
+
+
+def merge_duplicates(apps, schema_editor):
+    _merge(apps, 'Tag', 'tags')
+    _merge(apps, 'Ingredients', 'ingredients')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX core_tag_user_lower_name_uniq '
+            'ON core_tag (user_id, LOWER(name));',
+            'DROP INDEX IF EXISTS core_tag_user_lower_name_uniq;',
+        ),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX core_ingredients_user_lower_name_uniq '
+            'ON core_ingredients (user_id, LOWER(name));',
+            'DROP INDEX IF EXISTS core_ingredients_user_lower_name_uniq;',
+        ),
+    ]
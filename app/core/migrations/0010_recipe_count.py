@@ -0,0 +1,60 @@
+# Generated by Django 2.2.2 on 2026-10-18 19:54
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    recipe = apps.get_model('core', 'recipe')
+    for model_name, field_name in (('Tag', 'tags'), ('Ingredients', 'ingredients')):
+        field = recipe._meta.get_field(field_name)
+        target = field.m2m_reverse_field_name()
+        links = field.remote_field.through.objects.filter(
+            **{target: OuterRef('pk')}
+        ).order_by().values(target).annotate(count=Count('pk')).values('count')
+        apps.get_model('core', model_name).objects.update(recipe_count=Coalesce(
+            Subquery(links, output_field=IntegerField()),
+            Value(0),
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_unique_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredients',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ingredients',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='core_ingredient_user_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='core_tag_user_usage_idx'),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+        # SQLite rebuilds the tables to add the columns, dropping the
+        # expression indexes of 0009 along the way.
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX IF NOT EXISTS core_tag_user_lower_name_uniq '
+            'ON core_tag (user_id, LOWER(name));',
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX IF NOT EXISTS core_ingredients_user_lower_name_uniq '
+            'ON core_ingredients (user_id, LOWER(name));',
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -5,6 +5,7 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
 from django.contrib.auth.models import BaseUserManager
+from django.contrib.postgres.search import SearchVectorField
 # Create your models here.
 
 
@@ -60,11 +61,20 @@ class CustomUserModel(AbstractBaseUser, PermissionsMixin):
 
 class Tag(models.Model):
 
+	# Unique per user regardless of case, with an index on (user_id, LOWER(name)).
 	name = models.CharField(max_length=255)
 	user = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
 		on_delete=models.CASCADE,
 		)
+	# Maintained by the recipe signals and bulk writers, see recipe.usage.
+	recipe_count = models.PositiveIntegerField(default=0, editable=False)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['user', 'recipe_count', 'id'], name='core_tag_user_usage_idx'),
+		]
 
 	def __str__(self):
 		"""Returns the string representation"""
@@ -74,11 +84,20 @@ class Tag(models.Model):
 
 class Ingredients(models.Model):
 
+	# Unique per user regardless of case, with an index on (user_id, LOWER(name)).
 	name = models.CharField(max_length=255)
 	user = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
 		on_delete=models.CASCADE
 		)
+	# Maintained by the recipe signals and bulk writers, see recipe.usage.
+	recipe_count = models.PositiveIntegerField(default=0, editable=False)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['user', 'recipe_count', 'id'], name='core_ingredient_user_usage_idx'),
+		]
 
 	def __str__(self):
 		"""Returns the string representation"""
@@ -99,7 +118,13 @@ class recipe(models.Model):
 	ingredients = models.ManyToManyField('Ingredients')
 	tags = models.ManyToManyField('Tag')
 	image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+	updated_at = models.DateTimeField(auto_now=True)
+	search_vector = SearchVectorField(null=True, editable=False)
 
+	class Meta:
+		indexes = [
+			models.Index(fields=['user', 'id'], name='core_recipe_user_id_idx'),
+		]
 
 	def __str__(self):
 		"""Returns the string representation"""
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+PERCENTILES = (50, 90, 99)
+
+
+
+class ProfileStore:
+	"""Keeps the latest samples of every endpoint of this process"""
+
+	def __init__(self, max_samples):
+		self.max_samples = max_samples
+		self._samples = {}
+		self._lock = threading.Lock()
+
+	def record(self, endpoint, wall, queries, db_time):
+		"""Adds a sample, dropping the oldest one past the limit"""
+		with self._lock:
+			samples = self._samples.get(endpoint)
+			if samples is None:
+				samples = self._samples[endpoint] = deque(maxlen=self.max_samples)
+			samples.append((wall, queries, db_time))
+
+	def clear(self):
+		"""Drops every sample"""
+		with self._lock:
+			self._samples.clear()
+
+	def report(self):
+		"""Returns the percentiles of every endpoint, slowest first"""
+		with self._lock:
+			samples = {endpoint: list(rows) for endpoint, rows in self._samples.items()}
+
+		report = {}
+		for endpoint, rows in samples.items():
+			walls, queries, db_times = zip(*rows)
+			report[endpoint] = {
+				'count': len(rows),
+				'wall_ms': percentiles(walls, 1000),
+				'db_ms': percentiles(db_times, 1000),
+				'queries': percentiles(queries),
+				}
+
+		return dict(sorted(
+			report.items(),
+			key=lambda item: item[1]['wall_ms']['p99'],
+			reverse=True
+			))
+
+
+def percentiles(values, scale=1):
+	"""Returns the nearest rank percentiles of the values"""
+	values = sorted(values)
+	result = {}
+	for percentile in PERCENTILES:
+		rank = max(0, -(-percentile * len(values) // 100) - 1)
+		result[f'p{percentile}'] = round(values[rank] * scale, 3)
+
+	return result
+
+
+store = ProfileStore(settings.REQUEST_PROFILING_SAMPLES)
+
+
+def endpoint_name(request, view_func):
+	"""Returns the name of the view, e.g. RecipeViewSet.list or TokenGeneration.post"""
+	cls = getattr(view_func, 'cls', None)
+	if cls is None:
+		return getattr(view_func, '__qualname__', type(view_func).__name__)
+
+	method = request.method.lower()
+	actions = getattr(view_func, 'actions', None) or {}
+
+	return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+
+class QueryRecorder:
+	"""Counts the queries of a request and the time spent running them"""
+
+	def __init__(self):
+		self.count = 0
+		self.duration = 0.0
+
+	def __call__(self, execute, sql, params, many, context):
+		started = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.count += 1
+			self.duration += time.perf_counter() - started
+
+
+
+class ProfilingMiddleware:
+	"""Records the wall time, query count and database time of every view
+
+	The timings are sent in a Server-Timing header and kept in the process
+	wide store. The middleware removes itself unless REQUEST_PROFILING is
+	set, so it costs nothing when profiling is off.
+	"""
+
+	def __init__(self, get_response):
+		if not settings.REQUEST_PROFILING:
+			raise MiddlewareNotUsed
+		self.get_response = get_response
+
+	def __call__(self, request):
+		recorder = QueryRecorder()
+		started = time.perf_counter()
+		with ExitStack() as stack:
+			for connection in connections.all():
+				stack.enter_context(connection.execute_wrapper(recorder))
+			response = self.get_response(request)
+		wall = time.perf_counter() - started
+
+		endpoint = getattr(request, '_profiling_endpoint', None)
+		if endpoint is not None:
+			store.record(endpoint, wall, recorder.count, recorder.duration)
+		response['Server-Timing'] = (
+			f'app;dur={wall * 1000:.3f}, '
+			f'db;dur={recorder.duration * 1000:.3f};desc="{recorder.count} queries"'
+			)
+
+		return response
+
+	def process_view(self, request, view_func, view_args, view_kwargs):
+		"""Remembers which endpoint handles the request"""
+		request._profiling_endpoint = endpoint_name(request, view_func)
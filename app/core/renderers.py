@@ -0,0 +1,47 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+
+# Converts the types orjson leaves to the caller the way DRF does.
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+	"""Encodes data to compact UTF-8 JSON bytes, like JSONRenderer"""
+	if orjson is None:
+		return JSONRenderer().render(data)
+
+	content = orjson.dumps(
+		data,
+		default=_encoder.default,
+		option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+		)
+	# Escaped by JSONRenderer too, since they end lines in JavaScript.
+	return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+	"""Renders compact JSON with orjson when it's installed
+
+	Decimals, lazy strings and dates are handed to DRF's encoder, so the
+	output is the same as JSONRenderer's. Indented or ASCII only output,
+	and everything without orjson, falls back to JSONRenderer.
+	"""
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		renderer_context = renderer_context or {}
+		if (
+			orjson is None
+			or data is None
+			or self.ensure_ascii
+			or not self.compact
+			or self.get_indent(accepted_media_type, renderer_context)
+			):
+			return super().render(data, accepted_media_type, renderer_context)
+
+		return dumps(data)
@@ -0,0 +1,131 @@
+import mimetypes
+import posixpath
+import tempfile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import File
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+
+
+# Downloads larger than this spill from memory to a temporary file.
+SPOOL_SIZE = 10 * 1024 * 1024
+# Error codes S3 compatible services answer for a missing key.
+MISSING_CODES = ('404', 'NoSuchKey', 'NotFound')
+
+
+def make_client(options):
+	"""Returns an S3 client for the storage options"""
+	try:
+		import boto3
+	except ImportError:
+		raise ImproperlyConfigured('S3Storage requires the boto3 package')
+
+	return boto3.client(
+		's3',
+		endpoint_url=options['ENDPOINT_URL'] or None,
+		region_name=options['REGION'] or None,
+		aws_access_key_id=options['ACCESS_KEY_ID'] or None,
+		aws_secret_access_key=options['SECRET_ACCESS_KEY'] or None,
+		)
+
+
+def _is_missing(exc):
+	"""Returns whether a client error means the key doesn't exist"""
+	response = getattr(exc, 'response', None) or {}
+
+	return str(response.get('Error', {}).get('Code')) in MISSING_CODES
+
+
+
+@deconstructible
+class S3Storage(Storage):
+	"""Stores files in an S3 compatible bucket
+
+	Files are uploaded and read by the workers, but served straight from
+	the bucket: url() returns a PUBLIC_URL based address when one is set,
+	a presigned url otherwise. The options default to settings.S3_STORAGE.
+	"""
+
+	def __init__(self, **options):
+		self.options = dict(settings.S3_STORAGE, **options)
+		self._client = None
+
+
+	@property
+	def client(self):
+		if self._client is None:
+			self._client = make_client(self.options)
+
+		return self._client
+
+
+	def _key(self, name):
+		"""Returns the bucket key of a storage name"""
+		return posixpath.join(self.options['LOCATION'], name.replace('\\', '/')).lstrip('/')
+
+
+	def _open(self, name, mode='rb'):
+		if 'w' in mode or 'a' in mode:
+			raise ValueError('S3Storage files can only be opened for reading')
+
+		f = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+		try:
+			self.client.download_fileobj(self.options['BUCKET'], self._key(name), f)
+		except Exception as exc:
+			f.close()
+			if _is_missing(exc):
+				raise FileNotFoundError(name)
+			raise
+		f.seek(0)
+
+		return File(f, name=name)
+
+
+	def _save(self, name, content):
+		content.seek(0)
+		content_type = getattr(content, 'content_type', None) or mimetypes.guess_type(name)[0]
+		extra = {'ContentType': content_type} if content_type else {}
+		self.client.upload_fileobj(content, self.options['BUCKET'], self._key(name), ExtraArgs=extra)
+
+		return name
+
+
+	def _head(self, name):
+		"""Returns the metadata of a key, or None when it doesn't exist"""
+		try:
+			return self.client.head_object(Bucket=self.options['BUCKET'], Key=self._key(name))
+		except Exception as exc:
+			if _is_missing(exc):
+				return None
+			raise
+
+
+	def exists(self, name):
+		return self._head(name) is not None
+
+
+	def size(self, name):
+		head = self._head(name)
+		if head is None:
+			raise FileNotFoundError(name)
+
+		return head['ContentLength']
+
+
+	def delete(self, name):
+		self.client.delete_object(Bucket=self.options['BUCKET'], Key=self._key(name))
+
+
+	def url(self, name):
+		public_url = self.options['PUBLIC_URL']
+		if public_url:
+			return f'{public_url.rstrip("/")}/{quote(self._key(name))}'
+
+		return self.client.generate_presigned_url(
+			'get_object',
+			Params={'Bucket': self.options['BUCKET'], 'Key': self._key(name)},
+			ExpiresIn=self.options['URL_EXPIRE']
+			)
@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from rest_framework import status
+from rest_framework.response import Response
+
+
+
+class BenchmarkApiTest(TestCase):
+	"""Tests for the benchmark_api command"""
+
+	def run_benchmark(self, **options):
+		"""Runs the benchmark on the current database and returns its results"""
+		with tempfile.TemporaryDirectory() as directory:
+			output = os.path.join(directory, 'results.json')
+			call_command(
+				'benchmark_api',
+				current_database=True,
+				recipes=20,
+				requests=3,
+				warmup=1,
+				output=output,
+				stderr=io.StringIO(),
+				**options
+				)
+			with open(output) as f:
+				return json.load(f)
+
+
+	def test_benchmark_api(self):
+		"""Test that the benchmark writes the timings of the chosen endpoints"""
+		results = self.run_benchmark(
+			endpoints=['recipe-list', 'user-me'],
+			compare=['authentication'],
+			encode=50
+			)
+
+		self.assertEqual(set(results['endpoints']), {'recipe-list', 'user-me'})
+		self.assertEqual(results['endpoints']['recipe-list']['errors'], 0)
+		self.assertEqual(results['endpoints']['recipe-list']['requests'], 3)
+		self.assertIn('p99_ms', results['endpoints']['user-me'])
+		self.assertEqual(
+			set(results['comparisons']['authentication']),
+			{'cached', 'database'}
+			)
+		self.assertGreater(results['assigned']['tag'], 0)
+		self.assertGreater(results['assigned']['ingredients'], 0)
+		self.assertEqual(results['encoding']['recipes'], 50)
+		self.assertEqual(
+			results['encoding']['fast']['bytes'],
+			results['encoding']['stdlib']['bytes']
+			)
+
+
+	def test_benchmark_api_can_run_again(self):
+		"""Test that the seeded objects are deleted and don't clash on the next run"""
+		for run in range(2):
+			results = self.run_benchmark(endpoints=['user-create', 'tag-list'])
+			self.assertEqual(results['endpoints']['user-create']['errors'], 0)
+			self.assertFalse(get_user_model().objects.exists())
+
+
+	def test_benchmark_api_fails_on_error_responses(self):
+		"""Test that timings of error responses aren't reported as a success"""
+		def bad_request(self, request, *args, **kwargs):
+			return Response(status=status.HTTP_400_BAD_REQUEST)
+
+		with patch('recipe.views.TagViewSet.list', bad_request):
+			with self.assertRaisesRegex(CommandError, 'tag-list'):
+				self.run_benchmark(endpoints=['tag-list'])
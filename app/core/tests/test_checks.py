@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase, override_settings
+
+from core import checks
+
+
+SHARED_CACHES = {'default': {
+	'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+	'LOCATION': 'cache',
+	}}
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+	"""Tests for the warning about a cache local to each process"""
+
+	@override_settings(DEBUG=False)
+	def test_local_memory_cache_is_reported(self):
+		"""Test that a process local cache is reported outside DEBUG"""
+		errors = checks.check_shared_cache(None)
+
+		self.assertEqual([error.id for error in errors], ['core.W001'])
+
+
+	@override_settings(DEBUG=True)
+	def test_local_memory_cache_is_allowed_in_debug(self):
+		"""Test that development setups aren't warned"""
+		self.assertEqual(checks.check_shared_cache(None), [])
+
+
+	@override_settings(DEBUG=False, CACHES=SHARED_CACHES)
+	def test_shared_cache_passes(self):
+		"""Test that a shared backend isn't reported"""
+		self.assertEqual(checks.check_shared_cache(None), [])
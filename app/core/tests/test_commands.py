@@ -1,5 +1,7 @@
-from unittest.mock import patch
+import io
+from unittest.mock import patch, MagicMock
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
@@ -10,16 +12,61 @@ class CommandTest(TestCase):
 	def test_for_wait_for_db_command(self):
 		"""Test for the wait_for_db_command"""
 		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-			gi.return_value = True
-			call_command('wait_for_db')
+			gi.return_value = MagicMock()
+			out = io.StringIO()
+			call_command('wait_for_db', stdout=out)
 
 			self.assertEqual(gi.call_count, 1)
+			gi.return_value.ensure_connection.assert_called_once_with()
+			gi.return_value.cursor.return_value.__enter__.return_value \
+				.execute.assert_called_once_with('SELECT 1')
+			self.assertIn('Database "default" is available after 1 attempts', out.getvalue())
 
 	@patch('time.sleep', return_value=True)
 	def test_for_db(self, ts):
 		"""Test for wait_for_db_command"""
 		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-			gi.side_effect = [OperationalError] * 5 + [True]
-			call_command('wait_for_db')
+			gi.return_value.ensure_connection.side_effect = [OperationalError] * 5 + [None]
+			out = io.StringIO()
+			call_command('wait_for_db', stdout=out)
 
-			self.assertEqual(gi.call_count, 6)
+			self.assertEqual(gi.return_value.ensure_connection.call_count, 6)
+			self.assertEqual(ts.call_count, 5)
+			self.assertEqual(gi.return_value.close.call_count, 5)
+			self.assertEqual(out.getvalue().count('Database will be starting in'), 5)
+			self.assertIn('available after 6 attempts', out.getvalue())
+
+	@patch('time.sleep', return_value=True)
+	def test_for_db_backoff(self, ts):
+		"""Test that the wait grows exponentially up to the maximum"""
+		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+			gi.return_value.ensure_connection.side_effect = [OperationalError] * 6 + [None]
+			call_command('wait_for_db', initial_delay=1, max_delay=8, stdout=io.StringIO())
+
+		delays = [call[0][0] for call in ts.call_args_list]
+		for delay, upper in zip(delays, [1, 2, 4, 8, 8, 8]):
+			self.assertGreaterEqual(delay, upper / 2)
+			self.assertLessEqual(delay, upper)
+
+	@patch('time.sleep', return_value=True)
+	@patch('core.management.commands.wait_for_db.time.monotonic')
+	def test_for_db_timeout(self, monotonic, ts):
+		"""Test that the command gives up after the timeout"""
+		monotonic.side_effect = range(0, 1000, 2)
+		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+			gi.return_value.ensure_connection.side_effect = OperationalError
+
+			with self.assertRaises(CommandError):
+				call_command('wait_for_db', timeout=10, initial_delay=1, stdout=io.StringIO())
+
+	def test_for_multiple_databases(self):
+		"""Test that every given alias is probed"""
+		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+			out = io.StringIO()
+			call_command('wait_for_db', databases=['default', 'replica'], stdout=out)
+
+			self.assertEqual(
+				[call[0][0] for call in gi.call_args_list],
+				['default', 'replica']
+				)
+			self.assertIn('Database "replica" is available', out.getvalue())
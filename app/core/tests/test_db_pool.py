@@ -0,0 +1,86 @@
+from unittest.mock import patch, MagicMock
+
+from django.test import SimpleTestCase
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from core.db.backends.pooled_postgresql.pool import ConnectionPool, PoolTimeout
+
+
+def fake_connection():
+	"""Returns a stand-in for a psycopg2 connection"""
+	connection = MagicMock()
+	connection.closed = 0
+	connection.get_transaction_status.return_value = TRANSACTION_STATUS_IDLE
+
+	return connection
+
+
+
+class ConnectionPoolTest(SimpleTestCase):
+	"""Tests for the pooled connections"""
+
+	def setUp(self):
+		self.pool = ConnectionPool(max_size=2, max_lifetime=60, timeout=0.01)
+
+
+	def test_connections_are_reused(self):
+		"""Test that a returned connection is handed out again"""
+		connect = MagicMock(side_effect=fake_connection)
+
+		connection = self.pool.checkout(connect)
+		self.pool.checkin(connection)
+
+		self.assertIs(self.pool.checkout(connect), connection)
+		self.assertEqual(connect.call_count, 1)
+		connection.cursor.return_value.__enter__.return_value \
+			.execute.assert_called_once_with('SELECT 1')
+
+
+	def test_pool_is_bounded(self):
+		"""Test that checking out past the limit times out"""
+		connect = MagicMock(side_effect=fake_connection)
+		self.pool.checkout(connect)
+		self.pool.checkout(connect)
+
+		with self.assertRaises(PoolTimeout):
+			self.pool.checkout(connect)
+
+
+	def test_broken_connections_are_replaced(self):
+		"""Test that a connection failing the health check is discarded"""
+		connect = MagicMock(side_effect=fake_connection)
+		broken = self.pool.checkout(connect)
+		self.pool.checkin(broken)
+		broken.cursor.side_effect = Exception('server closed the connection')
+
+		connection = self.pool.checkout(connect)
+
+		self.assertIsNot(connection, broken)
+		broken.close.assert_called_once_with()
+		# The slot of the broken connection was freed.
+		self.pool.checkout(connect)
+
+
+	def test_old_connections_are_replaced(self):
+		"""Test that a connection past its lifetime is closed"""
+		connect = MagicMock(side_effect=fake_connection)
+		with patch('time.monotonic', return_value=0):
+			old = self.pool.checkout(connect)
+			self.pool.checkin(old)
+
+		with patch('time.monotonic', return_value=120):
+			connection = self.pool.checkout(connect)
+
+		self.assertIsNot(connection, old)
+		old.close.assert_called_once_with()
+
+
+	def test_open_transactions_are_rolled_back(self):
+		"""Test that a connection is returned without its transaction"""
+		connection = self.pool.checkout(fake_connection)
+		connection.get_transaction_status.return_value = TRANSACTION_STATUS_INTRANS
+
+		self.pool.checkin(connection)
+
+		connection.rollback.assert_called_with()
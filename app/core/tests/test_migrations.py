@@ -0,0 +1,55 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MergeDuplicateNamesTest(TransactionTestCase):
+	"""Tests for the migration merging tags and ingredients with the same name"""
+
+	migrate_from = [('core', '0008_recipe_search_vector')]
+	migrate_to = [('core', '0009_unique_names')]
+
+	def migrate(self, targets):
+		"""Migrates the database and returns the models at the targets"""
+		executor = MigrationExecutor(connection)
+		executor.loader.build_graph()
+		executor.migrate(targets)
+
+		return executor.loader.project_state(targets).apps
+
+
+	def tearDown(self):
+
+		executor = MigrationExecutor(connection)
+		self.migrate(executor.loader.graph.leaf_nodes())
+
+
+	def test_duplicates_are_merged(self):
+		"""Test that links are moved to the oldest object of the same name"""
+		apps = self.migrate(self.migrate_from)
+		user = apps.get_model('core', 'CustomUserModel').objects.create(
+			email='kotechashubham94@gmail.com'
+			)
+		Tag = apps.get_model('core', 'Tag')
+		recipe = apps.get_model('core', 'recipe')
+		vegan = Tag.objects.create(user=user, name='Vegan')
+		duplicate = Tag.objects.create(user=user, name='vegan')
+		dessert = Tag.objects.create(user=user, name='Dessert')
+		soup = recipe.objects.create(user=user, title='Soup', time_minutes=10, price=5)
+		soup.tags.add(vegan, duplicate)
+		cake = recipe.objects.create(user=user, title='Cake', time_minutes=10, price=5)
+		cake.tags.add(duplicate, dessert)
+
+		apps = self.migrate(self.migrate_to)
+
+		Tag = apps.get_model('core', 'Tag')
+		recipe = apps.get_model('core', 'recipe')
+		self.assertEqual(
+			list(Tag.objects.order_by('pk').values_list('pk', flat=True)),
+			[vegan.pk, dessert.pk]
+			)
+		self.assertEqual(list(recipe.objects.get(pk=soup.pk).tags.all()), [Tag.objects.get(pk=vegan.pk)])
+		self.assertEqual(
+			set(recipe.objects.get(pk=cake.pk).tags.values_list('pk', flat=True)),
+			{vegan.pk, dessert.pk}
+			)
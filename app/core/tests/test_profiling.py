@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import profiling
+
+
+PROFILING_URL = reverse('profiling')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProfilingMiddlewareTest(TestCase):
+	"""Tests for the request profiling"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		profiling.store.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+
+	def test_requests_are_recorded_per_action(self):
+		"""Test that the timings are recorded under the viewset action"""
+		res = self.client.get(RECIPES_URL)
+
+		self.assertIn('db;dur=', res['Server-Timing'])
+		report = profiling.store.report()
+		self.assertEqual(report['RecipeViewSet.list']['count'], 1)
+		self.assertGreater(report['RecipeViewSet.list']['queries']['p50'], 0)
+
+
+	def test_report_requires_staff(self):
+		"""Test that only staff users can read the report"""
+		res = self.client.get(PROFILING_URL)
+		self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+		self.user.is_staff = True
+		self.user.save()
+		self.client.get(RECIPES_URL)
+		res = self.client.get(PROFILING_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertIn('RecipeViewSet.list', res.data['endpoints'])
+
+
+	@override_settings(REQUEST_PROFILING=False)
+	def test_disabled_profiling_is_skipped(self):
+		"""Test that nothing is recorded when profiling is off"""
+		res = self.client.get(RECIPES_URL)
+
+		self.assertFalse(res.has_header('Server-Timing'))
+		self.assertEqual(profiling.store.report(), {})
+
+
+	def test_percentiles(self):
+		"""Test the nearest rank percentiles"""
+		self.assertEqual(
+			profiling.percentiles(range(1, 101)),
+			{'p50':50, 'p90':90, 'p99':99}
+			)
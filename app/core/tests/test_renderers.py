@@ -0,0 +1,67 @@
+import datetime
+import io
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+DATA = OrderedDict([
+	('id', 1),
+	('title', 'Soupe à l oignon\u2028'),
+	('price', Decimal('5.50')),
+	('message', _('Invalid cursor')),
+	('updated_at', datetime.datetime(2020, 2, 6, 8, 4, 1, 123456, tzinfo=timezone.utc)),
+	('tags', [OrderedDict([('id', 2), ('name', 'Vegan')])]),
+	(3, None),
+	])
+
+
+class FastJSONRendererTest(TestCase):
+	"""Tests for the orjson backed renderer and parser"""
+
+	def test_output_matches_json_renderer(self):
+		"""Test that the output is the same as DRF's renderer"""
+		expected = JSONRenderer().render(DATA)
+
+		self.assertEqual(FastJSONRenderer().render(DATA), expected)
+		with patch('core.renderers.orjson', None):
+			self.assertEqual(FastJSONRenderer().render(DATA), expected)
+
+
+	def test_indented_output_falls_back(self):
+		"""Test that indented output is rendered by JSONRenderer"""
+		media_type = 'application/json; indent=4'
+
+		self.assertEqual(
+			FastJSONRenderer().render(DATA, media_type),
+			JSONRenderer().render(DATA, media_type)
+			)
+
+
+	def test_parse(self):
+		"""Test that the parser reads what the renderer wrote"""
+		content = FastJSONRenderer().render({'name': 'Vegan', 'ids': [1, 2]})
+
+		for orjson in (parsers.orjson, None):
+			with patch('core.parsers.orjson', orjson):
+				data = FastJSONParser().parse(io.BytesIO(content))
+			self.assertEqual(data, {'name': 'Vegan', 'ids': [1, 2]})
+
+
+	def test_invalid_json_raises_parse_error(self):
+		"""Test that invalid content is a parse error, like JSONParser's"""
+		for parser in (FastJSONParser(), JSONParser()):
+			with self.assertRaises(ParseError):
+				parser.parse(io.BytesIO(b'{"name": '))
@@ -0,0 +1,207 @@
+import io
+import os
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import checks
+from core.models import recipe
+from core.storage import S3Storage
+
+
+class ClientError(Exception):
+	"""Error raised by the fake client, shaped like botocore's"""
+
+	def __init__(self, code):
+		super().__init__(code)
+		self.response = {'Error': {'Code': code}}
+
+
+
+class FakeS3Client:
+	"""In memory stand-in for the boto3 S3 client"""
+
+	def __init__(self):
+		self.objects = {}
+
+	def upload_fileobj(self, f, bucket, key, ExtraArgs=None):
+		self.objects[(bucket, key)] = (f.read(), dict(ExtraArgs or {}))
+
+	def download_fileobj(self, bucket, key, f):
+		if (bucket, key) not in self.objects:
+			raise ClientError('404')
+		f.write(self.objects[(bucket, key)][0])
+
+	def head_object(self, Bucket, Key):
+		if (Bucket, Key) not in self.objects:
+			raise ClientError('404')
+		return {'ContentLength': len(self.objects[(Bucket, Key)][0])}
+
+	def delete_object(self, Bucket, Key):
+		self.objects.pop((Bucket, Key), None)
+
+	def generate_presigned_url(self, method, Params, ExpiresIn):
+		return f'https://s3.example.com/{Params["Bucket"]}/{Params["Key"]}?expires={ExpiresIn}'
+
+
+
+S3_OPTIONS = {
+	'BUCKET': 'recipes',
+	'ENDPOINT_URL': '',
+	'REGION': '',
+	'ACCESS_KEY_ID': '',
+	'SECRET_ACCESS_KEY': '',
+	'LOCATION': 'media',
+	'PUBLIC_URL': '',
+	'URL_EXPIRE': 60,
+}
+
+
+@override_settings(S3_STORAGE=S3_OPTIONS)
+class S3StorageTest(TestCase):
+	"""Tests for the S3 compatible storage"""
+
+	def setUp(self):
+
+		self.client = FakeS3Client()
+		patcher = patch('core.storage.make_client', return_value=self.client)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+
+	def test_save_open_and_delete(self):
+		"""Test that files are stored under the location prefix"""
+		storage = S3Storage()
+
+		name = storage.save('uploads/recipe/a.png', ContentFile(b'image', name='a.png'))
+
+		self.assertEqual(name, 'uploads/recipe/a.png')
+		content, extra = self.client.objects[('recipes', 'media/uploads/recipe/a.png')]
+		self.assertEqual(content, b'image')
+		self.assertEqual(extra['ContentType'], 'image/png')
+		self.assertTrue(storage.exists(name))
+		self.assertEqual(storage.size(name), 5)
+		with storage.open(name) as f:
+			self.assertEqual(f.read(), b'image')
+
+		storage.delete(name)
+		self.assertFalse(storage.exists(name))
+		with self.assertRaises(FileNotFoundError):
+			storage.open(name)
+
+
+	def test_urls_point_at_the_bucket(self):
+		"""Test that urls are presigned unless a public url is set"""
+		self.assertEqual(
+			S3Storage().url('a b.png'),
+			'https://s3.example.com/recipes/media/a b.png?expires=60'
+			)
+		self.assertEqual(
+			S3Storage(PUBLIC_URL='https://cdn.example.com/').url('a b.png'),
+			'https://cdn.example.com/media/a%20b.png'
+			)
+
+
+	@override_settings(DEFAULT_FILE_STORAGE='core.storage.S3Storage')
+	def test_uploaded_images_are_stored_in_the_bucket(self):
+		"""Test that recipe images go to the default storage"""
+		user = get_user_model().objects.create_user('kotechashubham94@gmail.com', 'password1')
+		soup = recipe.objects.create(user=user, title='Soup', time_minutes=10, price=5.00)
+		api = APIClient()
+		api.force_authenticate(user=user)
+		image = io.BytesIO()
+		Image.new('RGB', (10, 10)).save(image, format='PNG')
+		image.name = 'soup.png'
+		image.seek(0)
+
+		res = api.post(
+			reverse('recipe:recipe-upload-image', args=[soup.id]),
+			{'image': image},
+			format='multipart'
+			)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		soup.refresh_from_db()
+		self.assertIn(('recipes', f'media/{soup.image.name}'), self.client.objects)
+		self.assertTrue(res.data['image'].startswith('https://s3.example.com/recipes/media/'))
+
+
+
+class ServeMediaTest(TestCase):
+	"""Tests for handing media files over to the web server"""
+
+	def setUp(self):
+
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		os.makedirs(os.path.join(directory.name, 'uploads'))
+		with open(os.path.join(directory.name, 'uploads', 'a.png'), 'wb') as f:
+			f.write(b'image')
+		settings = override_settings(MEDIA_ROOT=directory.name)
+		settings.enable()
+		self.addCleanup(settings.disable)
+		self.root = directory.name
+		self.url = reverse('media', args=['uploads/a.png'])
+
+
+	@override_settings(MEDIA_SERVE='x-accel-redirect')
+	def test_x_accel_redirect(self):
+		"""Test that nginx is told which internal location to serve"""
+		res = self.client.get(self.url)
+
+		self.assertEqual(res['X-Accel-Redirect'], '/protected-media/uploads/a.png')
+		self.assertEqual(res['Content-Type'], 'image/png')
+		self.assertEqual(res.content, b'')
+
+
+	@override_settings(MEDIA_SERVE='x-sendfile')
+	def test_x_sendfile(self):
+		"""Test that the web server is given the file path"""
+		res = self.client.get(self.url)
+
+		self.assertEqual(res['X-Sendfile'], os.path.join(self.root, 'uploads', 'a.png'))
+		self.assertEqual(res.content, b'')
+
+
+	@override_settings(MEDIA_SERVE='x-accel-redirect')
+	def test_missing_and_outside_files_are_not_found(self):
+		"""Test that only existing files under MEDIA_ROOT are handed over"""
+		for path in ('uploads/b.png', '../etc/passwd', 'uploads'):
+			res = self.client.get(reverse('media', args=[path]))
+			self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+	@override_settings(MEDIA_SERVE='django')
+	def test_django_serves_the_file(self):
+		"""Test that the development mode streams the file"""
+		res = self.client.get(self.url)
+
+		self.assertEqual(b''.join(res.streaming_content), b'image')
+
+
+	@override_settings(MEDIA_SERVE='')
+	def test_media_is_not_served_without_a_mode(self):
+		"""Test that media urls are not found unless a mode is picked"""
+		res = self.client.get(self.url)
+
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+	@override_settings(MEDIA_SERVE='x-accel')
+	def test_unknown_mode_is_rejected(self):
+		"""Test that a mistyped mode fails the checks instead of being guessed"""
+		errors = checks.check_media_serve(None)
+
+		self.assertEqual([error.id for error in errors], ['core.E001'])
+		with self.assertRaises(ImproperlyConfigured):
+			self.client.get(self.url)
@@ -0,0 +1,75 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.http import Http404, HttpResponse
+from django.utils._os import safe_join
+from django.views import static
+
+from rest_framework import permissions, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import profiling
+from user.authentication import CachedTokenAuthentication
+
+
+MEDIA_SERVE_MODES = ('django', 'x-accel-redirect', 'x-sendfile')
+
+
+class ProfilingReport(APIView):
+	"""Reports the latency and query percentiles of every endpoint"""
+	authentication_classes = (CachedTokenAuthentication, SessionAuthentication)
+	permission_classes = (permissions.IsAdminUser,)
+
+	def get(self, request):
+		"""Returns the percentiles recorded by this process"""
+		return Response({
+			'enabled': settings.REQUEST_PROFILING,
+			'endpoints': profiling.store.report(),
+			})
+
+	def delete(self, request):
+		"""Drops the recorded samples"""
+		profiling.store.clear()
+		return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+
+def serve_media(request, path):
+	"""Hands a media file over to the web server
+
+	With MEDIA_SERVE set to x-accel-redirect, nginx serves the file from an
+	internal location mapped to MEDIA_ROOT, e.g.
+
+		location /protected-media/ { internal; alias /vol/web/media/; }
+
+	and with x-sendfile Apache or lighttpd serves it from its path, so the
+	worker only answers with headers. The django mode streams the file
+	itself, for development. Without a mode every media url is a 404.
+	"""
+	if not settings.MEDIA_SERVE:
+		raise Http404
+	if settings.MEDIA_SERVE not in MEDIA_SERVE_MODES:
+		raise ImproperlyConfigured(f'Unknown MEDIA_SERVE mode "{settings.MEDIA_SERVE}"')
+	if settings.MEDIA_SERVE == 'django':
+		return static.serve(request, path, document_root=settings.MEDIA_ROOT)
+
+	try:
+		full_path = safe_join(settings.MEDIA_ROOT, path)
+	except SuspiciousFileOperation:
+		raise Http404
+	if not os.path.isfile(full_path):
+		raise Http404
+
+	response = HttpResponse(
+		content_type=mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+		)
+	if settings.MEDIA_SERVE == 'x-sendfile':
+		response['X-Sendfile'] = full_path
+	elif settings.MEDIA_SERVE == 'x-accel-redirect':
+		response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_LOCATION + quote(path)
+	return response
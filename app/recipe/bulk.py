@@ -0,0 +1,358 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+
+from core.models import Tag, Ingredients, recipe
+from recipe import signals
+from recipe.serializers import TagSerializer, IngredientSerializer, RecipeSerializer
+
+
+MAX_ITEMS = 1000
+BATCH_SIZE = 500
+
+
+class BulkError(Exception):
+	"""Raised with the per-item errors of an invalid bulk payload"""
+
+	def __init__(self, errors):
+		super().__init__(errors)
+		self.errors = errors
+
+
+
+class BulkConflict(BulkError):
+	"""Raised when concurrent changes keep a bulk payload from being saved"""
+
+
+
+class BulkTagSerializer(TagSerializer):
+	"""Validates a tag of a bulk payload"""
+	id = serializers.IntegerField(required=False)
+
+
+
+class BulkIngredientSerializer(IngredientSerializer):
+	"""Validates an ingredient of a bulk payload"""
+	id = serializers.IntegerField(required=False)
+
+
+
+class BulkRecipeSerializer(RecipeSerializer):
+	"""Validates a recipe of a bulk payload without querying its relations"""
+	id = serializers.IntegerField(required=False)
+	ingredients = serializers.ListField(
+		child=serializers.IntegerField(),
+		required=False
+		)
+	tags = serializers.ListField(
+		child=serializers.IntegerField(),
+		required=False
+		)
+
+
+
+def _validate(serializer_class, items):
+	"""Validates every item, returning the validated data and the errors"""
+	if not isinstance(items, list):
+		raise BulkError({'non_field_errors': [_('Expected a list of items.')]})
+	if len(items) > MAX_ITEMS:
+		raise BulkError({'non_field_errors': [
+			_('Ensure there are no more than {} items.').format(MAX_ITEMS)
+			]})
+
+	validated, errors = [], []
+	for item in items:
+		partial = isinstance(item, dict) and 'id' in item
+		serializer = serializer_class(data=item, partial=partial)
+		if serializer.is_valid():
+			validated.append(dict(serializer.validated_data))
+			errors.append({})
+		else:
+			validated.append(None)
+			errors.append(serializer.errors)
+
+	return validated, errors
+
+
+def _owned(model, user, pks):
+	"""Returns the objects of the user among the given primary keys"""
+	if not pks:
+		return {}
+
+	return model.objects.filter(user=user, pk__in=pks).in_bulk()
+
+
+def _check_owned(errors, validated, field, owned):
+	"""Reports the primary keys of a field that the user doesn't own"""
+	for index, data in enumerate(validated):
+		if data is None:
+			continue
+		pks = data.get(field)
+		if pks is None:
+			continue
+		if not isinstance(pks, list):
+			pks = [pks]
+		missing = [pk for pk in pks if pk not in owned]
+		if missing:
+			errors[index][field] = [
+				_('Invalid pk "{}" - object does not exist.').format(pk)
+				for pk in missing
+				]
+
+
+def fold_names(names):
+	"""Returns the names folded by the database's LOWER, keyed by name
+
+	Python's str.lower() disagrees with SQL LOWER() on some characters,
+	'İ' for one, so names are folded by the database like the unique
+	index folds them.
+	"""
+	names = sorted(set(names))
+	keys = {}
+	with connection.cursor() as cursor:
+		for offset in range(0, len(names), BATCH_SIZE):
+			batch = names[offset:offset + BATCH_SIZE]
+			cursor.execute('SELECT {}'.format(', '.join(['LOWER(%s)'] * len(batch))), batch)
+			keys.update(zip(batch, cursor.fetchone()))
+
+	return keys
+
+
+def find_named(model, user, keys):
+	"""Returns the user's objects named by one of the folded names
+
+	The keys come from fold_names, and the objects are keyed by them.
+	"""
+	keys = sorted(set(keys))
+	found = {}
+	for offset in range(0, len(keys), BATCH_SIZE):
+		objs = model.objects.filter(user=user).annotate(
+			name_key=Lower('name')
+			).filter(name_key__in=keys[offset:offset + BATCH_SIZE])
+		for obj in objs:
+			found[obj.name_key] = obj
+
+	return found
+
+
+def get_or_create_named(model, user, data):
+	"""Returns the user's object named like data['name'] in any case, or creates it
+
+	The name is folded by the database on both sides of the lookup, like
+	the unique index, so the lookup agrees with it. When a concurrent
+	request creates the name first, its object is returned. Also returns
+	whether the object was created.
+	"""
+	key = fold_names([data['name']])[data['name']]
+	obj = find_named(model, user, [key]).get(key)
+	if obj is not None:
+		return obj, False
+	try:
+		with transaction.atomic():
+			return model.objects.create(user=user, **data), True
+	except IntegrityError:
+		obj = find_named(model, user, [key]).get(key)
+		if obj is None:
+			raise
+		return obj, False
+
+
+def _check_names(errors, validated, keys, named, model):
+	"""Reports names that would be shared by different objects of the user"""
+	claimed = {}
+	for index, data in enumerate(validated):
+		if not data or 'name' not in data:
+			continue
+		key = keys[data['name']]
+		pk = data.get('id')
+		owner = named.get(key)
+		if pk is not None and owner is not None and owner.pk != pk:
+			conflict = True
+		else:
+			# New objects with the same name are merged, so only renames
+			# can conflict with each other or with new objects.
+			conflict = claimed.setdefault(key, pk) != pk
+		if conflict:
+			errors[index]['name'] = [
+				_('A {} with this name already exists.').format(model._meta.verbose_name)
+				]
+
+
+def insert_objects(model, objs):
+	"""Inserts the objects, making sure their primary keys are set"""
+	if connection.features.can_return_ids_from_bulk_insert:
+		model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+	else:
+		for obj in objs:
+			obj.save(force_insert=True)
+
+
+def _update(model, objs, fields):
+	"""Updates the given fields of the objects"""
+	if not objs:
+		return
+	now = timezone.now()
+	for obj in objs:
+		obj.updated_at = now
+	model.objects.bulk_update(
+		objs,
+		sorted(fields | {'updated_at'}),
+		batch_size=BATCH_SIZE
+		)
+
+
+def save_named(serializer_class, user, items):
+	"""Creates or updates tags or ingredients in a single transaction
+
+	Creating a name the user already has, in any case, returns the
+	existing object instead. Returns the objects and whether any of them
+	was created.
+	"""
+	model = serializer_class.Meta.model
+	try:
+		return _save_named(serializer_class, model, user, items)
+	except IntegrityError:
+		# Another request created one of the names since they were looked
+		# up, looking them up again returns its objects instead.
+		pass
+	try:
+		return _save_named(serializer_class, model, user, items)
+	except IntegrityError:
+		raise BulkConflict({'non_field_errors': [
+			_('The names were changed by another request, try again.')
+			]})
+
+
+def _save_named(serializer_class, model, user, items):
+	"""Validates and saves the items, see save_named"""
+	validated, errors = _validate(serializer_class, items)
+	existing = _owned(
+		model,
+		user,
+		{data['id'] for data in validated if data and 'id' in data}
+		)
+	_check_owned(errors, validated, 'id', existing)
+	keys = fold_names(data['name'] for data in validated if data and 'name' in data)
+	named = find_named(model, user, keys.values())
+	_check_names(errors, validated, keys, named, model)
+	if any(errors):
+		raise BulkError(errors)
+
+	objs, created, updated, fields = [], [], [], set()
+	for data in validated:
+		pk = data.pop('id', None)
+		if pk is None:
+			key = keys[data['name']]
+			obj = named.get(key)
+			if obj is None:
+				obj = named[key] = model(user=user, **data)
+				created.append(obj)
+		else:
+			obj = existing[pk]
+			for field, value in data.items():
+				setattr(obj, field, value)
+			fields.update(data)
+			updated.append(obj)
+		objs.append(obj)
+
+	with transaction.atomic():
+		insert_objects(model, created)
+		_update(model, updated, fields)
+		signals.named_objects_changed(
+			model,
+			user.pk,
+			renamed_ids=[obj.pk for obj in updated]
+			)
+
+	return objs, bool(created)
+
+
+def save_recipes(user, items):
+	"""Creates or updates recipes and their relations in a single transaction
+
+	The referenced tags and ingredients are resolved with one query per
+	type, and the relations are written with bulk inserts on the through
+	tables. Returns the recipes and whether any of them was created.
+	"""
+	validated, errors = _validate(BulkRecipeSerializer, items)
+	valid = [data for data in validated if data]
+	existing = _owned(recipe, user, {data['id'] for data in valid if 'id' in data})
+	tags = _owned(Tag, user, {pk for data in valid for pk in data.get('tags', ())})
+	ingredients = _owned(
+		Ingredients,
+		user,
+		{pk for data in valid for pk in data.get('ingredients', ())}
+		)
+	_check_owned(errors, validated, 'id', existing)
+	_check_owned(errors, validated, 'tags', tags)
+	_check_owned(errors, validated, 'ingredients', ingredients)
+	if any(errors):
+		raise BulkError(errors)
+
+	rows, created, updated, fields = [], [], [], set()
+	for data in validated:
+		pk = data.pop('id', None)
+		related = {
+			'tags': data.pop('tags', None),
+			'ingredients': data.pop('ingredients', None),
+			}
+		if pk is None:
+			obj = recipe(user=user, **data)
+			created.append(obj)
+		else:
+			obj = existing[pk]
+			for field, value in data.items():
+				setattr(obj, field, value)
+			fields.update(data)
+			updated.append(obj)
+		rows.append((obj, related))
+
+	with transaction.atomic():
+		insert_objects(recipe, created)
+		_update(recipe, updated, fields)
+		touched = {
+			'tags': _set_related(rows, 'tags', updated),
+			'ingredients': _set_related(rows, 'ingredients', updated),
+			}
+		signals.assignments_changed(
+			user.pk,
+			recipe_ids=[obj.pk for obj, related in rows],
+			tag_ids=touched['tags'],
+			ingredient_ids=touched['ingredients']
+			)
+
+	return [obj for obj, related in rows], bool(created)
+
+
+def _set_related(rows, field_name, updated):
+	"""Replaces the links of a many to many field with bulk writes
+
+	Returns the primary keys of the related objects that were linked or
+	unlinked.
+	"""
+	field = recipe._meta.get_field(field_name)
+	through = field.remote_field.through
+	target = f'{field.m2m_reverse_field_name()}_id'
+	updated_pks = {obj.pk for obj in updated}
+	replaced = [
+		obj.pk for obj, related in rows
+		if related[field_name] is not None and obj.pk in updated_pks
+		]
+
+	touched = set()
+	if replaced:
+		links = through.objects.filter(recipe_id__in=replaced)
+		touched.update(links.values_list(target, flat=True))
+		links.delete()
+
+	links = []
+	for obj, related in rows:
+		for pk in dict.fromkeys(related[field_name] or ()):
+			links.append(through(recipe_id=obj.pk, **{target: pk}))
+			touched.add(pk)
+	through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+	return touched
@@ -0,0 +1,66 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _generation_key(model, user_id):
+	"""Returns the cache key holding the generation of a user's objects"""
+	return f'recipe:generation:{model._meta.label_lower}:{user_id}'
+
+
+def get_generation(model, user_id):
+	"""Returns the current generation of a user's objects"""
+	key = _generation_key(model, user_id)
+	generation = cache.get(key)
+	if generation is None:
+		# Starting from the clock keeps generations increasing even when
+		# the key has been evicted, so stale entries are never reused.
+		cache.add(key, int(time.time() * 1000), None)
+		generation = cache.get(key)
+
+	return generation
+
+
+def next_generation(model, user_id):
+	"""Moves a user's objects to the next generation and returns it"""
+	try:
+		return cache.incr(_generation_key(model, user_id))
+	except ValueError:
+		return get_generation(model, user_id)
+
+
+def bump_generation(model, user_id):
+	"""Invalidates every cached list of a user's objects
+
+	The generation is bumped right away and again once the transaction
+	commits, so a list read in between can't stay cached with old rows.
+	"""
+	next_generation(model, user_id)
+	transaction.on_commit(lambda: next_generation(model, user_id))
+
+
+def list_cache_key(model, request):
+	"""Returns the cache key of a list response for the current generation"""
+	user_id = request.user.pk
+	generation = get_generation(model, user_id)
+	path = f'{request.get_host()}{request.get_full_path()}'.encode('utf-8')
+
+	return 'recipe:list:{}:{}:{}:{}'.format(
+		model._meta.label_lower,
+		user_id,
+		generation,
+		hashlib.md5(path).hexdigest()
+		)
+
+
+def get_list(key):
+	"""Returns the cached list response data, if any"""
+	return cache.get(key)
+
+
+def set_list(key, data):
+	"""Caches the list response data"""
+	cache.set(key, data, settings.RECIPE_LIST_CACHE_TIMEOUT)
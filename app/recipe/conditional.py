@@ -0,0 +1,88 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def collection_state(queryset):
+	"""Returns the row count and last modification of a queryset"""
+	# values() keeps annotations of the queryset, like the JSON aggregates
+	# of the recipe detail, from being computed for the state.
+	return queryset.order_by().values('pk').aggregate(
+		count=Count('pk'),
+		last_modified=Max('updated_at')
+		)
+
+
+def make_etag(request, state):
+	"""Returns the ETag of a response built from the given state"""
+	last_modified = state['last_modified']
+	value = '{}:{}:{}:{}:{}'.format(
+		request.user.pk,
+		state['count'],
+		last_modified.isoformat() if last_modified else '',
+		request.accepted_media_type,
+		request.get_full_path()
+		)
+
+	return quote_etag(hashlib.md5(value.encode('utf-8')).hexdigest())
+
+
+def not_modified(request, etag, last_modified=None):
+	"""Returns a 304 response when the client copy is current"""
+	response = get_conditional_response(
+		request,
+		etag=etag,
+		last_modified=last_modified and int(last_modified.timestamp())
+		)
+	if response is not None:
+		response['ETag'] = etag
+		if last_modified:
+			response['Last-Modified'] = http_date(last_modified.timestamp())
+
+	return response
+
+
+class ConditionalGetMixin:
+	"""Answers list and retrieve with 304 Not Modified when possible
+
+	The validators come from a single COUNT/MAX(updated_at) aggregate, so
+	an unchanged collection is answered without serializing anything.
+	Lists only carry an ETag: a deleted row lowers the count but can't move
+	MAX(updated_at), so a Last-Modified date would miss it.
+	"""
+
+	def list(self, request, *args, **kwargs):
+		"""Returns the list unless the client copy is current"""
+		state = collection_state(self.filter_queryset(self.get_queryset()))
+		etag = make_etag(request, state)
+		response = not_modified(request, etag)
+		if response is not None:
+			return response
+
+		response = super().list(request, *args, **kwargs)
+		response['ETag'] = etag
+		return response
+
+
+	def retrieve(self, request, *args, **kwargs):
+		"""Returns the object unless the client copy is current"""
+		lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+		queryset = self.filter_queryset(self.get_queryset()).filter(
+			**{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+			)
+		state = collection_state(queryset)
+		if not state['count']:
+			return super().retrieve(request, *args, **kwargs)
+
+		etag = make_etag(request, state)
+		last_modified = state['last_modified']
+		response = not_modified(request, etag, last_modified)
+		if response is not None:
+			return response
+
+		response = super().retrieve(request, *args, **kwargs)
+		response['ETag'] = etag
+		response['Last-Modified'] = http_date(last_modified.timestamp())
+		return response
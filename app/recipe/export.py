@@ -0,0 +1,129 @@
+import csv
+import json
+from itertools import islice
+
+from core.models import recipe
+
+
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+	'ndjson': 'application/x-ndjson',
+	'csv': 'text/csv; charset=utf-8',
+}
+FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+RELATED_FIELDS = ('tags', 'ingredients')
+COLUMNS = FIELDS + RELATED_FIELDS
+# Separates the tag and ingredient names inside a CSV cell. Separators and
+# backslashes within a name are escaped with a backslash.
+NAME_SEPARATOR = '|'
+NAME_ESCAPE = '\\'
+CHUNK_SIZE = 500
+
+
+def _names(field_name, recipe_ids):
+	"""Returns the names of the related objects of every recipe"""
+	field = recipe._meta.get_field(field_name)
+	name = f'{field.m2m_reverse_field_name()}__name'
+	links = field.remote_field.through.objects.filter(
+		recipe_id__in=recipe_ids
+		).values_list('recipe_id', name).order_by(name)
+
+	names = {}
+	for recipe_id, related_name in links:
+		names.setdefault(recipe_id, []).append(related_name)
+
+	return names
+
+
+def export_chunks(queryset, chunk_size=None):
+	"""Yields the recipes of the queryset as lists of dicts
+
+	Rows are read with a chunked iterator and the tag and ingredient names
+	of every chunk are fetched with one query per relation, so memory use
+	doesn't grow with the collection.
+	"""
+	chunk_size = chunk_size or CHUNK_SIZE
+	rows = queryset.values_list(*FIELDS).iterator(chunk_size=chunk_size)
+	while True:
+		chunk = list(islice(rows, chunk_size))
+		if not chunk:
+			return
+
+		ids = [row[0] for row in chunk]
+		related = {field_name: _names(field_name, ids) for field_name in RELATED_FIELDS}
+		items = []
+		for row in chunk:
+			item = dict(zip(FIELDS, row))
+			item['price'] = str(item['price'])
+			for field_name in RELATED_FIELDS:
+				item[field_name] = related[field_name].get(item['id'], [])
+			items.append(item)
+		yield items
+
+
+
+def join_names(names):
+	"""Joins names into a CSV cell, escaping the separators they contain"""
+	return NAME_SEPARATOR.join(
+		name.replace(NAME_ESCAPE, NAME_ESCAPE * 2).replace(NAME_SEPARATOR, NAME_ESCAPE + NAME_SEPARATOR)
+		for name in names
+		)
+
+
+def split_names(cell):
+	"""Splits a CSV cell written by join_names back into names"""
+	if not cell:
+		return []
+
+	names = []
+	name = []
+	characters = iter(cell)
+	for character in characters:
+		if character == NAME_ESCAPE:
+			name.append(next(characters, ''))
+		elif character == NAME_SEPARATOR:
+			names.append(''.join(name))
+			name = []
+		else:
+			name.append(character)
+	names.append(''.join(name))
+
+	return names
+
+
+
+class _Echo:
+	"""File-like object returning what's written, for csv.writer"""
+
+	def write(self, value):
+		return value
+
+
+
+def ndjson_lines(chunks):
+	"""Yields every chunk as newline delimited JSON"""
+	for items in chunks:
+		yield ''.join(json.dumps(item) + '\n' for item in items)
+
+
+def csv_lines(chunks):
+	"""Yields a header then every chunk as CSV rows"""
+	writer = csv.writer(_Echo())
+	yield writer.writerow(COLUMNS)
+	for items in chunks:
+		yield ''.join(
+			writer.writerow([
+				join_names(item[column]) if column in RELATED_FIELDS else item[column]
+				for column in COLUMNS
+				])
+			for item in items
+			)
+
+
+def stream(queryset, export_format):
+	"""Returns the lines of the export in the given format"""
+	chunks = export_chunks(queryset)
+	if export_format == 'csv':
+		return csv_lines(chunks)
+
+	return ndjson_lines(chunks)
@@ -0,0 +1,33 @@
+from django.db.models import Count, Exists, OuterRef
+
+from core.models import recipe
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def filter_by_related(queryset, field_name, ids, match=MATCH_ANY):
+	"""Filters recipes on the ids of a many to many field
+
+	Each recipe is probed with an EXISTS subquery on the through table, so
+	no join fans out the recipe rows and no DISTINCT is needed. With the
+	"all" match the subquery only holds when every id is linked.
+	"""
+	field = recipe._meta.get_field(field_name)
+	through = field.remote_field.through
+	source = field.m2m_field_name()
+	target = field.m2m_reverse_field_name()
+
+	related = through.objects.filter(
+		**{source: OuterRef('pk'), f'{target}__in': ids}
+		)
+	if match == MATCH_ALL:
+		related = related.values(source).annotate(
+			matched=Count(target)
+			).filter(matched=len(set(ids)))
+
+	annotation = f'has_{field_name}'
+	return queryset.annotate(
+		**{annotation: Exists(related)}
+		).filter(**{annotation: True})
@@ -0,0 +1,112 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from PIL import Image, features
+
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = (
+	('thumbnail', (150, 150), 'JPEG'),
+	('medium', (800, 800), 'JPEG'),
+	('webp', (800, 800), 'WEBP'),
+)
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_executor = None
+
+
+def available_variants():
+	"""Returns the variants this Pillow build can encode"""
+	return [
+		variant for variant in VARIANTS
+		if variant[2] != 'WEBP' or features.check('webp')
+		]
+
+
+def variant_name(name, variant):
+	"""Returns the storage name of a variant of an image"""
+	root = os.path.splitext(name)[0]
+	for key, size, image_format in VARIANTS:
+		if key == variant:
+			return f'{root}_{key}.{EXTENSIONS[image_format]}'
+
+	raise ValueError(f'Unknown image variant: {variant}')
+
+
+def variant_urls(image):
+	"""Returns the urls of the variants of an image
+
+	The names are derived from the original, so the urls are known before
+	the variants have been generated.
+	"""
+	if not image:
+		return {}
+
+	return {
+		key: image.storage.url(variant_name(image.name, key))
+		for key, size, image_format in available_variants()
+		}
+
+
+def _encode(image, size, image_format):
+	"""Returns the resized image encoded in the given format"""
+	resized = image.copy()
+	resized.thumbnail(size, Image.LANCZOS)
+	buffer = BytesIO()
+	if image_format == 'JPEG':
+		resized.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+	else:
+		resized.save(buffer, image_format, quality=80)
+
+	return buffer.getvalue()
+
+
+def generate_variants(name, storage=default_storage):
+	"""Generates and stores every variant of an image"""
+	variants = available_variants()
+	largest = max(size for key, size, image_format in variants)
+	with storage.open(name) as f:
+		image = Image.open(f)
+		# Lets the JPEG decoder downscale while decoding.
+		image.draft('RGB', largest)
+		image = image.convert('RGB')
+
+	for key, size, image_format in variants:
+		path = variant_name(name, key)
+		if storage.exists(path):
+			storage.delete(path)
+		storage.save(path, ContentFile(_encode(image, size, image_format)))
+
+
+def _generate_logged(name):
+	"""Generates the variants, logging any failure of the worker"""
+	try:
+		generate_variants(name)
+	except Exception:
+		logger.exception('Could not generate the variants of %s', name)
+
+
+def _get_executor():
+	"""Returns the pool resizing the images"""
+	global _executor
+	if _executor is None:
+		_executor = ThreadPoolExecutor(
+			max_workers=settings.RECIPE_IMAGE_WORKERS,
+			thread_name_prefix='recipe-images'
+			)
+
+	return _executor
+
+
+def schedule_variants(name):
+	"""Generates the variants in the background once the upload commits"""
+	transaction.on_commit(lambda: _get_executor().submit(_generate_logged, name))
@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+
+from core.models import Tag, Ingredients, recipe
+from recipe import bulk, export, signals
+from recipe.serializers import RecipeSerializer
+
+
+MAX_REPORTED_ERRORS = 100
+
+
+
+class ImportFileError(Exception):
+	"""Raised when the file can't be decoded or parsed
+
+	The report holds the totals of the batches saved before the error.
+	"""
+	report = None
+
+
+
+class ImportConflict(Exception):
+	"""Raised when concurrent changes keep a batch from being saved
+
+	The report holds the totals of the batches saved before the conflict.
+	"""
+	report = None
+
+
+
+class ImportRecipeSerializer(RecipeSerializer):
+	"""Validates an imported recipe, naming its tags and ingredients"""
+	ingredients = serializers.ListField(
+		child=serializers.CharField(max_length=255),
+		required=False
+		)
+	tags = serializers.ListField(
+		child=serializers.CharField(max_length=255),
+		required=False
+		)
+
+	class Meta(RecipeSerializer.Meta):
+		fields = ('title', 'time_minutes', 'price', 'link', 'ingredients', 'tags')
+
+
+
+def _ndjson_items(lines):
+	"""Yields the line number and item of every non blank line"""
+	for number, line in enumerate(lines, 1):
+		if not line.strip():
+			continue
+		try:
+			yield number, json.loads(line)
+		except ValueError:
+			yield number, None
+
+
+def _csv_items(lines):
+	"""Yields the line number and item of every row, splitting the names"""
+	reader = csv.DictReader(lines)
+	for row in reader:
+		for field_name in export.RELATED_FIELDS:
+			row[field_name] = export.split_names(row.get(field_name))
+		yield reader.line_num, row
+
+
+def read_items(f, import_format):
+	"""Yields the items of a binary file, reading it incrementally"""
+	lines = io.TextIOWrapper(f, encoding='utf-8', newline='')
+	try:
+		if import_format == 'csv':
+			yield from _csv_items(lines)
+		else:
+			yield from _ndjson_items(lines)
+	except (UnicodeDecodeError, csv.Error) as exc:
+		raise ImportFileError(str(exc))
+	finally:
+		lines.detach()
+
+
+def _resolve_names(model, user, names):
+	"""Returns the primary keys of the named objects, creating the missing ones
+
+	Names are matched regardless of case, folded by the database like the
+	unique index, and the returned mapping is keyed by the given names.
+	Also returns the primary keys of the created objects.
+	"""
+	keys = bulk.fold_names(names)
+	objs = bulk.find_named(model, user, keys.values())
+	missing = {}
+	for name in names:
+		key = keys[name]
+		if key not in objs and key not in missing:
+			missing[key] = model(user=user, name=name)
+	bulk.insert_objects(model, list(missing.values()))
+	objs.update(missing)
+
+	pks = {name: objs[keys[name]].pk for name in names}
+
+	return pks, [obj.pk for obj in missing.values()]
+
+
+def _save_chunk(user, items):
+	"""Saves a chunk, looking its names up again if one was created meanwhile
+
+	Returns the number of tags and ingredients that were created.
+	"""
+	try:
+		return _insert_chunk(user, items)
+	except IntegrityError:
+		# Another request created one of the names since they were looked
+		# up, looking them up again links its objects instead.
+		pass
+	try:
+		return _insert_chunk(user, items)
+	except IntegrityError:
+		raise ImportConflict(_('The names were changed by another request, try again.'))
+
+
+def _insert_chunk(user, items):
+	"""Inserts the recipes of a chunk and links them in bulk
+
+	Returns the number of tags and ingredients that were created.
+	"""
+	names = {
+		field_name: sorted({name for data in items for name in data.get(field_name, ())})
+		for field_name in export.RELATED_FIELDS
+		}
+	with transaction.atomic():
+		tags, created_tags = _resolve_names(Tag, user, names['tags'])
+		ingredients, created_ingredients = _resolve_names(
+			Ingredients,
+			user,
+			names['ingredients']
+			)
+		related = {'tags': tags, 'ingredients': ingredients}
+
+		objs = []
+		for data in items:
+			fields = {key: value for key, value in data.items() if key not in related}
+			objs.append(recipe(user=user, **fields))
+		bulk.insert_objects(recipe, objs)
+
+		for field_name, pks in related.items():
+			field = recipe._meta.get_field(field_name)
+			through = field.remote_field.through
+			target = f'{field.m2m_reverse_field_name()}_id'
+			through.objects.bulk_create(
+				[
+					through(recipe_id=obj.pk, **{target: pk})
+					for obj, data in zip(objs, items)
+					for pk in dict.fromkeys(pks[name] for name in data.get(field_name, ()))
+					],
+				batch_size=bulk.BATCH_SIZE
+				)
+
+		signals.assignments_changed(
+			user.pk,
+			recipe_ids=[obj.pk for obj in objs],
+			tag_ids=list(set(tags.values())),
+			ingredient_ids=list(set(ingredients.values()))
+			)
+
+	return len(created_tags), len(created_ingredients)
+
+
+def import_recipes(user, f, import_format, batch_size=bulk.BATCH_SIZE, progress=None):
+	"""Imports the recipes of an export file in batches
+
+	Invalid items are skipped and reported with their line number. Every
+	batch is saved in its own transaction, and progress, if given, is
+	called with the running totals after each one. When the file turns
+	out to be unreadable, or a batch keeps conflicting with concurrent
+	changes, the raised ImportFileError or ImportConflict carries the
+	report of the batches already saved.
+	"""
+	report = {
+		'processed': 0,
+		'created': 0,
+		'tags_created': 0,
+		'ingredients_created': 0,
+		'errors': [],
+		}
+	items = read_items(f, import_format)
+	while True:
+		try:
+			chunk = list(islice(items, batch_size))
+		except ImportFileError as exc:
+			exc.report = report
+			raise
+		if not chunk:
+			return report
+
+		valid = []
+		for number, item in chunk:
+			if not isinstance(item, dict):
+				errors = {'non_field_errors': [_('Expected an object.')]}
+			else:
+				serializer = ImportRecipeSerializer(data=item)
+				if serializer.is_valid():
+					valid.append(dict(serializer.validated_data))
+					continue
+				errors = serializer.errors
+			if len(report['errors']) < MAX_REPORTED_ERRORS:
+				report['errors'].append({'line': number, 'errors': errors})
+
+		if valid:
+			try:
+				tags_created, ingredients_created = _save_chunk(user, valid)
+			except ImportConflict as exc:
+				exc.report = report
+				raise
+			report['tags_created'] += tags_created
+			report['ingredients_created'] += ingredients_created
+		report['processed'] += len(chunk)
+		report['created'] += len(valid)
+		if progress is not None:
+			progress(report)
@@ -0,0 +1,163 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+	"""Paginates on the ordering columns instead of an offset
+
+	The cursor is an opaque token holding the ordering values of the last
+	row of the page, so every page is a single indexed range scan no matter
+	how deep the client pages.
+	"""
+	cursor_query_param = 'cursor'
+	page_size_query_param = 'page_size'
+	page_size = 100
+	max_page_size = 1000
+	ordering = ('-id',)
+	invalid_cursor_message = _('Invalid cursor')
+
+
+	def paginate_queryset(self, queryset, request, view=None):
+		"""Returns a single page of the queryset"""
+		self.request = request
+		self.ordering = self.get_ordering(view)
+		self.page_size = self.get_page_size(request)
+
+		queryset = queryset.order_by(*self.ordering)
+		position = self.decode_cursor(request, queryset.model)
+		if position is not None:
+			queryset = queryset.filter(self._after(position))
+
+		results = list(queryset[:self.page_size + 1])
+		self.has_next = len(results) > self.page_size
+		results = results[:self.page_size]
+		self.next_position = None
+		if self.has_next:
+			self.next_position = self._position(results[-1])
+
+		return results
+
+
+	def get_paginated_response(self, data):
+		"""Returns the page along with the link to the next one"""
+		return Response(OrderedDict([
+			('next', self.get_next_link()),
+			('results', data),
+			]))
+
+
+	def get_ordering(self, view):
+		"""Returns the ordering declared on the view"""
+		return getattr(view, 'keyset_ordering', self.ordering)
+
+
+	def get_page_size(self, request):
+		"""Returns the requested page size bounded by max_page_size"""
+		try:
+			page_size = int(request.query_params[self.page_size_query_param])
+		except (KeyError, ValueError):
+			return self.page_size
+		if page_size <= 0:
+			return self.page_size
+
+		return min(page_size, self.max_page_size)
+
+
+	def get_next_link(self):
+		"""Returns the url of the next page"""
+		if self.next_position is None:
+			return None
+		url = self.request.build_absolute_uri()
+
+		return replace_query_param(
+			url,
+			self.cursor_query_param,
+			self.encode_cursor(self.next_position)
+			)
+
+
+	def get_previous_link(self):
+		"""Keyset pages can only be walked forwards"""
+		return None
+
+
+	def encode_cursor(self, position):
+		"""Encodes the ordering values into an opaque token"""
+		data = json.dumps(position, separators=(',', ':')).encode('utf-8')
+
+		return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+	def decode_cursor(self, request, model):
+		"""Decodes the cursor token from the request, if given
+
+		Every value is converted by the model field it's compared with, so
+		a tampered cursor, or one carried over from another ordering, is
+		rejected instead of failing in the query.
+		"""
+		encoded = request.query_params.get(self.cursor_query_param)
+		if not encoded:
+			return None
+		try:
+			position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+		except (TypeError, ValueError, binascii.Error):
+			raise NotFound(self.invalid_cursor_message)
+		if not isinstance(position, list) or len(position) != len(self.ordering):
+			raise NotFound(self.invalid_cursor_message)
+
+		try:
+			return [
+				self._to_python(model, field, value)
+				for (field, descending), value in zip(self._fields(), position)
+				]
+		except (TypeError, ValueError, ValidationError):
+			raise NotFound(self.invalid_cursor_message)
+
+
+	def _to_python(self, model, field_name, value):
+		"""Converts a cursor value to the type of its ordering column"""
+		if value is None or isinstance(value, (list, dict)):
+			raise ValueError(field_name)
+		try:
+			field = model._meta.get_field(field_name)
+		except FieldDoesNotExist:
+			return value
+
+		return field.to_python(value)
+
+
+	def _fields(self):
+		"""Yields the ordering columns with their direction"""
+		for field in self.ordering:
+			yield field.lstrip('-'), field.startswith('-')
+
+
+	def _position(self, obj):
+		"""Returns the ordering values of a row, an instance or a values() dict"""
+		if isinstance(obj, dict):
+			return [obj[field] for field, descending in self._fields()]
+
+		return [getattr(obj, field) for field, descending in self._fields()]
+
+
+	def _after(self, position):
+		"""Builds the filter selecting the rows after the given position"""
+		condition = Q()
+		equal = {}
+		for (field, descending), value in zip(self._fields(), position):
+			lookup = 'lt' if descending else 'gt'
+			condition |= Q(**equal, **{f'{field}__{lookup}': value})
+			equal[field] = value
+
+		return condition
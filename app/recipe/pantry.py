@@ -0,0 +1,196 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from core.models import recipe
+from recipe import cache
+
+
+_lock = threading.Lock()
+_indexes = OrderedDict()
+
+
+def popcount(mask):
+	"""Returns the number of bits set in the mask"""
+	return bin(mask).count('1')
+
+
+
+class PantryIndex:
+	"""Maps every recipe of a user to the bitset of its ingredients
+
+	Each ingredient gets a bit position the first time it's linked, so
+	matching a pantry against a recipe is an AND and a popcount. Every
+	update is idempotent, so applying one twice is harmless.
+	"""
+
+	def __init__(self, generation):
+		self.generation = generation
+		self.built_at = time.monotonic()
+		self.positions = {}
+		self.ingredient_ids = []
+		self.masks = {}
+
+	def _bit(self, ingredient_id):
+		"""Returns the bit of an ingredient, assigning one if needed"""
+		position = self.positions.get(ingredient_id)
+		if position is None:
+			position = len(self.ingredient_ids)
+			self.positions[ingredient_id] = position
+			self.ingredient_ids.append(ingredient_id)
+
+		return 1 << position
+
+	def mask_of(self, ingredient_ids):
+		"""Returns the bitset of the indexed ingredients among the ids"""
+		mask = 0
+		for ingredient_id in ingredient_ids:
+			position = self.positions.get(ingredient_id)
+			if position is not None:
+				mask |= 1 << position
+
+		return mask
+
+	def ids_of(self, mask):
+		"""Returns the ingredient ids of a bitset"""
+		ids = []
+		while mask:
+			low = mask & -mask
+			ids.append(self.ingredient_ids[low.bit_length() - 1])
+			mask ^= low
+
+		return ids
+
+	def add_recipe(self, recipe_id):
+		"""Adds a recipe without ingredients"""
+		self.masks.setdefault(recipe_id, 0)
+
+	def drop_recipe(self, recipe_id):
+		"""Removes a recipe"""
+		self.masks.pop(recipe_id, None)
+
+	def clear_recipe(self, recipe_id):
+		"""Unlinks every ingredient of a recipe"""
+		if recipe_id in self.masks:
+			self.masks[recipe_id] = 0
+
+	def link(self, pairs):
+		"""Adds (recipe id, ingredient id) links"""
+		for recipe_id, ingredient_id in pairs:
+			self.masks[recipe_id] = self.masks.get(recipe_id, 0) | self._bit(ingredient_id)
+
+	def unlink(self, pairs):
+		"""Removes (recipe id, ingredient id) links"""
+		for recipe_id, ingredient_id in pairs:
+			if recipe_id in self.masks:
+				self.masks[recipe_id] &= ~self.mask_of([ingredient_id])
+
+	def drop_ingredient(self, ingredient_id):
+		"""Unlinks an ingredient from every recipe"""
+		bit = self.mask_of([ingredient_id])
+		if not bit:
+			return
+		for recipe_id, mask in self.masks.items():
+			if mask & bit:
+				self.masks[recipe_id] = mask & ~bit
+
+	def match(self, ingredient_ids, limit):
+		"""Returns the recipes sharing ingredients with the pantry
+
+		Recipes missing the fewest ingredients come first, then the ones
+		using the most of the pantry, then the newest. Every match is a
+		(recipe id, matched count, ingredient count, missing ids) tuple.
+		"""
+		pantry = self.mask_of(ingredient_ids)
+		if not pantry:
+			return []
+
+		ranked = []
+		for recipe_id, mask in self.masks.items():
+			matched = popcount(mask & pantry)
+			if matched:
+				missing = mask & ~pantry
+				ranked.append((popcount(missing), -matched, -recipe_id, mask, missing))
+
+		return [
+			(-negative_id, -negative_matched, popcount(mask), self.ids_of(missing))
+			for missing_count, negative_matched, negative_id, mask, missing
+			in heapq.nsmallest(limit, ranked)
+			]
+
+
+
+def _load(user_id, generation):
+	"""Builds the index of a user from the recipe ingredients table"""
+	index = PantryIndex(generation)
+	for recipe_id in recipe.objects.filter(user_id=user_id).values_list('pk', flat=True):
+		index.add_recipe(recipe_id)
+	links = recipe.ingredients.through.objects.filter(
+		recipe__user_id=user_id
+		).values_list('recipe_id', 'ingredients_id')
+	index.link(links.iterator())
+
+	return index
+
+
+def _get_index(user_id):
+	"""Returns the index of a user, building it when it's missing or stale"""
+	generation = cache.get_generation(recipe, user_id)
+	with _lock:
+		index = _indexes.get(user_id)
+		if index is not None and index.generation == generation \
+				and time.monotonic() - index.built_at < settings.RECIPE_PANTRY_MAX_AGE:
+			_indexes.move_to_end(user_id)
+			return index
+
+	# The generation is read before the rows, so an index built from rows
+	# that are about to change is replaced once the change commits. The
+	# max age bounds how long a change that didn't bump the generation,
+	# or whose generation lives in another process's cache, goes unseen.
+	index = _load(user_id, generation)
+	with _lock:
+		_indexes[user_id] = index
+		_indexes.move_to_end(user_id)
+		while len(_indexes) > settings.RECIPE_PANTRY_MAX_USERS:
+			_indexes.popitem(last=False)
+
+	return index
+
+
+def match(user_id, ingredient_ids, limit):
+	"""Returns the user's recipes ranked by how much of the pantry they use"""
+	index = _get_index(user_id)
+	with _lock:
+		return index.match(ingredient_ids, limit)
+
+
+def _apply(user_id, update):
+	"""Moves the user's index to the next generation"""
+	generation = cache.get_generation(recipe, user_id)
+	new_generation = cache.next_generation(recipe, user_id)
+	with _lock:
+		index = _indexes.get(user_id)
+		if index is None:
+			return
+		# Only an index one step behind, with no other writer in between,
+		# can be patched in place. Anything else is rebuilt on next use.
+		if update is not None and index.generation == generation \
+				and new_generation == generation + 1:
+			update(index)
+			index.generation = new_generation
+		else:
+			del _indexes[user_id]
+
+
+def changed(user_id, update=None):
+	"""Updates the user's index once the current transaction commits
+
+	The update patches this process's index in place, while the new
+	generation makes other processes rebuild theirs. Without an update
+	the index is rebuilt everywhere.
+	"""
+	transaction.on_commit(lambda: _apply(user_id, update))
@@ -0,0 +1,134 @@
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.db import connection
+from django.db.models import IntegerField, OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from core.models import recipe
+from recipe.serializers import RecipeSerializer
+
+
+RELATED_FIELDS = ('ingredients', 'tags')
+
+
+def has_array_agg():
+	"""Returns whether the related ids can be aggregated in the row query"""
+	return connection.vendor == 'postgresql'
+
+
+def _alias(field_name):
+	"""Returns the annotation holding the related ids of a field"""
+	return f'{field_name}_ids'
+
+
+def _related_ids(field_name):
+	"""Returns the sorted ids of the objects related to the outer recipe"""
+	field = recipe._meta.get_field(field_name)
+	target = f'{field.m2m_reverse_field_name()}_id'
+	links = field.remote_field.through.objects.filter(
+		recipe_id=OuterRef('pk')
+		).order_by().values('recipe_id').annotate(
+		ids=ArrayAgg(target, ordering=target)
+		).values('ids')
+
+	return Subquery(links, output_field=ArrayField(IntegerField()))
+
+
+def related_objects(field_name):
+	"""Returns the id and name of the objects related to the outer recipe as JSON
+
+	Annotating a recipe with it loads the nested tags or ingredients in the
+	recipe query instead of a prefetch query per relation.
+	"""
+	field = recipe._meta.get_field(field_name)
+	sql = f"""
+		SELECT COALESCE(json_agg(json_build_object('id', r.id, 'name', r.name) ORDER BY r.id), '[]'::json)
+		FROM {field.related_model._meta.db_table} r
+		JOIN {field.m2m_db_table()} l ON l.{field.m2m_reverse_name()} = r.id
+		WHERE l.{field.m2m_column_name()} = {recipe._meta.db_table}.id
+	"""
+
+	return RawSQL(sql, (), output_field=JSONField())
+
+
+def _fetch_related_ids(field_name, recipe_ids):
+	"""Returns the sorted related ids of every recipe with one query"""
+	field = recipe._meta.get_field(field_name)
+	target = f'{field.m2m_reverse_field_name()}_id'
+	links = field.remote_field.through.objects.filter(
+		recipe_id__in=recipe_ids
+		).values_list('recipe_id', target).order_by(target)
+
+	ids = {}
+	for recipe_id, related_id in links:
+		ids.setdefault(recipe_id, []).append(related_id)
+
+	return ids
+
+
+
+class RecipeRows:
+	"""Read only stand-in for RecipeSerializer(many=True) on value rows
+
+	The rows come from values() instead of model instances, with the tag
+	and ingredient ids aggregated in the same query on PostgreSQL or
+	fetched with one query per relation otherwise. The serializer's fields
+	still convert the column values, so the output is the same.
+	"""
+	serializer_class = RecipeSerializer
+
+
+	def __init__(self, instance=None, fields=None):
+		self.instance = instance
+		serializer = self.serializer_class(fields=fields)
+		self.fields = [
+			(field_name, None if field_name in RELATED_FIELDS else field.to_representation)
+			for field_name, field in serializer.fields.items()
+			]
+
+
+	def values(self, queryset):
+		"""Returns the queryset as the value rows of the represented fields"""
+		columns = {'id'}
+		annotations = {}
+		for field_name, convert in self.fields:
+			if convert is not None:
+				columns.add(field_name)
+			elif has_array_agg():
+				annotations[_alias(field_name)] = _related_ids(field_name)
+
+		return queryset.prefetch_related(None).values(*columns, **annotations)
+
+
+	def represent(self, rows):
+		"""Returns the representation of the value rows"""
+		fetched = {}
+		if rows:
+			recipe_ids = [row['id'] for row in rows]
+			fetched = {
+				field_name: _fetch_related_ids(field_name, recipe_ids)
+				for field_name, convert in self.fields
+				if convert is None and _alias(field_name) not in rows[0]
+				}
+
+		data = []
+		for row in rows:
+			item = {}
+			for field_name, convert in self.fields:
+				if convert is not None:
+					value = row[field_name]
+					item[field_name] = None if value is None else convert(value)
+				elif field_name in fetched:
+					item[field_name] = fetched[field_name].get(row['id'], [])
+				else:
+					item[field_name] = row[_alias(field_name)] or []
+			data.append(item)
+
+		return data
+
+
+	@property
+	def data(self):
+		return ReturnList(self.represent(self.instance), serializer=self)
@@ -0,0 +1,89 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, Exists, F, FloatField, OuterRef, Q, Value, When
+
+from core.models import recipe
+
+
+CONFIG = 'english'
+
+# The title weighs more than the tag and ingredient names it's indexed with.
+UPDATE_SQL = """
+UPDATE core_recipe r SET search_vector =
+	setweight(to_tsvector(%(config)s, r.title), 'A') ||
+	setweight(to_tsvector(%(config)s, coalesce((
+		SELECT string_agg(t.name, ' ')
+		FROM core_tag t
+		JOIN core_recipe_tags rt ON rt.tag_id = t.id
+		WHERE rt.recipe_id = r.id
+	), '')), 'B') ||
+	setweight(to_tsvector(%(config)s, coalesce((
+		SELECT string_agg(i.name, ' ')
+		FROM core_ingredients i
+		JOIN core_recipe_ingredients ri ON ri.ingredients_id = i.id
+		WHERE ri.recipe_id = r.id
+	), '')), 'B')
+WHERE r.id = ANY(%(ids)s)
+"""
+
+
+def is_full_text():
+	"""Returns whether the database supports full text search"""
+	return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(recipe_ids):
+	"""Rebuilds the search vectors of the given recipes"""
+	if not is_full_text():
+		return
+	recipe_ids = list(recipe_ids)
+	if not recipe_ids:
+		return
+
+	with connection.cursor() as cursor:
+		cursor.execute(UPDATE_SQL, {'config': CONFIG, 'ids': recipe_ids})
+
+
+def _name_matches(field_name, term):
+	"""Returns whether a recipe has a related object whose name has the term"""
+	field = recipe._meta.get_field(field_name)
+
+	return Exists(field.remote_field.through.objects.filter(**{
+		field.m2m_field_name(): OuterRef('pk'),
+		f'{field.m2m_reverse_field_name()}__name__icontains': term,
+		}))
+
+
+def _fallback_search(queryset, text):
+	"""Searches with LIKE lookups on databases without full text search"""
+	terms = text.split()
+	rank = Value(0.0, output_field=FloatField())
+	for index, term in enumerate(terms):
+		tag = f'tag_match_{index}'
+		ingredient = f'ingredient_match_{index}'
+		queryset = queryset.annotate(**{
+			tag: _name_matches('tags', term),
+			ingredient: _name_matches('ingredients', term),
+			}).filter(
+			Q(title__icontains=term) | Q(**{tag: True}) | Q(**{ingredient: True})
+			)
+		rank = rank + Case(
+			When(title__icontains=term, then=Value(1.0)),
+			default=Value(0.5),
+			output_field=FloatField()
+			)
+
+	return queryset.annotate(rank=rank)
+
+
+def search(queryset, text):
+	"""Returns the recipes matching the text, best matches first"""
+	if is_full_text():
+		query = SearchQuery(text, config=CONFIG)
+		queryset = queryset.filter(search_vector=query).annotate(
+			rank=SearchRank(F('search_vector'), query)
+			)
+	else:
+		queryset = _fallback_search(queryset, text)
+
+	return queryset.order_by('-rank', '-id')
@@ -1,6 +1,34 @@
 from rest_framework import serializers
 
 from core import models
+from recipe import images, uploads
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+	"""Returns the urls of the resized variants of an image"""
+
+	def to_representation(self, value):
+		request = self.context.get('request')
+		urls = images.variant_urls(value)
+		if request is not None:
+			urls = {key: request.build_absolute_uri(url) for key, url in urls.items()}
+
+		return urls
+
+
+
+class RecipeImageField(serializers.FileField):
+	"""Validates uploaded images from their header, without decoding them"""
+
+	def to_internal_value(self, data):
+		uploaded = super().to_internal_value(data)
+		try:
+			uploaded.image_format = uploads.inspect_image(uploaded)
+		except uploads.InvalidImage as exc:
+			raise serializers.ValidationError(exc.args[0])
+
+		return uploaded
+
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -21,7 +49,47 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class AggregatedListSerializer(serializers.ListSerializer):
+	"""Nests related objects, reading them from a JSON aggregate when annotated
+
+	The view annotates the recipe with <field>_json on PostgreSQL, see
+	recipe.rows.related_objects, and the child serializer represents the
+	aggregated dicts like the model instances.
+	"""
+
+	def get_attribute(self, instance):
+		aggregated = getattr(instance, f'{self.field_name}_json', None)
+		if aggregated is not None:
+			return aggregated
+
+		return super().get_attribute(instance)
+
+
+
+class SparseFieldsMixin:
+	"""Lets the view pick the returned fields and the nested relations
+
+	fields limits the representation to the given field names and expand
+	replaces the primary keys of the given relations with nested objects.
+	"""
+	expandable_fields = {}
+
+
+	def __init__(self, *args, fields=None, expand=None, **kwargs):
+		super().__init__(*args, **kwargs)
+		if fields is not None:
+			for field_name in set(self.fields) - set(fields):
+				self.fields.pop(field_name)
+		for field_name in expand or ():
+			if field_name in self.fields:
+				self.fields[field_name] = AggregatedListSerializer(
+					child=self.expandable_fields[field_name](),
+					read_only=True
+					)
+
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
 
 	ingredients = serializers.PrimaryKeyRelatedField(
 		many=True,
@@ -31,6 +99,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 		many=True,
 		queryset=models.Tag.objects.all()
 		)
+	expandable_fields = {'ingredients': IngredientSerializer, 'tags': TagSerializer}
 
 
 	class Meta:
@@ -42,14 +111,37 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeDetailSerializer(RecipeSerializer):
 
-	ingredients = IngredientSerializer(many=True, read_only=True)
-	tags = TagSerializer(many=True, read_only=True)
+	ingredients = AggregatedListSerializer(child=IngredientSerializer(), read_only=True)
+	tags = AggregatedListSerializer(child=TagSerializer(), read_only=True)
+	image_variants = ImageVariantsField(source='image')
+
+
+	class Meta(RecipeSerializer.Meta):
+		fields = RecipeSerializer.Meta.fields + ('image', 'image_variants')
+		extra_kwargs = {'id':{'read_only':True}, 'image':{'read_only':True}}
 
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
 
+	image = RecipeImageField()
+	image_variants = ImageVariantsField(source='image')
+	image_stored = False
+
+
 	class Meta:
 		model = models.recipe
-		fields = ('id', 'image')
-		extra_kwargs = {'id':{'read_only':True}}
\ No newline at end of file
+		fields = ('id', 'image', 'image_variants')
+		extra_kwargs = {'id':{'read_only':True}}
+
+
+	def update(self, instance, validated_data):
+		"""Stores the image under its content hash"""
+		uploaded = validated_data.pop('image')
+		instance.image.name, self.image_stored = uploads.store_image(
+			uploaded,
+			uploaded.image_format,
+			instance.image.storage
+			)
+
+		return super().update(instance, validated_data)
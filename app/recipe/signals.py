@@ -0,0 +1,226 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredients, recipe
+from recipe import cache, pantry, search, usage
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def invalidate_lists(sender, instance, **kwargs):
+	"""Invalidates the cached lists when a tag or ingredient changes"""
+	cache.bump_generation(sender, instance.user_id)
+
+
+@receiver(m2m_changed, sender=recipe.tags.through)
+@receiver(m2m_changed, sender=recipe.ingredients.through)
+def invalidate_assigned_lists(sender, instance, action, reverse, model, **kwargs):
+	"""Invalidates the cached lists when recipe assignments change"""
+	if action not in ('post_add', 'post_remove', 'post_clear'):
+		return
+	related_model = type(instance) if reverse else model
+	cache.bump_generation(related_model, instance.user_id)
+
+
+@receiver(post_delete, sender=recipe)
+def invalidate_lists_of_recipe(sender, instance, **kwargs):
+	"""Invalidates the cached lists when a recipe is deleted"""
+	cache.bump_generation(Tag, instance.user_id)
+	cache.bump_generation(Ingredients, instance.user_id)
+
+
+def _linked_pks(through, instance, model):
+	"""Returns the pks of the objects linked to the instance"""
+	instance_name = instance._meta.model_name
+	model_name = model._meta.model_name
+
+	return set(through.objects.filter(
+		**{f'{instance_name}_id': instance.pk}
+		).values_list(f'{model_name}_id', flat=True))
+
+
+@receiver(m2m_changed, sender=recipe.tags.through)
+@receiver(m2m_changed, sender=recipe.ingredients.through)
+def touch_assigned_objects(sender, instance, action, model, pk_set, **kwargs):
+	"""Marks both sides of a recipe assignment as modified"""
+	if action == 'pre_clear':
+		# The links are gone after the clear, so touch them beforehand.
+		pk_set = _linked_pks(sender, instance, model)
+	elif action not in ('post_add', 'post_remove'):
+		return
+
+	now = timezone.now()
+	instance.updated_at = now
+	type(instance).objects.filter(pk=instance.pk).update(updated_at=now)
+	if pk_set:
+		model.objects.filter(pk__in=pk_set).update(updated_at=now)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+@receiver(post_save, sender=Ingredients)
+@receiver(pre_delete, sender=Ingredients)
+def touch_recipes_of(sender, instance, created=False, **kwargs):
+	"""Marks the recipes showing a renamed or deleted object as modified"""
+	if created:
+		return
+	field = 'tags' if sender is Tag else 'ingredients'
+	recipe.objects.filter(**{field: instance}).update(updated_at=timezone.now())
+
+
+def assignments_changed(user_id, recipe_ids=(), tag_ids=(), ingredient_ids=()):
+	"""Applies the side effects of recipe writes made without signals
+
+	bulk_create, bulk_update and through table inserts don't send model or
+	m2m signals, so bulk writers report what they touched here instead.
+	"""
+	now = timezone.now()
+	if recipe_ids:
+		recipe.objects.filter(pk__in=recipe_ids).update(updated_at=now)
+		search.update_search_vectors(recipe_ids)
+	if tag_ids:
+		Tag.objects.filter(pk__in=tag_ids).update(updated_at=now)
+	if ingredient_ids:
+		Ingredients.objects.filter(pk__in=ingredient_ids).update(updated_at=now)
+	usage.update_counts(Tag, tag_ids)
+	usage.update_counts(Ingredients, ingredient_ids)
+	cache.bump_generation(Tag, user_id)
+	cache.bump_generation(Ingredients, user_id)
+	pantry.changed(user_id)
+
+
+def named_objects_changed(model, user_id, renamed_ids=()):
+	"""Applies the side effects of tag or ingredient writes made without signals"""
+	if renamed_ids:
+		field = 'tags' if model is Tag else 'ingredients'
+		recipes = recipe.objects.filter(**{f'{field}__in': renamed_ids})
+		recipes.update(updated_at=timezone.now())
+		search.update_search_vectors(recipes.values_list('pk', flat=True))
+	cache.bump_generation(model, user_id)
+
+
+@receiver(post_save, sender=recipe)
+def index_recipe(sender, instance, **kwargs):
+	"""Rebuilds the search vector of a saved recipe"""
+	search.update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=recipe.tags.through)
+@receiver(m2m_changed, sender=recipe.ingredients.through)
+def index_assigned_recipes(sender, instance, action, reverse, model, pk_set, **kwargs):
+	"""Rebuilds the search vectors of recipes whose assignments changed"""
+	if not search.is_full_text():
+		return
+	if action == 'pre_clear' and reverse:
+		instance._cleared_recipe_pks = _linked_pks(sender, instance, model)
+		return
+	if action not in ('post_add', 'post_remove', 'post_clear'):
+		return
+
+	if not reverse:
+		recipe_ids = [instance.pk]
+	elif action == 'post_clear':
+		recipe_ids = instance.__dict__.pop('_cleared_recipe_pks', ())
+	else:
+		recipe_ids = pk_set
+	search.update_search_vectors(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredients)
+@receiver(pre_delete, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def index_recipes_of(sender, instance, signal, created=False, **kwargs):
+	"""Rebuilds the search vectors of recipes showing a changed object"""
+	if created or not search.is_full_text():
+		return
+	through = recipe.tags.through if sender is Tag else recipe.ingredients.through
+	if signal is pre_delete:
+		# The links are deleted along with the object, so collect them first.
+		instance._indexed_recipe_pks = _linked_pks(through, instance, recipe)
+		return
+
+	if signal is post_delete:
+		recipe_ids = instance.__dict__.pop('_indexed_recipe_pks', ())
+	else:
+		recipe_ids = _linked_pks(through, instance, recipe)
+	search.update_search_vectors(recipe_ids)
+
+
+@receiver(m2m_changed, sender=recipe.ingredients.through)
+def update_pantry_links(sender, instance, action, reverse, pk_set, **kwargs):
+	"""Patches the pantry index with changed recipe ingredients"""
+	if action == 'post_clear':
+		if reverse:
+			pantry.changed(instance.user_id, lambda index: index.drop_ingredient(instance.pk))
+		else:
+			pantry.changed(instance.user_id, lambda index: index.clear_recipe(instance.pk))
+		return
+	if action not in ('post_add', 'post_remove'):
+		return
+
+	if reverse:
+		pairs = [(pk, instance.pk) for pk in pk_set]
+	else:
+		pairs = [(instance.pk, pk) for pk in pk_set]
+	if action == 'post_add':
+		pantry.changed(instance.user_id, lambda index: index.link(pairs))
+	else:
+		pantry.changed(instance.user_id, lambda index: index.unlink(pairs))
+
+
+@receiver(post_save, sender=recipe)
+@receiver(post_delete, sender=recipe)
+def update_pantry_recipes(sender, instance, signal, created=False, **kwargs):
+	"""Adds created recipes to the pantry index and drops deleted ones"""
+	recipe_id = instance.pk
+	if signal is post_delete:
+		pantry.changed(instance.user_id, lambda index: index.drop_recipe(recipe_id))
+	elif created:
+		pantry.changed(instance.user_id, lambda index: index.add_recipe(recipe_id))
+
+
+@receiver(post_delete, sender=Ingredients)
+def update_pantry_ingredients(sender, instance, **kwargs):
+	"""Unlinks a deleted ingredient in the pantry index"""
+	ingredient_id = instance.pk
+	pantry.changed(instance.user_id, lambda index: index.drop_ingredient(ingredient_id))
+
+
+@receiver(m2m_changed, sender=recipe.tags.through)
+@receiver(m2m_changed, sender=recipe.ingredients.through)
+def update_recipe_counts(sender, instance, action, reverse, model, pk_set, **kwargs):
+	"""Recounts the recipes of the tags or ingredients whose links changed"""
+	if reverse:
+		if action in ('post_add', 'post_remove', 'post_clear'):
+			usage.update_counts(type(instance), [instance.pk])
+		return
+	if action == 'pre_clear':
+		instance.__dict__.setdefault('_counted_pks', {})[model] = _linked_pks(sender, instance, model)
+		return
+	if action == 'post_clear':
+		pk_set = instance.__dict__.get('_counted_pks', {}).pop(model, ())
+	elif action not in ('post_add', 'post_remove'):
+		return
+	usage.update_counts(model, pk_set)
+
+
+@receiver(pre_delete, sender=recipe)
+@receiver(post_delete, sender=recipe)
+def update_recipe_counts_of(sender, instance, signal, **kwargs):
+	"""Recounts the recipes of the tags and ingredients of a deleted recipe"""
+	if signal is pre_delete:
+		# The links are deleted along with the recipe, so collect them first.
+		instance._counted_pks = {
+			Tag: _linked_pks(recipe.tags.through, instance, Tag),
+			Ingredients: _linked_pks(recipe.ingredients.through, instance, Ingredients),
+			}
+		return
+
+	for model, pks in instance.__dict__.pop('_counted_pks', {}).items():
+		usage.update_counts(model, pks)
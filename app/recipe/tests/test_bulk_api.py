@@ -0,0 +1,252 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag, Ingredients
+from recipe import bulk
+
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredients-bulk')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class BulkApiTest(TestCase):
+	"""Tests for the bulk endpoints"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		cache.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+
+	def test_bulk_create_tags(self):
+		"""Test for creating several tags at once"""
+		payload = [{'name':'Vegan'}, {'name':'Dessert'}]
+
+		res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual([item['name'] for item in res.data], ['Vegan', 'Dessert'])
+		self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+
+	def test_bulk_update_ingredients(self):
+		"""Test for renaming ingredients in bulk"""
+		ingredient = Ingredients.objects.create(user=self.user, name='Carot')
+		payload = [{'id':ingredient.id, 'name':'Carrot'}, {'name':'Potato'}]
+
+		res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		ingredient.refresh_from_db()
+		self.assertEqual(ingredient.name, 'Carrot')
+		self.assertEqual(Ingredients.objects.filter(user=self.user).count(), 2)
+
+
+	def test_bulk_reuses_existing_names(self):
+		"""Test that names the user already has aren't created again"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		payload = [{'name':'VEGAN'}, {'name':'Dessert'}, {'name':'dessert'}]
+
+		res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(res.data[0]['id'], tag.id)
+		self.assertEqual(res.data[1]['id'], res.data[2]['id'])
+		self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+
+	def test_bulk_updates_only_return_200(self):
+		"""Test that a payload creating nothing isn't answered with 201"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		dessert = Tag.objects.create(user=self.user, name='Dessert')
+		payload = [{'id':tag.id, 'name':'Vegetarian'}, {'name':'dessert'}]
+
+		res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual([item['id'] for item in res.data], [tag.id, dessert.id])
+
+
+	def test_bulk_name_created_concurrently_is_reused(self):
+		"""Test that a name created after the lookup is looked up again"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		find_named = bulk.find_named
+		lookups = []
+
+		def stale_find_named(model, user, names):
+			lookups.append(names)
+			return {} if len(lookups) == 1 else find_named(model, user, names)
+
+		with patch('recipe.bulk.find_named', side_effect=stale_find_named):
+			res = self.client.post(TAGS_BULK_URL, [{'name':'vegan'}], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data[0]['id'], tag.id)
+		self.assertEqual(len(lookups), 2)
+
+
+	def test_bulk_conflicting_again_is_rejected(self):
+		"""Test that a payload still conflicting after the retry is a 409"""
+		Tag.objects.create(user=self.user, name='Vegan')
+
+		with patch('recipe.bulk.find_named', side_effect=lambda model, user, names: {}):
+			res = self.client.post(TAGS_BULK_URL, [{'name':'vegan'}], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+		self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+
+	def test_bulk_reuses_existing_non_ascii_names(self):
+		"""Test that names Python and the database lowercase differently are reused"""
+		tag = Tag.objects.create(user=self.user, name='İstanbul Éclair')
+
+		res = self.client.post(TAGS_BULK_URL, [{'name':'İstanbul Éclair'}], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data[0]['id'], tag.id)
+
+
+	def test_bulk_rename_to_existing_name_is_rejected(self):
+		"""Test that a rename can't duplicate another object's name"""
+		Ingredients.objects.create(user=self.user, name='Carrot')
+		potato = Ingredients.objects.create(user=self.user, name='Potato')
+		payload = [{'id':potato.id, 'name':'carrot'}]
+
+		res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('name', res.data[0])
+
+
+	def test_bulk_errors_are_reported_per_item(self):
+		"""Test that one invalid item rejects the whole payload"""
+		payload = [{'name':'Vegan'}, {'name':''}]
+
+		res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(res.data[0], {})
+		self.assertIn('name', res.data[1])
+		self.assertFalse(Tag.objects.exists())
+
+
+	def test_bulk_requires_a_list(self):
+		"""Test that a single object is rejected"""
+		res = self.client.post(TAGS_BULK_URL, {'name':'Vegan'}, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+	def test_bulk_create_recipes(self):
+		"""Test for creating recipes with their relations at once"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		ingredient = Ingredients.objects.create(user=self.user, name='Carrot')
+		payload = [
+			{
+			'title':'Soup',
+			'time_minutes':10,
+			'price':'5.00',
+			'tags':[tag.id],
+			'ingredients':[ingredient.id],
+			},
+			{'title':'Toast', 'time_minutes':5, 'price':'2.00', 'tags':[tag.id]},
+		]
+
+		with CaptureQueriesContext(connection) as ctx:
+			res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		tag_lookups = [
+			query for query in ctx.captured_queries
+			if query['sql'].startswith('SELECT') and '"core_tag"."user_id" =' in query['sql']
+			]
+		self.assertEqual(len(tag_lookups), 1)
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(res.data[0]['title'], 'Soup')
+		self.assertEqual(res.data[0]['tags'], [tag.id])
+		self.assertEqual(res.data[0]['ingredients'], [ingredient.id])
+		self.assertEqual(res.data[1]['tags'], [tag.id])
+		soup = recipe.objects.get(id=res.data[0]['id'])
+		self.assertEqual(list(soup.tags.all()), [tag])
+
+
+	def test_bulk_update_recipes(self):
+		"""Test that updating a recipe replaces the given relations only"""
+		tag1 = Tag.objects.create(user=self.user, name='Vegan')
+		tag2 = Tag.objects.create(user=self.user, name='Curry')
+		ingredient = Ingredients.objects.create(user=self.user, name='Carrot')
+		soup = recipe.objects.create(
+			user=self.user,
+			title='Soup',
+			time_minutes=10,
+			price=5.00
+			)
+		soup.tags.add(tag1)
+		soup.ingredients.add(ingredient)
+		payload = [{'id':soup.id, 'title':'Curry soup', 'tags':[tag2.id]}]
+
+		res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		soup.refresh_from_db()
+		self.assertEqual(soup.title, 'Curry soup')
+		self.assertEqual(list(soup.tags.all()), [tag2])
+		self.assertEqual(list(soup.ingredients.all()), [ingredient])
+
+
+	def test_bulk_recipes_creating_any_return_201(self):
+		"""Test that a payload updating and creating recipes answers 201"""
+		soup = recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5.00)
+		payload = [
+			{'id':soup.id, 'title':'Curry soup'},
+			{'title':'Salad', 'time_minutes':5, 'price':'3.00'},
+		]
+
+		res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(res.data[0]['id'], soup.id)
+
+
+	def test_bulk_recipes_reject_other_users_tags(self):
+		"""Test that referencing another user's tag is an item error"""
+		user2 = get_user_model().objects.create_user(
+			email='shubham@gmail.com',
+			password='password1'
+			)
+		tag = Tag.objects.create(user=user2, name='Vegan')
+		payload = [{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'tags':[tag.id]}]
+
+		res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('tags', res.data[0])
+		self.assertFalse(recipe.objects.exists())
+
+
+	def test_bulk_recipes_invalidate_assigned_lists(self):
+		"""Test that bulk assignments show up in assigned_only lists"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		url = reverse('recipe:tag-list')
+		self.assertEqual(self.client.get(url, {'assigned_only':1}).data['results'], [])
+
+		payload = [{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'tags':[tag.id]}]
+		self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		res = self.client.get(url, {'assigned_only':1})
+		self.assertEqual(len(res.data['results']), 1)
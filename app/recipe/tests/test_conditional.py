@@ -0,0 +1,137 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+	"""Creates and returns sample recipe"""
+	defaults = {
+	'title':'Sausages',
+	'time_minutes':10,
+	'price':5.00,
+	}
+
+	defaults.update(params)
+	return recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTest(TestCase):
+	"""Tests for answering conditional requests"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		cache.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+
+	def test_unchanged_recipe_list_is_not_modified(self):
+		"""Test that a matching ETag on the list returns 304"""
+		sample_recipe(user=self.user)
+		res = self.client.get(RECIPES_URL)
+		etag = res['ETag']
+
+		with self.assertNumQueries(1):
+			res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+		self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+		self.assertEqual(res['ETag'], etag)
+
+
+	def test_changed_recipe_list_is_returned(self):
+		"""Test that creating or deleting a recipe changes the list ETag"""
+		old = sample_recipe(user=self.user)
+		etag = self.client.get(RECIPES_URL)['ETag']
+
+		sample_recipe(user=self.user, title='Curry')
+		res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+		etag = res['ETag']
+		old.delete()
+		res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(res.data['results']), 1)
+
+
+	def test_recipe_detail_if_modified_since(self):
+		"""Test that the detail honours If-Modified-Since"""
+		recipe = sample_recipe(user=self.user)
+		res = self.client.get(detail_url(recipe.id))
+		last_modified = res['Last-Modified']
+
+		res = self.client.get(
+			detail_url(recipe.id),
+			HTTP_IF_MODIFIED_SINCE=last_modified
+			)
+		self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+	def test_assigning_tag_changes_recipe_detail(self):
+		"""Test that adding a tag to a recipe changes its ETag"""
+		recipe = sample_recipe(user=self.user)
+		etag = self.client.get(detail_url(recipe.id))['ETag']
+
+		recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+		res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['tags'][0]['name'], 'Vegan')
+
+
+	def test_renaming_tag_changes_recipe_detail(self):
+		"""Test that renaming a tag changes the ETag of its recipes"""
+		recipe = sample_recipe(user=self.user)
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		recipe.tags.add(tag)
+		etag = self.client.get(detail_url(recipe.id))['ETag']
+
+		tag.name = 'Vegetarian'
+		tag.save()
+
+		res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+	def test_unchanged_tag_list_is_not_modified(self):
+		"""Test that a matching ETag on the tag list returns 304"""
+		Tag.objects.create(user=self.user, name='Vegan')
+		etag = self.client.get(TAGS_URL)['ETag']
+
+		res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+		Tag.objects.create(user=self.user, name='Curry')
+		res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+	def test_missing_recipe_detail(self):
+		"""Test that conditional requests on other users' recipes 404"""
+		user2 = get_user_model().objects.create_user(
+			email='shubham@gmail.com',
+			password='password1'
+			)
+		recipe = sample_recipe(user=user2)
+
+		res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH='"x"')
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag, Ingredients
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class ExportApiTest(TestCase):
+	"""Tests for exporting recipes"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		cache.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+		self.tag = Tag.objects.create(user=self.user, name='Vegan')
+		self.ingredient = Ingredients.objects.create(user=self.user, name='Carrot')
+		self.soup = recipe.objects.create(
+			user=self.user,
+			title='Soup',
+			time_minutes=10,
+			price=5.00
+			)
+		self.soup.tags.add(self.tag)
+		self.soup.ingredients.add(self.ingredient)
+
+
+	def test_export_ndjson(self):
+		"""Test that every recipe is streamed as a JSON line"""
+		recipe.objects.create(user=self.user, title='Toast', time_minutes=5, price=2.00)
+
+		res = self.client.get(EXPORT_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+		lines = b''.join(res.streaming_content).decode().splitlines()
+		items = [json.loads(line) for line in lines]
+		self.assertEqual([item['title'] for item in items], ['Toast', 'Soup'])
+		self.assertEqual(items[1], {
+			'id':self.soup.id,
+			'title':'Soup',
+			'time_minutes':10,
+			'price':'5.00',
+			'link':'',
+			'tags':['Vegan'],
+			'ingredients':['Carrot'],
+			})
+
+
+	def test_export_csv(self):
+		"""Test that the names of the relations are joined in a cell"""
+		self.soup.tags.add(Tag.objects.create(user=self.user, name='Dinner'))
+
+		res = self.client.get(EXPORT_URL, {'as':'csv'})
+
+		rows = list(csv.reader(io.StringIO(b''.join(res.streaming_content).decode())))
+		self.assertEqual(rows[0], ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients'])
+		self.assertEqual(rows[1][5], 'Dinner|Vegan')
+
+
+	def test_names_are_fetched_per_chunk(self):
+		"""Test that the relations are fetched with one query per chunk"""
+		for title in ('Toast', 'Salad'):
+			recipe.objects.create(user=self.user, title=title, time_minutes=5, price=2.00)
+
+		with patch('recipe.export.CHUNK_SIZE', 2):
+			res = self.client.get(EXPORT_URL)
+			# The recipes, then the tags and ingredients of both chunks.
+			with self.assertNumQueries(5):
+				content = b''.join(res.streaming_content)
+
+		self.assertEqual(len(content.splitlines()), 3)
+
+
+	def test_export_only_includes_own_recipes(self):
+		"""Test that other users' recipes aren't exported"""
+		user2 = get_user_model().objects.create_user(
+			email='shubham@gmail.com',
+			password='password1'
+			)
+		recipe.objects.create(user=user2, title='Toast', time_minutes=5, price=2.00)
+
+		res = self.client.get(EXPORT_URL)
+
+		lines = b''.join(res.streaming_content).splitlines()
+		self.assertEqual(len(lines), 1)
+
+
+	def test_unknown_format_is_rejected(self):
+		"""Test that an unsupported export format is a bad request"""
+		res = self.client.get(EXPORT_URL, {'as':'xml'})
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
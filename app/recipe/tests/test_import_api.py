@@ -0,0 +1,236 @@
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag, Ingredients
+from recipe import bulk
+
+
+IMPORT_URL = reverse('recipe:recipe-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def ndjson_file(items, name='recipes.ndjson'):
+	"""Returns an upload holding the items as JSON lines"""
+	content = ''.join(json.dumps(item) + '\n' for item in items)
+
+	return SimpleUploadedFile(name, content.encode('utf-8'))
+
+
+def corrupt_ndjson(count):
+	"""Returns JSON lines of the recipes followed by bytes that aren't UTF-8
+
+	The lines fill more than the buffer read at once, so the first batches
+	are decoded before the error is reached.
+	"""
+	item = {'title':'Soup ' + 'x' * 200, 'time_minutes':10, 'price':'5.00'}
+
+	return (json.dumps(item) + '\n').encode('utf-8') * count + b'\xff\xfe\n'
+
+
+class ImportApiTest(TestCase):
+	"""Tests for importing recipes"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		cache.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+
+	def test_import_creates_missing_names(self):
+		"""Test that existing tags are reused and missing ones created"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		items = [
+			{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'tags':['Vegan', 'Dinner'], 'ingredients':['Carrot']},
+			{'title':'Salad', 'time_minutes':5, 'price':'3.00', 'tags':['vegan', 'VEGAN']},
+		]
+
+		res = self.client.post(IMPORT_URL, {'file':ndjson_file(items)}, format='multipart')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['created'], 2)
+		self.assertEqual(res.data['tags_created'], 1)
+		self.assertEqual(res.data['ingredients_created'], 1)
+		soup = recipe.objects.get(user=self.user, title='Soup')
+		self.assertEqual(sorted(soup.tags.values_list('name', flat=True)), ['Dinner', 'Vegan'])
+		self.assertEqual(list(soup.ingredients.values_list('name', flat=True)), ['Carrot'])
+		self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+		self.assertIn(tag, recipe.objects.get(title='Salad').tags.all())
+
+
+	def test_import_reuses_existing_non_ascii_names(self):
+		"""Test that names Python and the database lowercase differently are reused"""
+		tag = Tag.objects.create(user=self.user, name='İstanbul Éclair')
+		items = [{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'tags':['İstanbul Éclair']}]
+
+		res = self.client.post(IMPORT_URL, {'file':ndjson_file(items)}, format='multipart')
+
+		self.assertEqual(res.data['tags_created'], 0)
+		self.assertEqual(list(recipe.objects.get(title='Soup').tags.all()), [tag])
+
+
+	def test_names_created_concurrently_are_reused(self):
+		"""Test that a batch whose names were created after the lookup is saved again"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		find_named = bulk.find_named
+		lookups = []
+
+		def stale_find_named(model, user, keys):
+			lookups.append(model)
+			return {} if lookups == [Tag] else find_named(model, user, keys)
+
+		items = [{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'tags':['vegan']}]
+		with patch('recipe.bulk.find_named', side_effect=stale_find_named):
+			res = self.client.post(IMPORT_URL, {'file':ndjson_file(items)}, format='multipart')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['tags_created'], 0)
+		self.assertEqual(list(recipe.objects.get(title='Soup').tags.all()), [tag])
+
+
+	def test_conflicting_batch_reports_saved_batches(self):
+		"""Test that a batch still conflicting after the retry is a 409 with the totals"""
+		Tag.objects.create(user=self.user, name='Vegan')
+		items = [{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'tags':['vegan']}]
+
+		with patch('recipe.bulk.find_named', side_effect=lambda model, user, keys: {}):
+			res = self.client.post(IMPORT_URL, {'file':ndjson_file(items)}, format='multipart')
+
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+		self.assertEqual(res.data['created'], 0)
+		self.assertIn('non_field_errors', res.data)
+		self.assertFalse(recipe.objects.exists())
+
+
+	def test_invalid_items_are_reported(self):
+		"""Test that invalid lines are skipped and reported with their number"""
+		content = b'{"title":"Soup","time_minutes":10,"price":"5.00"}\nnot json\n{"title":"Toast"}\n'
+		upload = SimpleUploadedFile('recipes.ndjson', content)
+
+		res = self.client.post(IMPORT_URL, {'file':upload}, format='multipart')
+
+		self.assertEqual(res.data['processed'], 3)
+		self.assertEqual(res.data['created'], 1)
+		self.assertEqual([error['line'] for error in res.data['errors']], [2, 3])
+		self.assertIn('time_minutes', res.data['errors'][1]['errors'])
+
+
+	def test_export_can_be_imported(self):
+		"""Test that a CSV export imports back into the same recipes"""
+		soup = recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5.00)
+		soup.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+		soup.ingredients.add(Ingredients.objects.create(user=self.user, name='Carrot'))
+		content = b''.join(self.client.get(EXPORT_URL, {'as':'csv'}).streaming_content)
+		upload = SimpleUploadedFile('recipes.csv', content)
+
+		res = self.client.post(IMPORT_URL, {'file':upload}, format='multipart')
+
+		self.assertEqual(res.data['created'], 1)
+		self.assertEqual(res.data['tags_created'], 0)
+		imported = recipe.objects.exclude(pk=soup.pk).get()
+		self.assertEqual(imported.title, 'Soup')
+		self.assertEqual(list(imported.tags.all()), list(soup.tags.all()))
+		self.assertEqual(list(imported.ingredients.all()), list(soup.ingredients.all()))
+
+
+	def test_names_with_separators_round_trip(self):
+		"""Test that names holding the CSV separator or backslashes import unchanged"""
+		soup = recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5.00)
+		names = ['Salt | Pepper', 'C:\\Spices\\', '|']
+		soup.ingredients.add(*[
+			Ingredients.objects.create(user=self.user, name=name) for name in names
+			])
+		content = b''.join(self.client.get(EXPORT_URL, {'as':'csv'}).streaming_content)
+		soup.delete()
+		Ingredients.objects.all().delete()
+		upload = SimpleUploadedFile('recipes.csv', content)
+
+		res = self.client.post(IMPORT_URL, {'file':upload}, format='multipart')
+
+		self.assertEqual(res.data['ingredients_created'], 3)
+		imported = recipe.objects.get(user=self.user)
+		self.assertEqual(
+			sorted(imported.ingredients.values_list('name', flat=True)),
+			sorted(names)
+			)
+
+
+	def test_imported_recipes_show_in_assigned_lists(self):
+		"""Test that the cached tag lists are invalidated by an import"""
+		url = reverse('recipe:tag-list')
+		self.assertEqual(self.client.get(url, {'assigned_only':1}).data['results'], [])
+
+		items = [{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'tags':['Vegan']}]
+		self.client.post(IMPORT_URL, {'file':ndjson_file(items)}, format='multipart')
+
+		res = self.client.get(url, {'assigned_only':1})
+		self.assertEqual(len(res.data['results']), 1)
+
+
+	def test_import_requires_a_file(self):
+		"""Test that a request without file is rejected"""
+		res = self.client.post(IMPORT_URL, {}, format='multipart')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+	def test_import_command(self):
+		"""Test that the command imports a file for the given user"""
+		items = [{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'ingredients':['Carrot']}]
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'recipes.ndjson')
+			with open(path, 'w') as f:
+				f.write(''.join(json.dumps(item) + '\n' for item in items))
+			out = io.StringIO()
+			call_command('import_recipes', path, user=self.user.email, stdout=out)
+
+		self.assertIn('Imported 1 of 1 recipes', out.getvalue())
+		self.assertTrue(recipe.objects.filter(user=self.user, title='Soup').exists())
+
+
+	def test_unreadable_file_reports_saved_batches(self):
+		"""Test that the totals of the batches saved before a decoding error are reported"""
+		upload = SimpleUploadedFile('recipes.ndjson', corrupt_ndjson(10))
+
+		res = self.client.post(IMPORT_URL, {'file':upload}, format='multipart')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('file', res.data)
+		self.assertEqual(res.data['created'], 0)
+		self.assertFalse(recipe.objects.filter(user=self.user).exists())
+
+
+	def test_import_command_reports_saved_batches(self):
+		"""Test that the command tells how many recipes were saved before a decoding error"""
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'recipes.ndjson')
+			with open(path, 'wb') as f:
+				f.write(corrupt_ndjson(100))
+			with self.assertRaises(CommandError) as context:
+				call_command(
+					'import_recipes', path,
+					user=self.user.email, batch_size=10, stdout=io.StringIO()
+					)
+
+		created = recipe.objects.filter(user=self.user).count()
+		self.assertGreater(created, 0)
+		self.assertLess(created, 100)
+		self.assertIn(f'after importing {created} of {created} recipes', str(context.exception))
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -36,6 +37,7 @@ class PrivateApiIngredientTest(TestCase):
 			password='password'
 			)
 
+		cache.clear()
 		self.client = APIClient()
 		self.client.force_authenticate(user=self.user)
 
@@ -51,7 +53,7 @@ class PrivateApiIngredientTest(TestCase):
 		ingredients = Ingredients.objects.all().order_by('-name')
 		serializer = IngredientSerializer(ingredients, many=True)
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(res.data['results'], serializer.data)
 
 
 	def test_for_ingredient_list_available(self):
@@ -68,8 +70,8 @@ class PrivateApiIngredientTest(TestCase):
 		res = self.client.get(url)
 
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(len(res.data), 1)
-		self.assertEqual(res.data[0]['name'], ingredients.name)
+		self.assertEqual(len(res.data['results']), 1)
+		self.assertEqual(res.data['results'][0]['name'], ingredients.name)
 
 
 	def test_for_ingredients_create(self):
@@ -120,5 +122,5 @@ class PrivateApiIngredientTest(TestCase):
 		serializer1 = IngredientSerializer(ingredient1)
 		serializer2 = IngredientSerializer(ingredient2)
 
-		self.assertIn(serializer1.data, res.data)
-		self.assertNotIn(serializer2.data, res.data)
\ No newline at end of file
+		self.assertIn(serializer1.data, res.data['results'])
+		self.assertNotIn(serializer2.data, res.data['results'])
\ No newline at end of file
@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredients, recipe
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredients-list')
+
+
+def sample_recipe(user, **params):
+	"""Creates and returns sample recipe"""
+	defaults = {
+	'title':'Sausages',
+	'time_minutes':10,
+	'price':5.00,
+	}
+
+	defaults.update(params)
+	return recipe.objects.create(user=user, **defaults)
+
+
+class ListCacheTest(TestCase):
+	"""Tests for caching the tag and ingredient lists"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		cache.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+
+	def names(self, url, params=None):
+		"""Returns the names listed at the url"""
+		res = self.client.get(url, params)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return [item['name'] for item in res.data['results']]
+
+
+	def test_list_is_served_from_cache(self):
+		"""Test that a repeated list doesn't hit the database for rows"""
+		Tag.objects.create(user=self.user, name='Vegan')
+		first = self.names(TAGS_URL)
+
+		with CaptureQueriesContext(connection) as ctx:
+			second = self.names(TAGS_URL)
+
+		self.assertEqual(first, second)
+		self.assertFalse(any(
+			'core_tag' in query['sql'] for query in ctx.captured_queries
+			))
+
+
+	def test_creating_tag_invalidates_list(self):
+		"""Test that a created tag is listed right away"""
+		self.assertEqual(self.names(TAGS_URL), [])
+
+		self.client.post(TAGS_URL, {'name':'Vegan'})
+
+		self.assertEqual(self.names(TAGS_URL), ['Vegan'])
+
+
+	def test_deleting_ingredient_invalidates_list(self):
+		"""Test that a deleted ingredient is no longer listed"""
+		ingredient = Ingredients.objects.create(user=self.user, name='Carrot')
+		self.assertEqual(self.names(INGREDIENTS_URL), ['Carrot'])
+
+		ingredient.delete()
+
+		self.assertEqual(self.names(INGREDIENTS_URL), [])
+
+
+	def test_assigning_tag_invalidates_assigned_list(self):
+		"""Test that assigned_only lists follow recipe changes"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		recipe = sample_recipe(user=self.user)
+		self.assertEqual(self.names(TAGS_URL, {'assigned_only':1}), [])
+
+		recipe.tags.add(tag)
+		self.assertEqual(self.names(TAGS_URL, {'assigned_only':1}), ['Vegan'])
+
+		recipe.delete()
+		self.assertEqual(self.names(TAGS_URL, {'assigned_only':1}), [])
+
+
+	def test_lists_are_cached_per_user(self):
+		"""Test that a user never gets another user's cached list"""
+		Ingredients.objects.create(user=self.user, name='Carrot')
+		self.names(INGREDIENTS_URL)
+
+		user2 = get_user_model().objects.create_user(
+			email='shubham@gmail.com',
+			password='password1'
+			)
+		self.client.force_authenticate(user=user2)
+
+		self.assertEqual(self.names(INGREDIENTS_URL), [])
@@ -0,0 +1,121 @@
+import base64
+import json
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def sample_recipe(user, **params):
+	"""Creates and returns sample recipe"""
+	defaults = {
+	'title':'Sausages',
+	'time_minutes':10,
+	'price':5.00,
+	}
+
+	defaults.update(params)
+	return recipe.objects.create(user=user, **defaults)
+
+
+def cursor(position):
+	"""Encodes the ordering values the way the pagination does"""
+	return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+
+class KeysetPaginationTest(TestCase):
+	"""Tests for paginating the list endpoints"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+
+	def walk(self, url, params):
+		"""Follows the next links and returns every page"""
+		pages = []
+		res = self.client.get(url, params)
+		while True:
+			self.assertEqual(res.status_code, status.HTTP_200_OK)
+			pages.append(res.data['results'])
+			if not res.data['next']:
+				return pages
+			res = self.client.get(res.data['next'])
+
+
+	def test_recipes_are_paginated(self):
+		"""Test that recipes are split in pages ordered by newest first"""
+		recipes = [sample_recipe(user=self.user) for i in range(5)]
+
+		pages = self.walk(RECIPES_URL, {'page_size':2})
+
+		self.assertEqual([len(page) for page in pages], [2, 2, 1])
+		ids = [item['id'] for page in pages for item in page]
+		self.assertEqual(ids, [r.id for r in reversed(recipes)])
+
+
+	def test_tags_are_paged_by_name(self):
+		"""Test that tags are paged in name order without gaps"""
+		for name in ['Vegan', 'Vegetarian', 'Breakfast', 'Dessert', 'Curry']:
+			Tag.objects.create(user=self.user, name=name)
+
+		pages = self.walk(TAGS_URL, {'page_size':2})
+
+		ids = [item['id'] for page in pages for item in page]
+		expected = Tag.objects.filter(user=self.user).order_by('-name', '-id')
+		self.assertEqual(ids, [tag.id for tag in expected])
+
+
+	def test_invalid_cursor(self):
+		"""Test that a tampered cursor is rejected"""
+		res = self.client.get(RECIPES_URL, {'cursor':'not-a-cursor'})
+
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+	def test_cursor_with_wrong_types(self):
+		"""Test that a cursor holding values of the wrong type is rejected"""
+		for position in (['a', 'x'], [None, 1], [['Vegan'], 1]):
+			res = self.client.get(TAGS_URL, {'cursor':cursor(position)})
+			self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+		res = self.client.get(RECIPES_URL, {'cursor':cursor(['x'])})
+
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+	def test_cursor_from_another_ordering(self):
+		"""Test that a name cursor reused on the usage ordering is rejected"""
+		for name in ['Vegan', 'Vegetarian', 'Breakfast']:
+			Tag.objects.create(user=self.user, name=name)
+		next_link = self.client.get(TAGS_URL, {'page_size':1}).data['next']
+		name_cursor = parse_qs(urlparse(next_link).query)['cursor'][0]
+
+		res = self.client.get(TAGS_URL, {'ordering':'-usage', 'cursor':name_cursor})
+
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+	def test_page_size_is_bounded(self):
+		"""Test that the page size can't exceed the maximum"""
+		sample_recipe(user=self.user)
+
+		res = self.client.get(RECIPES_URL, {'page_size':10 ** 6})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(res.data['results']), 1)
+		self.assertIsNone(res.data['next'])
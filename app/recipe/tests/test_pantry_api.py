@@ -0,0 +1,140 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Ingredients
+
+
+COOKABLE_URL = reverse('recipe:recipe-cookable')
+
+
+def sample_recipe(user, title, ingredients):
+	"""Creates a recipe using the given ingredients"""
+	obj = recipe.objects.create(user=user, title=title, time_minutes=10, price=5.00)
+	obj.ingredients.add(*ingredients)
+
+	return obj
+
+
+
+class PantryApiTest(TestCase):
+	"""Tests for the cookable recipes endpoint"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		cache.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+		self.carrot = Ingredients.objects.create(user=self.user, name='Carrot')
+		self.potato = Ingredients.objects.create(user=self.user, name='Potato')
+		self.onion = Ingredients.objects.create(user=self.user, name='Onion')
+
+
+	def test_recipes_are_ranked_by_coverage(self):
+		"""Test that fully covered recipes come before partial matches"""
+		soup = sample_recipe(self.user, 'Soup', [self.carrot, self.potato, self.onion])
+		mash = sample_recipe(self.user, 'Mash', [self.potato])
+		sample_recipe(self.user, 'Salad', [self.onion])
+
+		res = self.client.get(COOKABLE_URL, {'pantry':f'{self.carrot.id},{self.potato.id}'})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual([item['id'] for item in res.data['results']], [mash.id, soup.id])
+		self.assertEqual(res.data['results'][1], {
+			'id':soup.id,
+			'title':'Soup',
+			'matched':2,
+			'total':3,
+			'missing':[self.onion.id],
+			})
+
+
+	def test_other_users_recipes_are_ignored(self):
+		"""Test that only the user's own recipes are matched"""
+		user2 = get_user_model().objects.create_user(
+			email='shubham@gmail.com',
+			password='password1'
+			)
+		sample_recipe(user2, 'Mash', [self.potato])
+
+		res = self.client.get(COOKABLE_URL, {'pantry':self.potato.id})
+
+		self.assertEqual(res.data['results'], [])
+
+
+	def test_pantry_is_required(self):
+		"""Test that a missing or malformed pantry is rejected"""
+		res = self.client.get(COOKABLE_URL, {'pantry':'carrot'})
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class PantryIndexUpdateTest(TransactionTestCase):
+	"""Tests that committed changes update the pantry index in place"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		cache.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+		self.carrot = Ingredients.objects.create(user=self.user, name='Carrot')
+		self.potato = Ingredients.objects.create(user=self.user, name='Potato')
+		self.soup = sample_recipe(self.user, 'Soup', [self.carrot])
+		self.client.get(COOKABLE_URL, {'pantry':self.carrot.id})
+
+
+	def test_added_ingredients_are_indexed(self):
+		"""Test that an assignment is applied without rebuilding the index"""
+		self.soup.ingredients.add(self.potato)
+
+		# Only the titles are queried, the index is up to date.
+		with self.assertNumQueries(1):
+			res = self.client.get(COOKABLE_URL, {'pantry':self.carrot.id})
+
+		self.assertEqual(res.data['results'][0]['missing'], [self.potato.id])
+
+
+	def test_deleted_recipes_and_ingredients_are_dropped(self):
+		"""Test that deletions are reflected in the matches"""
+		carrot_id = self.carrot.id
+		self.carrot.delete()
+		res = self.client.get(COOKABLE_URL, {'pantry':carrot_id})
+		self.assertEqual(res.data['results'], [])
+
+		self.soup.ingredients.add(self.potato)
+		self.soup.delete()
+		res = self.client.get(COOKABLE_URL, {'pantry':self.potato.id})
+		self.assertEqual(res.data['results'], [])
+
+
+	@override_settings(RECIPE_PANTRY_MAX_AGE=60)
+	def test_unsignalled_changes_are_picked_up_after_max_age(self):
+		"""Test that the index is rebuilt once it's older than the max age"""
+		recipe.ingredients.through.objects.bulk_create([
+			recipe.ingredients.through(recipe_id=self.soup.id, ingredients_id=self.potato.id)
+			])
+		res = self.client.get(COOKABLE_URL, {'pantry':self.potato.id})
+		self.assertEqual(res.data['results'], [])
+
+		later = time.monotonic() + 61
+		with patch('recipe.pantry.time.monotonic', return_value=later):
+			res = self.client.get(COOKABLE_URL, {'pantry':self.potato.id})
+
+		self.assertEqual(res.data['results'][0]['id'], self.soup.id)
@@ -0,0 +1,86 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag, Ingredients
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipes(user, count):
+	"""Creates recipes with a tag and an ingredient each"""
+	recipes = []
+	for i in range(count):
+		recipes.append(recipe.objects.create(
+			user=user,
+			title=f'Recipe {i}',
+			time_minutes=10,
+			price=5.00
+			))
+		pk = recipes[-1].pk
+		recipes[-1].tags.add(Tag.objects.create(user=user, name=f'Tag {pk}'))
+		recipes[-1].ingredients.add(
+			Ingredients.objects.create(user=user, name=f'Ingredient {pk}')
+			)
+
+	return recipes
+
+
+class RecipeQueryCountTest(TestCase):
+	"""Tests that the number of queries doesn't grow with the result size"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+
+	def count_queries(self, url):
+		"""Returns the number of queries run while requesting the url"""
+		with CaptureQueriesContext(connection) as ctx:
+			res = self.client.get(url)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return len(ctx.captured_queries)
+
+
+	def test_recipe_list_query_count_is_constant(self):
+		"""Test that listing recipes runs the same queries for any size"""
+		create_recipes(self.user, 2)
+		small = self.count_queries(RECIPES_URL)
+
+		create_recipes(self.user, 20)
+		large = self.count_queries(RECIPES_URL)
+
+		self.assertEqual(small, large)
+
+
+	def test_recipe_detail_query_count(self):
+		"""Test that retrieving a recipe doesn't query once per related object"""
+		few = create_recipes(self.user, 1)[0]
+		many = create_recipes(self.user, 1)[0]
+		for i in range(10):
+			many.tags.add(Tag.objects.create(user=self.user, name=f'Extra {i}'))
+			many.ingredients.add(
+				Ingredients.objects.create(user=self.user, name=f'Extra {i}')
+				)
+
+		self.assertEqual(
+			self.count_queries(detail_url(few.id)),
+			self.count_queries(detail_url(many.id))
+			)
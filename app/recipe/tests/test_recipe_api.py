@@ -3,7 +3,7 @@ import tempfile
 
 from PIL import Image
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -11,6 +11,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import recipe, Tag, Ingredients
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
@@ -87,7 +88,7 @@ class PrivateRecipeApiTest(TestCase):
 		serializer = RecipeSerializer(recipes, many=True)
 
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(res.data['results'], serializer.data)
 
 
 	def test_for_list_available(self):
@@ -106,8 +107,8 @@ class PrivateRecipeApiTest(TestCase):
 		serializer = RecipeSerializer(recipes, many=True)
 
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(len(res.data), 1)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(len(res.data['results']), 1)
+		self.assertEqual(res.data['results'], serializer.data)
 
 
 	def test_recipe_detail(self):
@@ -146,7 +147,7 @@ class PrivateRecipeApiTest(TestCase):
 	def test_for_creating_recipe_with_tags(self):
 		"""Test for creating recipe with tags"""
 		tag1 = sample_tags(user=self.user)
-		tag2 = sample_tags(user=self.user)
+		tag2 = sample_tags(user=self.user, name='Dessert')
 		payload = {
 		'title':'Sausages',
 		'tags':[tag1.id, tag2.id],
@@ -169,7 +170,7 @@ class PrivateRecipeApiTest(TestCase):
 	def test_for_creating_recipe_with_ingredients(self):
 		"""Test for creating recipe with ingredients"""
 		ingredient1 = sample_ingredients(user=self.user)
-		ingredient2 = sample_ingredients(user=self.user)
+		ingredient2 = sample_ingredients(user=self.user, name='Salt')
 		payload = {
 		'title':'Sausages',
 		'ingredients':[ingredient1.id, ingredient2.id],
@@ -230,6 +231,38 @@ class PrivateRecipeApiTest(TestCase):
 		self.assertEqual(recipe.price, payload['price'])
 
 
+	def test_filtering_returns_each_recipe_once(self):
+		"""Test that a recipe matching several tags is listed once"""
+		recipe = sample_recipe(user=self.user)
+		tag1 = sample_tags(user=self.user, name='Vegan')
+		tag2 = sample_tags(user=self.user, name='Curry')
+		recipe.tags.add(tag1, tag2)
+
+		url = reverse('recipe:recipe-list')
+		res = self.client.get(url, {'tags':f'{tag1.id},{tag2.id}'})
+
+		self.assertEqual(len(res.data['results']), 1)
+
+
+	def test_filtering_matching_all_ingredients(self):
+		"""Test that match=all returns recipes having every ingredient"""
+		ingredient1 = sample_ingredients(user=self.user, name='Carrot')
+		ingredient2 = sample_ingredients(user=self.user, name='Potato')
+		recipe1 = sample_recipe(user=self.user, title='Stew')
+		recipe1.ingredients.add(ingredient1, ingredient2)
+		recipe2 = sample_recipe(user=self.user, title='Soup')
+		recipe2.ingredients.add(ingredient1)
+
+		url = reverse('recipe:recipe-list')
+		res = self.client.get(url, {
+			'ingredients':f'{ingredient1.id},{ingredient2.id}',
+			'match':'all'
+			})
+
+		ids = [item['id'] for item in res.data['results']]
+		self.assertEqual(ids, [recipe1.id])
+
+
 
 class UploadingImageTest(TestCase):
 
@@ -245,6 +278,10 @@ class UploadingImageTest(TestCase):
 
 
 	def tearDown(self):
+		if self.recipe.image:
+			storage = self.recipe.image.storage
+			for key, size, image_format in images.VARIANTS:
+				storage.delete(images.variant_name(self.recipe.image.name, key))
 		self.recipe.image.delete()
 
 
@@ -261,6 +298,96 @@ class UploadingImageTest(TestCase):
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
 		self.assertIn('image', res.data)
 		self.assertTrue(os.path.exists(self.recipe.image.path))
+		self.assertIn('thumbnail', res.data['image_variants'])
+		self.assertIn('medium', res.data['image_variants'])
+
+
+	def test_for_generating_image_variants(self):
+		"""Test that the resized variants are stored next to the image"""
+		url = image_upload_url(self.recipe.id)
+		with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+			img = Image.new('RGB', (1600, 800))
+			img.save(ntf, format='JPEG')
+			ntf.seek(0)
+			self.client.post(url, {'image': ntf}, format='multipart')
+		self.recipe.refresh_from_db()
+
+		images.generate_variants(self.recipe.image.name)
+
+		storage = self.recipe.image.storage
+		thumbnail = images.variant_name(self.recipe.image.name, 'thumbnail')
+		with Image.open(storage.path(thumbnail)) as variant:
+			self.assertEqual(variant.size, (150, 75))
+		medium = images.variant_name(self.recipe.image.name, 'medium')
+		with Image.open(storage.path(medium)) as variant:
+			self.assertEqual(variant.size, (800, 400))
+
+
+	def upload(self, img, image_format='JPEG', suffix='.jpg'):
+		"""Uploads the image to the recipe"""
+		url = image_upload_url(self.recipe.id)
+		with tempfile.NamedTemporaryFile(suffix=suffix) as ntf:
+			img.save(ntf, format=image_format)
+			ntf.seek(0)
+			return self.client.post(url, {'image': ntf}, format='multipart')
+
+
+	@override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=1024)
+	def test_for_too_large_image(self):
+		"""Test that uploads over the size limit are rejected"""
+		res = self.upload(Image.effect_noise((200, 200), 100))
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('image', res.data)
+		self.recipe.refresh_from_db()
+		self.assertFalse(self.recipe.image)
+
+
+	@override_settings(RECIPE_IMAGE_MAX_PIXELS=50)
+	def test_for_image_with_too_many_pixels(self):
+		"""Test that images are rejected from their header dimensions"""
+		res = self.upload(Image.new('RGB', (10, 10)))
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+	def test_for_file_that_is_not_an_image(self):
+		"""Test that files without image magic bytes are rejected"""
+		url = image_upload_url(self.recipe.id)
+		with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+			ntf.write(b'not an image at all')
+			ntf.seek(0)
+			res = self.client.post(url, {'image': ntf}, format='multipart')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+	def test_for_png_image(self):
+		"""Test that the stored extension follows the image format"""
+		res = self.upload(Image.new('RGB', (10, 10)), 'PNG', '.png')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.recipe.refresh_from_db()
+		self.assertTrue(self.recipe.image.name.endswith('.png'))
+
+
+	def test_for_identical_images_stored_once(self):
+		"""Test that uploading the same image twice reuses the stored file"""
+		img = Image.new('RGB', (10, 10))
+		self.upload(img)
+		self.recipe.refresh_from_db()
+		first = self.recipe.image.name
+
+		other = sample_recipe(user=self.user, title='Curry')
+		url = image_upload_url(other.id)
+		with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+			img.save(ntf, format='JPEG')
+			ntf.seek(0)
+			res = self.client.post(url, {'image': ntf}, format='multipart')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		other.refresh_from_db()
+		self.assertEqual(other.image.name, first)
 
 
 	def test_for_invalid_image(self):
@@ -288,9 +415,9 @@ class UploadingImageTest(TestCase):
 		serializer2 = RecipeSerializer(recipe2)
 		serializer3 = RecipeSerializer(recipe3)
 
-		self.assertIn(serializer1.data, res.data)
-		self.assertIn(serializer2.data, res.data)
-		self.assertNotIn(serializer3.data, res.data)
+		self.assertIn(serializer1.data, res.data['results'])
+		self.assertIn(serializer2.data, res.data['results'])
+		self.assertNotIn(serializer3.data, res.data['results'])
 
 
 	def test_for_filtering_recipes_with_ingredients(self):
@@ -310,6 +437,6 @@ class UploadingImageTest(TestCase):
 		serializer2 = RecipeSerializer(recipe2)
 		serializer3 = RecipeSerializer(recipe3)
 
-		self.assertIn(serializer1.data, res.data)
-		self.assertIn(serializer2.data, res.data)
-		self.assertNotIn(serializer3.data, res.data)
\ No newline at end of file
+		self.assertIn(serializer1.data, res.data['results'])
+		self.assertIn(serializer2.data, res.data['results'])
+		self.assertNotIn(serializer3.data, res.data['results'])
\ No newline at end of file
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag, Ingredients
+from core.renderers import FastJSONRenderer
+from recipe.rows import RecipeRows
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeRowsTest(TestCase):
+	"""Tests that the fast recipe read paths match the serializer output"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+		tags = [Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'Dinner', 'Lunch')]
+		carrot = Ingredients.objects.create(user=self.user, name='Carrot')
+		soup = recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5)
+		soup.tags.add(tags[2], tags[0])
+		soup.ingredients.add(carrot)
+		recipe.objects.create(
+			user=self.user,
+			title='Toast',
+			time_minutes=5,
+			price='2.5',
+			link='https://example.com/toast'
+			)
+
+
+	def expected_content(self, **kwargs):
+		"""Returns the list rendered from the serializer"""
+		queryset = recipe.objects.filter(user=self.user).order_by('-id').prefetch_related(
+			Prefetch('tags', queryset=Tag.objects.order_by('id')),
+			Prefetch('ingredients', queryset=Ingredients.objects.order_by('id')),
+			)
+		data = RecipeSerializer(queryset, many=True, **kwargs).data
+
+		return FastJSONRenderer().render(OrderedDict([('next', None), ('results', data)]))
+
+
+	def test_list_matches_serializer(self):
+		"""Test that the list is byte identical to the serializer output"""
+		res = self.client.get(RECIPES_URL)
+
+		self.assertIsInstance(res.data['results'].serializer, RecipeRows)
+		self.assertEqual(res.content, self.expected_content())
+
+
+	def test_sparse_list_matches_serializer(self):
+		"""Test that requested fields keep the serializer's field order"""
+		res = self.client.get(RECIPES_URL, {'fields':'tags,price,id'})
+
+		self.assertEqual(res.content, self.expected_content(fields=['tags', 'price', 'id']))
+
+
+	def test_expanded_list_uses_serializer(self):
+		"""Test that nested relations are still serialized"""
+		res = self.client.get(RECIPES_URL, {'expand':'tags'})
+
+		self.assertNotIsInstance(res.data['results'].serializer, RecipeRows)
+		self.assertEqual(res.data['results'][1]['tags'][0]['name'], 'Vegan')
+
+
+	def test_detail_reads_aggregated_relations(self):
+		"""Test that JSON aggregates annotated on a recipe replace the prefetches"""
+		soup = recipe.objects.get(title='Soup')
+		expected = RecipeDetailSerializer(soup).data
+		soup = recipe.objects.get(title='Soup')
+		soup.tags_json = [{'id':tag.id, 'name':tag.name} for tag in soup.tags.order_by('id')]
+		soup.ingredients_json = [{'id':item.id, 'name':item.name} for item in soup.ingredients.all()]
+
+		with self.assertNumQueries(0):
+			data = RecipeDetailSerializer(soup).data
+
+		self.assertEqual(data, expected)
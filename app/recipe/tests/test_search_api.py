@@ -0,0 +1,183 @@
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag, Ingredients
+from recipe import search
+
+
+SEARCH_URL = reverse('recipe:recipe-search')
+
+
+def sample_recipe(user, **params):
+	"""Creates and returns sample recipe"""
+	defaults = {
+	'title':'Sausages',
+	'time_minutes':10,
+	'price':5.00,
+	}
+
+	defaults.update(params)
+	return recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchApiTest(TestCase):
+	"""Tests for searching recipes"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+
+	def search(self, text):
+		"""Returns the ids of the recipes found for the text"""
+		res = self.client.get(SEARCH_URL, {'q':text})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return [item['id'] for item in res.data['results']]
+
+
+	def test_search_by_title(self):
+		"""Test that recipes are found by title"""
+		soup = sample_recipe(user=self.user, title='Tomato soup')
+		sample_recipe(user=self.user, title='Chicken curry')
+
+		self.assertEqual(self.search('soup'), [soup.id])
+
+
+	def test_search_by_tag_and_ingredient_names(self):
+		"""Test that recipes are found by their tags and ingredients"""
+		curry = sample_recipe(user=self.user, title='Curry')
+		curry.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+		stew = sample_recipe(user=self.user, title='Stew')
+		stew.ingredients.add(Ingredients.objects.create(user=self.user, name='Carrot'))
+
+		self.assertEqual(self.search('spicy'), [curry.id])
+		self.assertEqual(self.search('carrot'), [stew.id])
+
+
+	def test_title_matches_rank_first(self):
+		"""Test that a title match ranks above a tag match"""
+		tagged = sample_recipe(user=self.user, title='Stew')
+		tagged.tags.add(Tag.objects.create(user=self.user, name='Soup'))
+		titled = sample_recipe(user=self.user, title='Soup')
+
+		self.assertEqual(self.search('soup'), [titled.id, tagged.id])
+
+
+	def test_search_is_limited_to_user(self):
+		"""Test that other users' recipes are never returned"""
+		user2 = get_user_model().objects.create_user(
+			email='shubham@gmail.com',
+			password='password1'
+			)
+		sample_recipe(user=user2, title='Soup')
+
+		self.assertEqual(self.search('soup'), [])
+
+
+	def test_search_requires_query(self):
+		"""Test that a missing query is rejected"""
+		res = self.client.get(SEARCH_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class FullTextSearchSqlTest(TestCase):
+	"""Tests for the PostgreSQL full text queries, compiled on any database"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+
+
+	@patch('recipe.search.is_full_text', return_value=True)
+	def test_search_matches_and_ranks_the_vector(self, is_full_text):
+		"""Test that the text is matched and ranked against the search vector"""
+		queryset = search.search(recipe.objects.filter(user=self.user), 'tomato soup')
+		sql, params = queryset.query.sql_with_params()
+
+		self.assertIn('"core_recipe"."search_vector" @@ (plainto_tsquery(', sql)
+		self.assertIn('ts_rank("core_recipe"."search_vector", plainto_tsquery(', sql)
+		self.assertNotIn('LIKE', sql)
+		self.assertIn('tomato soup', params)
+		self.assertIn(search.CONFIG, params)
+		self.assertEqual(queryset.query.order_by, ('-rank', '-id'))
+
+
+	def test_vectors_are_rebuilt_with_the_update_statement(self):
+		"""Test that the vectors of the given recipes are rebuilt in one statement"""
+		fake = MagicMock(vendor='postgresql')
+		cursor = fake.cursor.return_value.__enter__.return_value
+
+		with patch('recipe.search.connection', fake):
+			search.update_search_vectors(iter([3, 5]))
+
+		cursor.execute.assert_called_once_with(
+			search.UPDATE_SQL,
+			{'config': search.CONFIG, 'ids': [3, 5]}
+			)
+
+
+	@patch('recipe.search.update_search_vectors')
+	@patch('recipe.search.is_full_text', return_value=True)
+	def test_renames_rebuild_the_vectors_of_linked_recipes(self, is_full_text, update):
+		"""Test that renaming a tag or an ingredient reindexes its recipes"""
+		tag = Tag.objects.create(user=self.user, name='Spicy')
+		ingredient = Ingredients.objects.create(user=self.user, name='Carrot')
+		curry = sample_recipe(user=self.user, title='Curry')
+		curry.tags.add(tag)
+		stew = sample_recipe(user=self.user, title='Stew')
+		stew.ingredients.add(ingredient)
+		update.reset_mock()
+
+		tag.name = 'Hot'
+		tag.save()
+		ingredient.name = 'Carrots'
+		ingredient.save()
+
+		self.assertEqual(
+			[set(call[0][0]) for call in update.call_args_list],
+			[{curry.id}, {stew.id}]
+			)
+
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Full text search needs PostgreSQL')
+class FullTextSearchApiTest(RecipeSearchApiTest):
+	"""Tests for searching recipes with the PostgreSQL search vectors"""
+
+	def test_words_are_stemmed(self):
+		"""Test that inflected words match through the english config"""
+		soup = sample_recipe(user=self.user, title='Tomato soups')
+
+		self.assertEqual(self.search('soup'), [soup.id])
+
+
+	def test_renamed_tag_is_searchable(self):
+		"""Test that a recipe is found by the new name of its tag"""
+		curry = sample_recipe(user=self.user, title='Curry')
+		tag = Tag.objects.create(user=self.user, name='Spicy')
+		curry.tags.add(tag)
+
+		tag.name = 'Fiery'
+		tag.save()
+
+		self.assertEqual(self.search('fiery'), [curry.id])
+		self.assertEqual(self.search('spicy'), [])
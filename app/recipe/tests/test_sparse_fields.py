@@ -0,0 +1,89 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag, Ingredients
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsApiTest(TestCase):
+	"""Tests for the fields and expand parameters of the recipe api"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+		self.tag = Tag.objects.create(user=self.user, name='Vegan')
+		self.ingredient = Ingredients.objects.create(user=self.user, name='Carrot')
+		self.soup = recipe.objects.create(
+			user=self.user,
+			title='Soup',
+			time_minutes=10,
+			price=5.00
+			)
+		self.soup.tags.add(self.tag)
+		self.soup.ingredients.add(self.ingredient)
+
+
+	def test_list_returns_requested_fields(self):
+		"""Test that only the requested fields are returned"""
+		res = self.client.get(RECIPES_URL, {'fields':'id,title'})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['results'], [{'id':self.soup.id, 'title':'Soup'}])
+
+
+	def test_unused_columns_and_relations_are_not_loaded(self):
+		"""Test that the list only selects the requested columns"""
+		with CaptureQueriesContext(connection) as ctx:
+			self.client.get(RECIPES_URL, {'fields':'id,title'})
+
+		sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+		self.assertNotIn('"price"', sql)
+		self.assertNotIn('core_recipe_tags', sql)
+		self.assertNotIn('core_recipe_ingredients', sql)
+
+
+	def test_list_expands_relations(self):
+		"""Test that expanded relations are nested on list"""
+		res = self.client.get(RECIPES_URL, {'expand':'tags'})
+
+		item = res.data['results'][0]
+		self.assertEqual(item['tags'], [{'id':self.tag.id, 'name':'Vegan'}])
+		self.assertEqual(item['ingredients'], [self.ingredient.id])
+
+
+	def test_detail_returns_requested_fields(self):
+		"""Test that the detail view also accepts the fields parameter"""
+		res = self.client.get(detail_url(self.soup.id), {'fields':'title,ingredients'})
+
+		self.assertEqual(res.data, {
+			'title':'Soup',
+			'ingredients':[{'id':self.ingredient.id, 'name':'Carrot'}],
+			})
+
+
+	def test_unknown_fields_are_rejected(self):
+		"""Test that asking for an unknown field is a bad request"""
+		res = self.client.get(RECIPES_URL, {'fields':'id,secret'})
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('fields', res.data)
+
+		res = self.client.get(RECIPES_URL, {'expand':'title'})
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,6 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -6,6 +9,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag, recipe
+from recipe import bulk
 from recipe.serializers import TagSerializer
 
 
@@ -34,6 +38,7 @@ class PrivateUserTagTest(TestCase):
 			password='password123'
 			)
 
+		cache.clear()
 		self.client = APIClient()
 
 		self.client.force_authenticate(user=self.user)
@@ -53,7 +58,7 @@ class PrivateUserTagTest(TestCase):
 		
 
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(res.data['results'], serializer.data)
 
 
 	def test_for_tag_available(self):
@@ -69,8 +74,8 @@ class PrivateUserTagTest(TestCase):
 		res = self.client.get(url)
 
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(len(res.data), 1)
-		self.assertEqual(res.data[0]['name'], tag.name)
+		self.assertEqual(len(res.data['results']), 1)
+		self.assertEqual(res.data['results'][0]['name'], tag.name)
 
 
 	def test_for_creating_tags(self):
@@ -87,6 +92,48 @@ class PrivateUserTagTest(TestCase):
 		self.assertTrue(exists)
 
 
+	def test_creating_existing_tag_returns_it(self):
+		"""Test that creating a tag the user has in any case doesn't duplicate it"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+
+		url = reverse('recipe:tag-list')
+		res = self.client.post(url, {'name':'vegan'})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['id'], tag.id)
+		self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+
+	def test_creating_existing_non_ascii_tag_returns_it(self):
+		"""Test that names Python and the database lowercase differently are still matched"""
+		tag = Tag.objects.create(user=self.user, name='İstanbul Éclair')
+
+		url = reverse('recipe:tag-list')
+		res = self.client.post(url, {'name':'İstanbul Éclair'})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['id'], tag.id)
+
+
+	def test_tag_created_concurrently_is_returned(self):
+		"""Test that a name created after the lookup returns the other request's tag"""
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		find_named = bulk.find_named
+		lookups = []
+
+		def stale_find_named(model, user, names):
+			lookups.append(names)
+			return {} if len(lookups) == 1 else find_named(model, user, names)
+
+		url = reverse('recipe:tag-list')
+		with patch('recipe.bulk.find_named', side_effect=stale_find_named):
+			res = self.client.post(url, {'name':'VEGAN'})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['id'], tag.id)
+		self.assertEqual(len(lookups), 2)
+
+
 	def test_for_invalid_tag(self):
 		"""Test for invalid tag"""
 		payload = {'name':''}
@@ -121,5 +168,5 @@ class PrivateUserTagTest(TestCase):
 		serializer1 = TagSerializer(tag1)
 		serializer2 = TagSerializer(tag2)
 
-		self.assertIn(serializer1.data, res.data)
-		self.assertNotIn(serializer2.data, res.data)		
\ No newline at end of file
+		self.assertIn(serializer1.data, res.data['results'])
+		self.assertNotIn(serializer2.data, res.data['results'])		
\ No newline at end of file
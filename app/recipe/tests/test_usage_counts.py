@@ -0,0 +1,147 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import recipe, Tag, Ingredients
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class UsageCountTest(TestCase):
+	"""Tests for the recipe counts of tags and ingredients"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1'
+			)
+		cache.clear()
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+		self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+		self.dinner = Tag.objects.create(user=self.user, name='Dinner')
+		self.carrot = Ingredients.objects.create(user=self.user, name='Carrot')
+
+
+	def create_recipe(self, title='Soup'):
+
+		return recipe.objects.create(user=self.user, title=title, time_minutes=10, price=5.00)
+
+
+	def assertCounts(self, **counts):
+		"""Asserts the recipe counts of the tags of the test"""
+		for name, count in counts.items():
+			getattr(self, name).refresh_from_db()
+			self.assertEqual(getattr(self, name).recipe_count, count)
+
+
+	def test_counts_follow_assignments(self):
+		"""Test that adding, removing and clearing links updates the counts"""
+		soup = self.create_recipe()
+		salad = self.create_recipe('Salad')
+		soup.tags.add(self.vegan, self.dinner)
+		self.vegan.recipe_set.add(salad)
+		soup.ingredients.add(self.carrot)
+		self.assertCounts(vegan=2, dinner=1, carrot=1)
+
+		soup.tags.remove(self.dinner)
+		soup.tags.remove(self.dinner)
+		self.assertCounts(vegan=2, dinner=0)
+
+		soup.tags.clear()
+		self.assertCounts(vegan=1)
+
+		self.vegan.recipe_set.clear()
+		self.assertCounts(vegan=0, carrot=1)
+
+
+	def test_deleting_a_recipe_updates_counts(self):
+		"""Test that the links deleted with a recipe are uncounted"""
+		soup = self.create_recipe()
+		soup.tags.add(self.vegan)
+		soup.ingredients.add(self.carrot)
+
+		soup.delete()
+
+		self.assertCounts(vegan=0, carrot=0)
+
+
+	def test_deleting_recipes_changes_the_usage_list_etag(self):
+		"""Test that a reordering by deleted recipes isn't answered with 304"""
+		soups = [self.create_recipe(title) for title in ('Soup', 'Stew')]
+		for soup in soups:
+			soup.tags.add(self.vegan)
+		self.create_recipe('Salad').tags.add(self.dinner)
+		res = self.client.get(TAGS_URL, {'ordering':'-usage'})
+		self.assertEqual([tag['name'] for tag in res.data['results']], ['Vegan', 'Dinner'])
+
+		for soup in soups:
+			soup.delete()
+		res = self.client.get(
+			TAGS_URL,
+			{'ordering':'-usage'},
+			HTTP_IF_NONE_MATCH=res['ETag']
+			)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual([tag['name'] for tag in res.data['results']], ['Dinner', 'Vegan'])
+
+
+	def test_bulk_writes_update_counts(self):
+		"""Test that bulk saved recipes update the counts"""
+		payload = [
+			{'title':'Soup', 'time_minutes':10, 'price':'5.00', 'tags':[self.vegan.id], 'ingredients':[]},
+			{'title':'Salad', 'time_minutes':5, 'price':'3.00', 'tags':[self.vegan.id], 'ingredients':[self.carrot.id]},
+		]
+
+		self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		self.assertCounts(vegan=2, dinner=0, carrot=1)
+
+
+	def test_assigned_only_lists_each_tag_once(self):
+		"""Test that a tag assigned to several recipes is listed once"""
+		for title in ('Soup', 'Salad'):
+			self.create_recipe(title).tags.add(self.vegan)
+
+		res = self.client.get(TAGS_URL, {'assigned_only':1})
+
+		self.assertEqual([tag['name'] for tag in res.data['results']], ['Vegan'])
+
+
+	def test_tags_ordered_by_usage(self):
+		"""Test that ordering=-usage lists the most used tags first, page by page"""
+		lunch = Tag.objects.create(user=self.user, name='Lunch')
+		for title in ('Soup', 'Salad'):
+			self.create_recipe(title).tags.add(self.dinner)
+		self.create_recipe('Toast').tags.add(lunch)
+
+		res = self.client.get(TAGS_URL, {'ordering':'-usage', 'page_size':2})
+		names = [tag['name'] for tag in res.data['results']]
+		res = self.client.get(res.data['next'])
+		names += [tag['name'] for tag in res.data['results']]
+
+		self.assertEqual(names, ['Dinner', 'Lunch', 'Vegan'])
+		self.assertIsNone(res.data['next'])
+
+
+	def test_recount_command(self):
+		"""Test that the command repairs counts that drifted"""
+		self.create_recipe().tags.add(self.vegan)
+		Tag.objects.update(recipe_count=5)
+		out = io.StringIO()
+
+		call_command('recount_usage', user=self.user.email, stdout=out)
+
+		self.assertIn('Recounted tags, 2 changed', out.getvalue())
+		self.assertCounts(vegan=1, dinner=0)
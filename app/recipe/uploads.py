@@ -0,0 +1,130 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler, StopUpload
+from django.utils.translation import gettext_lazy as _
+
+from PIL import Image
+
+
+SIGNATURES = (
+	(b'\xff\xd8\xff', 'JPEG'),
+	(b'\x89PNG\r\n\x1a\n', 'PNG'),
+	(b'GIF87a', 'GIF'),
+	(b'GIF89a', 'GIF'),
+)
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class InvalidImage(Exception):
+	"""Raised when an upload isn't an acceptable image"""
+
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+	"""Streams uploads to a temporary file, hashing them on the way
+
+	The upload is stopped as soon as it grows past max_size, so oversized
+	files are never fully written to disk.
+	"""
+
+	def __init__(self, request=None, max_size=None):
+		super().__init__(request)
+		self.max_size = max_size
+		self.exceeded = False
+
+
+	def new_file(self, *args, **kwargs):
+		super().new_file(*args, **kwargs)
+		self.sha256 = hashlib.sha256()
+		self.received = 0
+
+
+	def receive_data_chunk(self, raw_data, start):
+		self.received += len(raw_data)
+		if self.max_size is not None and self.received > self.max_size:
+			self.exceeded = True
+			raise StopUpload(connection_reset=False)
+		self.sha256.update(raw_data)
+
+		return super().receive_data_chunk(raw_data, start)
+
+
+	def file_complete(self, file_size):
+		uploaded = super().file_complete(file_size)
+		uploaded.sha256 = self.sha256.hexdigest()
+
+		return uploaded
+
+
+
+def sniff_format(f):
+	"""Returns the image format announced by the magic bytes of a file"""
+	f.seek(0)
+	header = f.read(12)
+	f.seek(0)
+	for signature, image_format in SIGNATURES:
+		if header.startswith(signature):
+			return image_format
+	if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+		return 'WEBP'
+
+	return None
+
+
+def inspect_image(f):
+	"""Validates an uploaded image from its header only
+
+	Pillow opens images lazily, so the size is read without decoding any
+	pixel data and decompression bombs are rejected before they expand.
+	"""
+	if f.size > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+		raise InvalidImage(_('The image file is too large.'))
+
+	image_format = sniff_format(f)
+	if image_format is None:
+		raise InvalidImage(_('Upload a valid image. The file is not a supported image format.'))
+
+	try:
+		image = Image.open(f)
+	except Image.DecompressionBombError:
+		raise InvalidImage(_('The image dimensions are too large.'))
+	except Exception:
+		raise InvalidImage(_('Upload a valid image. The file is corrupted.'))
+	finally:
+		f.seek(0)
+
+	width, height = image.size
+	if image.format != image_format:
+		raise InvalidImage(_('Upload a valid image. The file is corrupted.'))
+	if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+		raise InvalidImage(_('The image dimensions are too large.'))
+
+	return image_format
+
+
+def content_hash(f):
+	"""Returns the sha256 of a file, reusing the one computed on upload"""
+	digest = getattr(f, 'sha256', None)
+	if digest is None:
+		sha256 = hashlib.sha256()
+		for chunk in f.chunks():
+			sha256.update(chunk)
+		f.seek(0)
+		digest = sha256.hexdigest()
+
+	return digest
+
+
+def store_image(f, image_format, storage):
+	"""Stores an image under its content hash
+
+	Returns the storage name and whether the file was written, so an image
+	uploaded twice is only stored once.
+	"""
+	name = f'uploads/recipe/{content_hash(f)}.{EXTENSIONS[image_format]}'
+	if storage.exists(name):
+		return name, False
+
+	return storage.save(name, f), True
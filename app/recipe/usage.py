@@ -0,0 +1,57 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Tag, Ingredients, recipe
+
+
+BATCH_SIZE = 500
+# The recipe field linking to every counted model.
+FIELDS = {Tag: 'tags', Ingredients: 'ingredients'}
+
+
+def _count_subquery(model):
+	"""Returns the number of recipes linked to the outer object"""
+	field = recipe._meta.get_field(FIELDS[model])
+	target = field.m2m_reverse_field_name()
+	links = field.remote_field.through.objects.filter(
+		**{target: OuterRef('pk')}
+		).order_by().values(target).annotate(count=Count('pk')).values('count')
+
+	return Coalesce(Subquery(links, output_field=IntegerField()), Value(0))
+
+
+def _update_changed(model, queryset):
+	"""Writes the recipe counts that changed, returning how many did
+
+	updated_at moves along with the count, so the ETags of the lists
+	ordered by usage change too.
+	"""
+	count = _count_subquery(model)
+
+	return queryset.exclude(recipe_count=count).update(
+		recipe_count=count,
+		updated_at=timezone.now()
+		)
+
+
+def update_counts(model, pks):
+	"""Recounts the recipes of the given tags or ingredients
+
+	Counting the links again rather than adding deltas keeps the counts
+	right when a link is added twice or removed without existing.
+	"""
+	pks = list(pks)
+	for offset in range(0, len(pks), BATCH_SIZE):
+		_update_changed(model, model.objects.filter(pk__in=pks[offset:offset + BATCH_SIZE]))
+
+
+def recount(model, queryset=None):
+	"""Recounts the recipes of every object of the queryset in one query
+
+	Returns the number of objects whose count changed.
+	"""
+	if queryset is None:
+		queryset = model.objects.all()
+
+	return _update_changed(model, queryset)
@@ -1,35 +1,108 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from recipe import bulk, cache, export, images, importer, pantry, rows, uploads
+from recipe.conditional import ConditionalGetMixin, not_modified
+from recipe.filters import filter_by_related, MATCH_ALL, MATCH_ANY
+from recipe.pagination import KeysetPagination
+from recipe.search import search as search_recipes
 from recipe.serializers import TagSerializer, IngredientSerializer, RecipeSerializer, RecipeDetailSerializer, RecipeImageSerializer
 from core.models import Tag, Ingredients, recipe
+from user.authentication import CachedTokenAuthentication
 
 
 # Create your views here.
 
+RELATED_FIELDS = {'ingredients': Ingredients, 'tags': Tag}
+# Serializer fields read from another column.
+FIELD_COLUMNS = {'image_variants': 'image'}
+
 
-class BaseViewsSetAttrs(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
+class BaseViewsSetAttrs(ConditionalGetMixin, viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
 	"""Base viewset class"""
-	authentication_classes = (TokenAuthentication,)
+	authentication_classes = (CachedTokenAuthentication,)
 	permission_classes = (IsAuthenticated,)
+	pagination_class = KeysetPagination
+	keyset_ordering = ('-name', '-id')
+	# Orderings picked with the ordering parameter instead of the name.
+	orderings = {
+		'usage': ('recipe_count', 'id'),
+		'-usage': ('-recipe_count', '-id'),
+		}
 
 
 	def get_queryset(self):
 		"""Returns objects to current authenticated user only"""
 		assigned_only = self.request.query_params.get('assigned_only')
+		ordering = self.request.query_params.get('ordering')
+		self.keyset_ordering = self.orderings.get(ordering, self.keyset_ordering)
 		queryset = self.queryset
 		if assigned_only:
-			queryset = queryset.filter(recipe__isnull=False)
+			queryset = queryset.filter(recipe_count__gt=0)
+
+		return queryset.filter(user=self.request.user).order_by(*self.keyset_ordering)
+
+
+	def list(self, request, *args, **kwargs):
+		"""Returns the cached list while the user's objects are unchanged"""
+		key = cache.list_cache_key(self.queryset.model, request)
+		cached = cache.get_list(key)
+		if cached is not None:
+			etag, data = cached
+			response = not_modified(request, etag)
+			if response is not None:
+				return response
+			return Response(data, headers={'ETag': etag})
+
+		response = super().list(request, *args, **kwargs)
+		if response.status_code == status.HTTP_200_OK:
+			cache.set_list(key, (response['ETag'], response.data))
+		return response
+
+
+	def create(self, request, *args, **kwargs):
+		"""Creates the object, or returns the user's object with the same name"""
+		serializer = self.get_serializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+		obj, created = bulk.get_or_create_named(
+			self.queryset.model,
+			request.user,
+			serializer.validated_data
+			)
 
-		return queryset.filter(user=self.request.user).order_by('-name')
+		return Response(
+			self.get_serializer(obj).data,
+			status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+			)
 
 
-	def perform_create(self, serializer):
-		"""Creates and saves it to the authenticated user"""
-		serializer.save(user=self.request.user)
+	@action(methods=['POST'], detail=False, url_path='bulk')
+	def bulk(self, request):
+		"""Creates or updates many objects in one transaction"""
+		try:
+			objs, created = bulk.save_named(
+				self.bulk_serializer_class,
+				request.user,
+				request.data
+				)
+		except bulk.BulkConflict as exc:
+			return Response(exc.errors, status=status.HTTP_409_CONFLICT)
+		except bulk.BulkError as exc:
+			return Response(exc.errors, status=status.HTTP_400_BAD_REQUEST)
+
+		serializer = self.get_serializer(objs, many=True)
+		return Response(
+			serializer.data,
+			status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+			)
 
 
 
@@ -37,6 +110,7 @@ class TagViewSet(BaseViewsSetAttrs):
 	"""Handles the queryset and serializer"""
 	queryset = Tag.objects.all()
 	serializer_class = TagSerializer
+	bulk_serializer_class = bulk.BulkTagSerializer
 
 
 
@@ -44,15 +118,22 @@ class IngredientViewSet(BaseViewsSetAttrs):
 	"""Handles the queryset and serializer"""
 	queryset = Ingredients.objects.all()
 	serializer_class = IngredientSerializer
+	bulk_serializer_class = bulk.BulkIngredientSerializer
 
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 	"""Handles the queryset and serializer"""
-	authentication_classes = (TokenAuthentication,)
+	authentication_classes = (CachedTokenAuthentication,)
 	permission_classes = (IsAuthenticated,)
 	serializer_class = RecipeSerializer
-	queryset = recipe.objects.all()
+	queryset = recipe.objects.defer('search_vector')
+	pagination_class = KeysetPagination
+	keyset_ordering = ('-id',)
+	# Actions answering with recipes, accepting the fields and expand parameters.
+	sparse_actions = ('list', 'retrieve', 'search')
+	# Whether the page holds value rows, built by RecipeRows.
+	paged_rows = False
 
 
 	def _params_to_int(self, qs):
@@ -63,15 +144,72 @@ class RecipeViewSet(viewsets.ModelViewSet):
 		"""Returns recipe objects to current authenticated user only"""
 		tags = self.request.query_params.get('tags')
 		ingredients = self.request.query_params.get('ingredients')
+		match = self.request.query_params.get('match')
+		if match != MATCH_ALL:
+			match = MATCH_ANY
 		queryset = self.queryset
 		if tags:
 			tag_ids = self._params_to_int(tags)
-			queryset = queryset.filter(tags__id__in=tag_ids)
+			queryset = filter_by_related(queryset, 'tags', tag_ids, match)
 		if ingredients:
 			ingredient_ids = self._params_to_int(ingredients)
-			queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+			queryset = filter_by_related(queryset, 'ingredients', ingredient_ids, match)
+
+		queryset = self._with_related(queryset)
+
+		return queryset.filter(user=self.request.user).order_by(*self.keyset_ordering)
+
+
+	def _names_param(self, name, allowed):
+		"""Returns the comma separated names of a query parameter, if given"""
+		value = self.request.query_params.get(name)
+		if not value:
+			return None
+		names = [item.strip() for item in value.split(',') if item.strip()]
+		unknown = [item for item in names if item not in allowed]
+		if unknown:
+			raise ValidationError(
+				{name: [_('Unknown fields: {}.').format(', '.join(unknown))]}
+				)
+
+		return names
+
+
+	def _sparse_fields(self):
+		"""Returns the fields to return and the relations to nest"""
+		if self.action not in self.sparse_actions:
+			return None, ()
+		serializer_class = self.get_serializer_class()
+		fields = self._names_param('fields', serializer_class.Meta.fields)
+		expand = self._names_param('expand', serializer_class.expandable_fields)
 
-		return queryset.filter(user=self.request.user).order_by('-id')
+		return fields, expand or ()
+
+
+	def _with_related(self, queryset):
+		"""Loads only the columns and relations the current action returns"""
+		if self.action not in self.sparse_actions + ('bulk',):
+			return queryset
+
+		fields, expand = self._sparse_fields()
+		if fields is None:
+			fields = self.get_serializer_class().Meta.fields
+		if self.action == 'retrieve':
+			expand = RELATED_FIELDS
+		columns = {'id'}
+		related = []
+		aggregated = {}
+		for field_name in fields:
+			if field_name not in RELATED_FIELDS:
+				columns.add(FIELD_COLUMNS.get(field_name, field_name))
+			elif field_name in expand and rows.has_array_agg():
+				aggregated[f'{field_name}_json'] = rows.related_objects(field_name)
+			else:
+				model = RELATED_FIELDS[field_name]
+				loaded = ('id', 'name') if field_name in expand else ('id',)
+				related.append(Prefetch(field_name, queryset=model.objects.only(*loaded).order_by('id')))
+
+		return queryset.only(*columns).annotate(**aggregated).prefetch_related(*related)
 
 
 	def get_serializer_class(self):
@@ -84,21 +222,180 @@ class RecipeViewSet(viewsets.ModelViewSet):
 		return self.serializer_class
 
 
+	def get_serializer(self, *args, **kwargs):
+		"""Passes the requested fields and relations to the serializer"""
+		if self.action in self.sparse_actions:
+			kwargs['fields'], kwargs['expand'] = self._sparse_fields()
+		if self.paged_rows and kwargs.get('many'):
+			return rows.RecipeRows(*args, fields=kwargs['fields'])
+
+		return super().get_serializer(*args, **kwargs)
+
+
+	def paginate_queryset(self, queryset):
+		"""Pages value rows instead of recipes when the list doesn't nest relations"""
+		fields, expand = self._sparse_fields()
+		self.paged_rows = self.action == 'list' and not expand
+		if self.paged_rows:
+			queryset = rows.RecipeRows(fields=fields).values(queryset)
+
+		return super().paginate_queryset(queryset)
+
+
 	def perform_create(self, serializer):
 		"""Creates recipe and saves it to the authenticated user"""
 		serializer.save(user=self.request.user)
 
 
+	@action(methods=['GET'], detail=False, url_path='search')
+	def search(self, request):
+		"""Returns the recipes best matching the q parameter"""
+		text = request.query_params.get('q', '').strip()
+		if not text:
+			return Response(
+				{'q': [_('This parameter is required.')]},
+				status=status.HTTP_400_BAD_REQUEST
+				)
+		try:
+			limit = min(int(request.query_params.get('limit', 20)), 100)
+		except ValueError:
+			limit = 20
+
+		queryset = search_recipes(self.get_queryset(), text)[:max(limit, 1)]
+		serializer = self.get_serializer(queryset, many=True)
+		return Response({'results': serializer.data})
+
+
+	@action(methods=['GET'], detail=False, url_path='cookable')
+	def cookable(self, request):
+		"""Returns the recipes best covered by the ingredients of the pantry parameter"""
+		try:
+			ingredient_ids = self._params_to_int(request.query_params.get('pantry', ''))
+		except ValueError:
+			return Response(
+				{'pantry': [_('Expected a comma separated list of ingredient ids.')]},
+				status=status.HTTP_400_BAD_REQUEST
+				)
+		try:
+			limit = min(int(request.query_params.get('limit', 20)), 100)
+		except ValueError:
+			limit = 20
+
+		matches = pantry.match(request.user.pk, ingredient_ids, max(limit, 1))
+		titles = dict(recipe.objects.filter(
+			pk__in=[recipe_id for recipe_id, matched, total, missing in matches]
+			).values_list('pk', 'title'))
+		return Response({'results': [
+			{
+			'id': recipe_id,
+			'title': titles[recipe_id],
+			'matched': matched,
+			'total': total,
+			'missing': missing,
+			}
+			for recipe_id, matched, total, missing in matches
+			if recipe_id in titles
+			]})
+
+
+	@action(methods=['GET'], detail=False, url_path='export')
+	def export(self, request):
+		"""Streams every recipe with its tag and ingredient names
+
+		The as parameter picks ndjson (the default) or csv, since format is
+		taken by the renderer negotiation.
+		"""
+		export_format = request.query_params.get('as', 'ndjson')
+		if export_format not in export.FORMATS:
+			return Response(
+				{'as': [_('Expected one of: {}.').format(', '.join(export.FORMATS))]},
+				status=status.HTTP_400_BAD_REQUEST
+				)
+
+		response = StreamingHttpResponse(
+			export.stream(self.get_queryset(), export_format),
+			content_type=export.CONTENT_TYPES[export_format]
+			)
+		response['Content-Disposition'] = f'attachment; filename="recipes.{export_format}"'
+		return response
+
+
+	@action(methods=['POST'], detail=False, url_path='import', url_name='import')
+	def import_file(self, request):
+		"""Creates recipes from an uploaded export file
+
+		The file is read in batches. The as parameter picks ndjson or csv
+		and defaults to the file's extension.
+		"""
+		uploaded = request.FILES.get('file')
+		if uploaded is None:
+			return Response(
+				{'file': [_('No file was submitted.')]},
+				status=status.HTTP_400_BAD_REQUEST
+				)
+		default_format = 'csv' if uploaded.name.lower().endswith('.csv') else 'ndjson'
+		import_format = request.query_params.get('as', default_format)
+		if import_format not in export.FORMATS:
+			return Response(
+				{'as': [_('Expected one of: {}.').format(', '.join(export.FORMATS))]},
+				status=status.HTTP_400_BAD_REQUEST
+				)
+
+		uploaded.seek(0)
+		try:
+			report = importer.import_recipes(request.user, uploaded.file, import_format)
+		except importer.ImportFileError as exc:
+			# Earlier batches are saved, so the totals tell what to resume from.
+			return Response(
+				{'file': [_('The file could not be read: {}').format(exc)], **exc.report},
+				status=status.HTTP_400_BAD_REQUEST
+				)
+		except importer.ImportConflict as exc:
+			return Response(
+				{'non_field_errors': [str(exc)], **exc.report},
+				status=status.HTTP_409_CONFLICT
+				)
+		return Response(report)
+
+
+	@action(methods=['POST'], detail=False, url_path='bulk')
+	def bulk(self, request):
+		"""Creates or updates many recipes in one transaction"""
+		try:
+			objs, created = bulk.save_recipes(request.user, request.data)
+		except bulk.BulkError as exc:
+			return Response(exc.errors, status=status.HTTP_400_BAD_REQUEST)
+
+		recipes = self.get_queryset().filter(pk__in=[obj.pk for obj in objs]).in_bulk()
+		serializer = self.get_serializer([recipes[obj.pk] for obj in objs], many=True)
+		return Response(
+			serializer.data,
+			status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+			)
+
+
 	@action(methods=['POST'], detail=True, url_path='upload-image')
 	def upload_image(self, request, pk=None):
 		"""Uploads image using valid serializer"""
 		recipe = self.get_object()
+		handler = uploads.BoundedUploadHandler(
+			request,
+			settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+			)
+		request.upload_handlers = [handler]
 		serializer = self.get_serializer(
 			recipe,
 			data=request.data
 			)
+		if handler.exceeded:
+			return Response(
+				{'image': [_('The image file is too large.')]},
+				status=status.HTTP_400_BAD_REQUEST
+				)
 		if serializer.is_valid():
 			serializer.save()
+			if serializer.image_stored:
+				images.schedule_variants(recipe.image.name)
 
 			return Response(
 				serializer.data,
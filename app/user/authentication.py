@@ -0,0 +1,153 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.base import ModelState
+
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+	"""Bounded LRU mapping token keys to their user, expiring after a TTL"""
+
+	def __init__(self, max_size, ttl):
+		self.max_size = max_size
+		self.ttl = ttl
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+
+	def get(self, key):
+		"""Returns the cached credentials of a token, if still fresh"""
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return None
+			expires, credentials = entry
+			if expires < time.monotonic():
+				del self._entries[key]
+				return None
+			self._entries.move_to_end(key)
+
+			return credentials
+
+
+	def set(self, key, credentials):
+		"""Caches the credentials of a token, evicting the oldest entry"""
+		with self._lock:
+			self._entries[key] = (time.monotonic() + self.ttl, credentials)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_size:
+				self._entries.popitem(last=False)
+
+
+	def delete(self, key):
+		"""Drops a token from the cache"""
+		with self._lock:
+			self._entries.pop(key, None)
+
+
+	def clear(self):
+		"""Drops every token from the cache"""
+		with self._lock:
+			self._entries.clear()
+
+
+	def __len__(self):
+		return len(self._entries)
+
+
+_local_cache = None
+
+
+def get_local_cache():
+	"""Returns the in-process token cache"""
+	global _local_cache
+	if _local_cache is None:
+		_local_cache = TokenCache(
+			settings.TOKEN_AUTH_CACHE['MAX_SIZE'],
+			settings.TOKEN_AUTH_CACHE['TTL']
+			)
+
+	return _local_cache
+
+
+def get_shared_cache():
+	"""Returns the cache shared between processes, if configured"""
+	alias = settings.TOKEN_AUTH_CACHE.get('SHARED_CACHE')
+
+	return caches[alias] if alias else None
+
+
+def _shared_key(key):
+
+	return f'user:token:{key}'
+
+
+def invalidate_token(key):
+	"""Forgets the user resolved for a token"""
+	get_local_cache().delete(key)
+	shared = get_shared_cache()
+	if shared is not None:
+		shared.delete(_shared_key(key))
+
+
+def _detached_copy(instance):
+	"""Returns a copy of a model instance sharing no state with it
+
+	copy.copy keeps the same _state, whose related object cache, like the
+	prefetched objects, would then be shared by every request.
+	"""
+	obj = copy.copy(instance)
+	obj._state = ModelState()
+	obj._state.db = instance._state.db
+	obj._state.adding = instance._state.adding
+	obj.__dict__.pop('_prefetched_objects_cache', None)
+
+	return obj
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+	"""Token authentication that caches the token to user resolution
+
+	Tokens are looked up in the in-process LRU, then in the optional shared
+	cache, and only then in the database. Entries are dropped when the token
+	is deleted or its user is saved; the TTL bounds how long another process
+	may keep serving an entry it was not told about.
+	"""
+
+	def authenticate_credentials(self, key):
+		"""Returns the user and token of a key"""
+		local = get_local_cache()
+		credentials = local.get(key)
+		if credentials is None:
+			credentials = self._resolve(key)
+			local.set(key, credentials)
+
+		# Requests may modify their user and token, so each gets its own copies.
+		user, token = credentials
+		user = _detached_copy(user)
+		token = _detached_copy(token)
+		token.user = user
+		return (user, token)
+
+
+	def _resolve(self, key):
+		"""Returns the credentials from the shared cache or the database"""
+		shared = get_shared_cache()
+		if shared is None:
+			return super().authenticate_credentials(key)
+
+		credentials = shared.get(_shared_key(key))
+		if credentials is None:
+			credentials = super().authenticate_credentials(key)
+			shared.set(
+				_shared_key(key),
+				credentials,
+				settings.TOKEN_AUTH_CACHE['TTL']
+				)
+
+		return credentials
@@ -0,0 +1,36 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from rest_framework import exceptions
+
+
+_semaphore = None
+_semaphore_lock = threading.Lock()
+
+
+def get_semaphore():
+	"""Returns the semaphore bounding the password hashes of this process"""
+	global _semaphore
+	with _semaphore_lock:
+		if _semaphore is None:
+			_semaphore = threading.BoundedSemaphore(settings.PASSWORD_HASHING_CONCURRENCY)
+
+	return _semaphore
+
+
+@contextmanager
+def hashing_slot():
+	"""Waits for a free password hashing slot
+
+	Logins and sign ups beyond the limit queue here instead of taking every
+	worker's CPU, and are asked to retry once the timeout has passed.
+	"""
+	semaphore = get_semaphore()
+	if not semaphore.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT):
+		raise exceptions.Throttled(wait=settings.PASSWORD_HASHING_TIMEOUT)
+	try:
+		yield
+	finally:
+		semaphore.release()
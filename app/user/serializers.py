@@ -3,6 +3,8 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from user.hashing import hashing_slot
+
 
 
 
@@ -16,7 +18,8 @@ class UserSerializer(serializers.ModelSerializer):
 
 	def create(self, validated_data):
 		"""Creates an object"""
-		return get_user_model().objects.create_user(**validated_data)
+		with hashing_slot():
+			return get_user_model().objects.create_user(**validated_data)
 
 	def update(self, instance, validated_data):
 		"""Updates the user, sets password and returns user"""
@@ -24,7 +27,8 @@ class UserSerializer(serializers.ModelSerializer):
 		user = super().update(instance, validated_data)
 
 		if password:
-			user.set_password(password)
+			with hashing_slot():
+				user.set_password(password)
 			user.save()
 
 		return user
@@ -45,11 +49,12 @@ class TokenAuthenticating(serializers.Serializer):
 		email = attrs.get('email')
 		password = attrs.get('password')
 
-		user = authenticate(
-			request=self.context.get('request'),
-			username=email,
-			password=password
-			)
+		with hashing_slot():
+			user = authenticate(
+				request=self.context.get('request'),
+				username=email,
+				password=password
+				)
 		if not user:
 			msg = _('Provided credentials are not valid, no token is generated!')
 			raise serializers.ValidationError(msg, code='authentication')
@@ -0,0 +1,140 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import CachedTokenAuthentication, TokenCache, get_local_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTest(TestCase):
+	"""Tests for caching the token to user resolution"""
+
+	def setUp(self):
+
+		self.user = get_user_model().objects.create_user(
+			email='kotechashubham94@gmail.com',
+			password='password1',
+			name='name'
+			)
+		self.token = Token.objects.create(user=self.user)
+		get_local_cache().clear()
+		self.client = APIClient()
+		self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+
+	def test_token_is_resolved_once(self):
+		"""Test that a repeated request doesn't look the token up again"""
+		res = self.client.get(ME_URL)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+		with self.assertNumQueries(0):
+			res = self.client.get(ME_URL)
+
+		self.assertEqual(res.data['email'], self.user.email)
+
+
+	@override_settings(TOKEN_AUTH_CACHE={
+		'MAX_SIZE':10, 'TTL':60, 'SHARED_CACHE':'default'
+		})
+	def test_token_is_resolved_from_shared_cache(self):
+		"""Test that another process can reuse the resolved token"""
+		cache.clear()
+		self.client.get(ME_URL)
+		get_local_cache().clear()
+
+		with self.assertNumQueries(0):
+			res = self.client.get(ME_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+	def test_invalid_token(self):
+		"""Test that an unknown token is rejected"""
+		self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+		res = self.client.get(ME_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+	def test_deleted_token_is_rejected(self):
+		"""Test that a deleted token stops authenticating"""
+		self.client.get(ME_URL)
+
+		self.token.delete()
+		res = self.client.get(ME_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+	def test_deactivated_user_is_rejected(self):
+		"""Test that a deactivated user stops authenticating"""
+		self.client.get(ME_URL)
+
+		self.user.is_active = False
+		self.user.save()
+		res = self.client.get(ME_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+	def test_updated_profile_is_returned(self):
+		"""Test that the cached user follows profile updates"""
+		self.client.get(ME_URL)
+
+		self.client.patch(ME_URL, {'name':'name1'})
+		res = self.client.get(ME_URL)
+
+		self.assertEqual(res.data['name'], 'name1')
+
+
+
+	def test_requests_get_their_own_user_and_token(self):
+		"""Test that the cached credentials share no state between requests"""
+		authentication = CachedTokenAuthentication()
+		user, token = authentication.authenticate_credentials(self.token.key)
+		user.name = 'changed'
+		user._state.fields_cache['cached'] = object()
+
+		other_user, other_token = authentication.authenticate_credentials(self.token.key)
+
+		self.assertEqual(other_user.name, 'name')
+		self.assertNotIn('cached', other_user._state.fields_cache)
+		self.assertIsNot(other_token, token)
+		self.assertIs(other_token.user, other_user)
+
+
+
+class TokenCacheTest(TestCase):
+	"""Tests for the in-process token cache"""
+
+	def test_least_recently_used_is_evicted(self):
+		"""Test that the cache is bounded"""
+		token_cache = TokenCache(max_size=2, ttl=60)
+		token_cache.set('a', 1)
+		token_cache.set('b', 2)
+		token_cache.get('a')
+		token_cache.set('c', 3)
+
+		self.assertEqual(len(token_cache), 2)
+		self.assertEqual(token_cache.get('a'), 1)
+		self.assertIsNone(token_cache.get('b'))
+
+
+	@patch('user.authentication.time.monotonic')
+	def test_entries_expire(self, monotonic):
+		"""Test that entries are dropped after the TTL"""
+		monotonic.return_value = 100
+		token_cache = TokenCache(max_size=2, ttl=60)
+		token_cache.set('a', 1)
+
+		monotonic.return_value = 161
+		self.assertIsNone(token_cache.get('a'))
@@ -0,0 +1,51 @@
+import threading
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import hashing
+
+
+TOKEN_URL = reverse('user:token')
+
+MD5 = 'django.contrib.auth.hashers.MD5PasswordHasher'
+PBKDF2 = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+
+
+class PasswordHashingTest(TestCase):
+	"""Tests for hashing passwords on login"""
+
+	def setUp(self):
+		self.client = APIClient()
+		self.payload = {'email':'kotechashubham94@gmail.com', 'password':'password1'}
+
+
+	def test_password_is_rehashed_on_login(self):
+		"""Test that a login upgrades the password to the preferred hasher"""
+		with override_settings(PASSWORD_HASHERS=[PBKDF2, MD5]):
+			user = get_user_model().objects.create_user(**self.payload)
+		self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+		with override_settings(PASSWORD_HASHERS=[MD5, PBKDF2]):
+			res = self.client.post(TOKEN_URL, self.payload)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		user.refresh_from_db()
+		self.assertTrue(user.password.startswith('md5$'))
+
+
+	@override_settings(PASSWORD_HASHING_TIMEOUT=0.01)
+	def test_login_is_throttled_without_free_slot(self):
+		"""Test that a login waiting too long for a hashing slot is told to retry"""
+		get_user_model().objects.create_user(**self.payload)
+		with patch('user.hashing._semaphore', threading.BoundedSemaphore(1)):
+			hashing.get_semaphore().acquire()
+			res = self.client.post(TOKEN_URL, self.payload)
+
+		self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+		self.assertNotIn('token', res.data)
@@ -1,6 +1,7 @@
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, TokenAuthenticating
 
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 # Create your views here.
@@ -16,13 +17,14 @@ class TokenGeneration(ObtainAuthToken):
 	"""Generates a token to a valid user"""
 	serializer_class = TokenAuthenticating
 	renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+	parser_classes = api_settings.DEFAULT_PARSER_CLASSES
 
 
 
 class ManagingUser(generics.RetrieveUpdateAPIView):
 	"""Retrieves and updates the authenticated user profile"""
 	serializer_class = UserSerializer
-	authentication_classes = (authentication.TokenAuthentication,)
+	authentication_classes = (CachedTokenAuthentication,)
 	permission_classes = (permissions.IsAuthenticated,)
 
 	def get_object(self):